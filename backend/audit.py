@@ -0,0 +1,179 @@
+"""
+Keyset-paginated audit_log queries for the audit log and field history endpoints.
+
+Pages are ordered newest first on (updated_at, id) and continue from an
+opaque cursor holding the last row's key, so page N costs the same as page 1
+instead of scanning and discarding N * limit rows like OFFSET would.
+
+Filters on client, field and user are equality predicates; the date range and
+the cursor are also expressed as plain `updated_at` bounds. DuckDB evaluates
+those against per-row-group min/max statistics, and since audit rows are
+appended in time order, deep pages and date ranges skip most of the table.
+(DuckDB's ART indexes, idx_audit_log_client_field included, only serve
+constraint checks and point lookups, not these ordered range scans.)
+
+Once old rows have been archived to Parquet (audit_archive.py), reads go
+through the ARCHIVE_VIEW union of audit_log and the archive instead. Its
+`month` column is the archive's hive partition key, so the same bounds are
+repeated on `month` and only the matching partition directories are opened.
+
+Totals are approximate: the table's row estimate (or, once archived, the hot
+row count plus the archive manifest) when unfiltered, otherwise an exact count
+that stops at COUNT_CAP.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+# Filtered totals stop counting here and are reported as approximate
+COUNT_CAP = 10000
+# audit_log UNION ALL the Parquet archive, created by audit_archive.py
+ARCHIVE_VIEW = "audit_log_all"
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that were not produced by `encode_cursor`."""
+
+
+def encode_cursor(updated_at: Optional[datetime], audit_id: str) -> str:
+    """Opaque cursor for the page that follows the row (updated_at, id)."""
+    key = [updated_at.isoformat() if updated_at else None, audit_id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, audit_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(updated_at) if updated_at else None), str(audit_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def audit_source(conn) -> Optional[str]:
+    """Relation holding the audit rows: ARCHIVE_VIEW once rows were archived, else audit_log (None if neither)."""
+    names = {name for (name,) in conn.execute(
+        "SELECT table_name FROM information_schema.tables WHERE table_name IN ('audit_log', ?)",
+        [ARCHIVE_VIEW]
+    ).fetchall()}
+    if ARCHIVE_VIEW in names:
+        return ARCHIVE_VIEW
+    return "audit_log" if names else None
+
+
+def month_of(timestamp: datetime) -> date:
+    """Archive partition (first day of the month) holding a timestamp."""
+    return date(timestamp.year, timestamp.month, 1)
+
+
+def audit_filters(client_id: Optional[str] = None, field_name: Optional[str] = None,
+                  updated_by: Optional[str] = None, since: Optional[datetime] = None,
+                  until: Optional[datetime] = None, source: str = "audit_log") -> Tuple[List[str], List[Any]]:
+    """
+    WHERE conditions and parameters for the optional audit filters.
+
+    `since` is inclusive and `until` exclusive. For ARCHIVE_VIEW the range is
+    repeated on the `month` partition column.
+    """
+    conditions, params = [], []
+    for column, value in (("client_id", client_id), ("field_name", field_name), ("updated_by", updated_by)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        conditions.append("updated_at >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("updated_at < ?")
+        params.append(until)
+    if source == ARCHIVE_VIEW:
+        if since is not None:
+            conditions.append("month >= ?")
+            params.append(month_of(since))
+        if until is not None:
+            conditions.append("month <= ?")
+            params.append(month_of(until))
+    return conditions, params
+
+
+def _cursor_conditions(cursor: Optional[str], source: str) -> Tuple[List[str], List[Any]]:
+    """Conditions selecting the rows after a cursor in (updated_at DESC NULLS LAST, id DESC) order."""
+    if not cursor:
+        return [], []
+    updated_at, audit_id = decode_cursor(cursor)
+    if updated_at is None:
+        return ["updated_at IS NULL AND id < ?"], [audit_id]
+    # The standalone upper bounds are what let DuckDB skip newer row groups and partitions
+    conditions = ["(updated_at IS NULL OR updated_at <= ?)", "(updated_at IS NULL OR updated_at < ? OR id < ?)"]
+    params = [updated_at, updated_at, audit_id]
+    if source == ARCHIVE_VIEW:
+        conditions.append("(month IS NULL OR month <= ?)")
+        params.append(month_of(updated_at))
+    return conditions, params
+
+
+def fetch_audit_page(conn, columns: str, conditions: List[str], params: List[Any],
+                     cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                     source: str = "audit_log") -> Tuple[List[tuple], Optional[str]]:
+    """
+    Fetch one page of audit_log rows, newest first.
+
+    Args:
+        conn: Open connection
+        columns: SELECT list for the returned rows
+        conditions, params: Filters from `audit_filters`
+        cursor: `next_cursor` of the previous page (None for the first page)
+        limit: Page size
+        source: Relation from `audit_source`
+
+    Returns:
+        (rows, next_cursor); next_cursor is None on the last page
+    """
+    cursor_conditions, cursor_params = _cursor_conditions(cursor, source)
+    where = conditions + cursor_conditions
+    rows = conn.execute(f"""
+        SELECT {columns}, updated_at, id
+        FROM {source}
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY updated_at DESC NULLS LAST, id DESC
+        LIMIT ?
+    """, params + cursor_params + [limit + 1]).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+    return [row[:-2] for row in rows], next_cursor
+
+
+def approximate_count(conn, conditions: List[str], params: List[Any],
+                      source: str = "audit_log") -> Tuple[int, bool]:
+    """
+    Total rows matching the filters, for UI totals.
+
+    Returns:
+        (count, approximate); unfiltered counts come from table metadata and
+        filtered counts stop at COUNT_CAP
+    """
+    if not conditions:
+        if source == ARCHIVE_VIEW:
+            # The row estimate still counts archived (deleted) rows, but the hot
+            # table is bounded by the retention horizon, so count it exactly
+            return conn.execute("""
+                SELECT (SELECT COUNT(*) FROM audit_log)
+                     + (SELECT COALESCE(SUM(rows), 0) FROM audit_archive_manifest)
+            """).fetchone()[0], True
+        estimate = conn.execute(
+            "SELECT estimated_size FROM duckdb_tables() WHERE table_name = 'audit_log' AND schema_name = 'main'"
+        ).fetchone()
+        return (int(estimate[0]) if estimate else 0), True
+
+    count = conn.execute(f"""
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM {source} WHERE {" AND ".join(conditions)} LIMIT ?
+        )
+    """, params + [COUNT_CAP + 1]).fetchone()[0]
+    return min(count, COUNT_CAP), count > COUNT_CAP
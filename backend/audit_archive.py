@@ -0,0 +1,157 @@
+"""
+Audit log retention: move old audit_log rows to date-partitioned Parquet.
+
+audit_log otherwise grows without bound inside planwise.db, bloating the file
+and every checkpoint. `archive_audit_log` moves rows older than the retention
+horizon (PLANWISE_AUDIT_RETENTION_DAYS, default 365) into hive-partitioned
+Parquet files next to the database:
+
+    data/planwise_audit_archive/month=2024-05-01/<uuid>.parquet
+
+Each run appends new files, records per-month row counts in
+`audit_archive_manifest` and deletes the archived rows. It then (re)creates the
+`audit_log_all` view, which is audit_log UNION ALL the archive. The audit
+endpoints read through that view (audit.py) and filter on its `month`
+partition column, so recent pages never open archive files.
+
+Run it from cron or by hand while the API is idle (it needs the write lock):
+
+    python -m backend.audit_archive --older-than-days 365
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+try:
+    from backend.audit import ARCHIVE_VIEW
+    from backend.instrumentation import connect
+except ImportError:  # started from backend/
+    from audit import ARCHIVE_VIEW
+    from instrumentation import connect
+
+DB_PATH = Path(__file__).parent.parent / "data" / "planwise.db"
+DEFAULT_RETENTION_DAYS = 365
+
+MANIFEST_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS audit_archive_manifest (
+        month DATE NOT NULL,
+        rows BIGINT NOT NULL,
+        archived_before TIMESTAMP NOT NULL,
+        archived_at TIMESTAMP NOT NULL
+    )
+"""
+
+
+def retention_days() -> int:
+    return int(os.environ.get("PLANWISE_AUDIT_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))
+
+
+def archive_dir(db_path) -> Path:
+    """Parquet archive directory for a main database path."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}_audit_archive")
+
+
+def _sql_path(path: Path) -> str:
+    return str(path.resolve()).replace("'", "''")
+
+
+def create_archive_view(conn, directory: Path):
+    """(Re)create ARCHIVE_VIEW over audit_log and the Parquet files in `directory`."""
+    conn.execute(f"""
+        CREATE OR REPLACE VIEW {ARCHIVE_VIEW} AS
+        SELECT *, CAST(date_trunc('month', updated_at) AS DATE) AS month FROM audit_log
+        UNION ALL BY NAME
+        SELECT * FROM read_parquet(
+            '{_sql_path(directory)}/*/*.parquet',
+            hive_partitioning = true, hive_types = {{'month': DATE}}, union_by_name = true
+        )
+    """)
+
+
+def archive_audit_log(db_path=DB_PATH, before: Optional[datetime] = None) -> dict:
+    """
+    Move audit_log rows updated before `before` into the Parquet archive.
+
+    Args:
+        db_path: Main database
+        before: Cutoff (default: now minus retention_days())
+
+    Returns:
+        Dictionary with the cutoff, archived row count and archive directory
+    """
+    before = before or datetime.now() - timedelta(days=retention_days())
+    directory = archive_dir(db_path)
+    conn = connect(str(db_path))
+    written = []
+    try:
+        conn.execute(MANIFEST_SCHEMA)
+        months = conn.execute("""
+            SELECT CAST(date_trunc('month', updated_at) AS DATE) AS month, COUNT(*)
+            FROM audit_log WHERE updated_at < ?
+            GROUP BY ALL ORDER BY month
+        """, [before]).fetchall()
+        archived = sum(rows for _, rows in months)
+
+        if archived:
+            existing = set(directory.glob("*/*.parquet"))
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                conn.execute(f"""
+                    COPY (
+                        SELECT *, CAST(date_trunc('month', updated_at) AS DATE) AS month
+                        FROM audit_log WHERE updated_at < ?
+                    ) TO '{_sql_path(directory)}' (FORMAT PARQUET, PARTITION_BY (month), APPEND)
+                """, [before])
+                written = sorted(set(directory.glob("*/*.parquet")) - existing)
+                archived_at = datetime.now()
+                conn.executemany(
+                    "INSERT INTO audit_archive_manifest VALUES (?, ?, ?, ?)",
+                    [[month, rows, before, archived_at] for month, rows in months]
+                )
+                conn.execute("DELETE FROM audit_log WHERE updated_at < ?", [before])
+                create_archive_view(conn, directory)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                # Files from a rolled-back run would duplicate rows still in audit_log
+                for path in written:
+                    path.unlink(missing_ok=True)
+                raise
+            # Reclaim the deleted rows' space now rather than at the next automatic checkpoint
+            conn.execute("CHECKPOINT")
+    finally:
+        conn.close()
+
+    return {
+        "before": before,
+        "archived_rows": archived,
+        "months": len(months),
+        "files": len(written),
+        "archive_dir": str(directory),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old audit_log rows to partitioned Parquet")
+    parser.add_argument("--db", default=str(DB_PATH), help="DuckDB database (default: data/planwise.db)")
+    parser.add_argument("--older-than-days", type=int, default=None,
+                        help=f"Retention horizon (default: PLANWISE_AUDIT_RETENTION_DAYS or {DEFAULT_RETENTION_DAYS})")
+    args = parser.parse_args()
+
+    days = args.older_than_days if args.older_than_days is not None else retention_days()
+    try:
+        result = archive_audit_log(args.db, datetime.now() - timedelta(days=days))
+    except Exception as e:
+        print(f"\n❌ Archiving failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"✓ Archived {result['archived_rows']:,} audit rows older than {result['before']:%Y-%m-%d} "
+          f"({result['months']} months) to {result['archive_dir']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+End-to-end API benchmark suite.
+
+Drives every FastAPI route through an in-process ASGI client against synthetic
+databases of several sizes, reports p50/p95/p99 latency and throughput, and
+compares the results with a stored baseline so regressions fail the run.
+
+Usage (from the repo root):
+    python -m backend.benchmark_api --profile smoke
+    python -m backend.benchmark_api --profile standard --update-baseline
+    python -m backend.benchmark_api --profile full --output data/bench/results.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+
+import duckdb
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src" / "database"))
+
+from synthetic_data import DATA_VERSION, generate_database  # noqa: E402
+
+from backend import main as api  # noqa: E402
+from backend.snapshots import close_store, get_store, snapshot_path  # noqa: E402
+
+BENCH_DIR = ROOT / "data" / "bench"
+BASELINE_PATH = Path(__file__).parent / "benchmark_baseline.json"
+
+# Load profiles: database sizes, timed requests per route and client concurrency levels
+PROFILES = {
+    "smoke": {"sizes": [1_000], "iterations": 40, "concurrency": [1]},
+    "standard": {"sizes": [10_000, 100_000], "iterations": 50, "concurrency": [1, 8]},
+    "full": {"sizes": [10_000, 100_000, 1_000_000], "iterations": 100, "concurrency": [1, 8, 32]},
+}
+
+# Regressions must exceed both the relative tolerance and an absolute floor,
+# so sub-millisecond jitter on fast routes never fails the run
+DEFAULT_TOLERANCE = 0.5
+MIN_DELTA_MS = 10.0
+
+WARMUP_REQUESTS = 3
+EXPORT_BATCH = 50
+COMPARE_BATCH = 25
+
+
+def _routes(client_ids: list[str]) -> list[dict]:
+    """
+    Build one scenario per API route.
+
+    Each scenario has a name, HTTP method, a path factory taking a client_id,
+    an optional JSON body factory and whether it mutates data (mutating routes
+    only run at concurrency 1 because writes need an exclusive connection).
+    """
+    export_ids = client_ids[:EXPORT_BATCH]
+    compare_ids = client_ids[:COMPARE_BATCH]
+    return [
+        {"name": "health", "method": "GET", "path": lambda cid: "/api/v1/health"},
+        {"name": "clients_list", "method": "GET", "path": lambda cid: "/api/v1/clients?limit=100"},
+        {"name": "clients_search", "method": "GET", "path": lambda cid: f"/api/v1/clients?search={cid[-4:]}"},
+        {"name": "client_detail", "method": "GET", "path": lambda cid: f"/api/v1/clients/{cid}"},
+        {"name": "extractions", "method": "GET", "path": lambda cid: f"/api/v1/clients/{cid}/extractions"},
+        {"name": "peers", "method": "GET", "path": lambda cid: f"/api/v1/clients/{cid}/peers"},
+        {"name": "peer_assessment", "method": "GET", "path": lambda cid: f"/api/v1/clients/{cid}/peer-assessment"},
+        {"name": "navigator_scorecard", "method": "GET",
+         "path": lambda cid: f"/api/v1/clients/{cid}/navigator-scorecard"},
+        {"name": "distributions", "method": "GET", "path": lambda cid: f"/api/v1/clients/{cid}/distributions"},
+        {"name": "regional_benchmark", "method": "GET",
+         "path": lambda cid: f"/api/v1/clients/{cid}/regional-benchmark"},
+        {"name": "dashboard", "method": "GET", "path": lambda cid: f"/api/v1/clients/{cid}/dashboard"},
+        {"name": "field_history", "method": "GET",
+         "path": lambda cid: f"/api/v1/clients/{cid}/fields/auto_enrollment_rate/history"},
+        {"name": "audit_log", "method": "GET", "path": lambda cid: "/api/v1/audit-log?limit=50"},
+        {"name": "metrics", "method": "GET", "path": lambda cid: "/api/v1/metrics"},
+        {"name": "compare", "method": "POST", "path": lambda cid: "/api/v1/compare",
+         "body": lambda cid: {"client_ids": compare_ids}},
+        {"name": "patch_field", "method": "PATCH", "mutates": True,
+         "path": lambda cid: f"/api/v1/clients/{cid}/fields/auto_enrollment_rate",
+         "body": lambda cid: {"new_value": "0.04", "reason": "benchmark", "updated_by": "bench@planwise.com"}},
+        {"name": "bulk_update", "method": "PUT", "mutates": True,
+         "path": lambda cid: f"/api/v1/clients/{cid}",
+         "body": lambda cid: {"updates": [{"field_name": "auto_escalation_cap", "new_value": 0.1},
+                                          {"field_name": "vesting_schedule", "new_value": "Immediate"}],
+                              "updated_by": "bench@planwise.com"}},
+        {"name": "export_excel", "method": "POST", "mutates": False, "serial": True,
+         "path": lambda cid: "/api/v1/export/excel", "body": lambda cid: export_ids},
+    ]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank-interpolated percentile of a list of latencies."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def ensure_database(rows: int, seed: int = 42) -> Path:
+    """Return a cached synthetic database with `rows` plans, generating it on first use."""
+    db_path = BENCH_DIR / f"synthetic_{rows}_{seed}_v{DATA_VERSION}.db"
+    if not db_path.exists():
+        print(f"  Generating {rows:,}-plan synthetic database...")
+        generate_database(str(db_path), rows=rows, seed=seed)
+    return db_path
+
+
+def _working_copy(db_path: Path) -> Path:
+    """Copy the cached database so mutating scenarios never dirty the cache."""
+    work_path = db_path.with_name(db_path.stem + ".work.db")
+    work_path.write_bytes(db_path.read_bytes())
+    return work_path
+
+
+async def _run_scenario(client: httpx.AsyncClient, route: dict, client_ids: list[str],
+                        iterations: int, concurrency: int) -> dict:
+    """Issue `iterations` requests for one route at the given concurrency."""
+    latencies = []
+    errors = 0
+    cursor = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(cid: str):
+        nonlocal errors
+        body = route["body"](cid) if "body" in route else None
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(route["method"], route["path"](cid), json=body)
+            latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            errors += 1
+
+    for _ in range(WARMUP_REQUESTS):
+        await one(client_ids[cursor % len(client_ids)])
+        cursor += 1
+    latencies.clear()
+    errors = 0
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(client_ids[(cursor + i) % len(client_ids)]) for i in range(iterations)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": iterations,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "throughput_rps": round(iterations / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+async def _run_size(db_path: Path, iterations: int, concurrency_levels: list[int],
+                    routes_filter: list[str] = None, seed: int = 42) -> dict:
+    conn = duckdb.connect(str(db_path), read_only=True)
+    all_ids = [row[0] for row in conn.execute("SELECT client_id FROM plan_designs ORDER BY client_id").fetchall()]
+    conn.close()
+    client_ids = random.Random(seed).sample(all_ids, min(len(all_ids), 200))
+
+    original_path = api.DB_PATH
+    api.DB_PATH = db_path
+    # ASGITransport does not run the app's lifespan; warm snapshots as server startup would
+    store = get_store(db_path)
+    if store is not None:
+        store.warm()
+        store.wait_idle()
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=api.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for route in _routes(client_ids):
+                if routes_filter and route["name"] not in routes_filter:
+                    continue
+                serial = route.get("mutates") or route.get("serial")
+                for concurrency in concurrency_levels:
+                    if serial and concurrency > 1:
+                        continue
+                    stats = await _run_scenario(client, route, client_ids, iterations, concurrency)
+                    key = f"{route['name']}@c{concurrency}"
+                    results[key] = stats
+                    flag = "❌" if stats["errors"] else "✓"
+                    print(f"  {flag} {key:<28} p50 {stats['p50_ms']:>8.2f}ms  p95 {stats['p95_ms']:>8.2f}ms  "
+                          f"p99 {stats['p99_ms']:>8.2f}ms  {stats['throughput_rps']:>8.1f} req/s")
+    finally:
+        api.DB_PATH = original_path
+    return results
+
+
+def run_suite(profile: str = "smoke", routes_filter: list[str] = None, seed: int = 42) -> dict:
+    """
+    Run the benchmark suite for a load profile.
+
+    Args:
+        profile: Key of PROFILES
+        routes_filter: Optional route names to restrict the run to
+        seed: Synthetic data seed
+
+    Returns:
+        Results document: metadata plus {size: {route@cN: stats}}
+    """
+    config = PROFILES[profile]
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+
+    document = {
+        "profile": profile,
+        "seed": seed,
+        "iterations": config["iterations"],
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "machine": platform.machine(),
+        "sizes": {},
+    }
+    for rows in config["sizes"]:
+        print(f"\nDatabase size: {rows:,} plans")
+        work_path = _working_copy(ensure_database(rows, seed))
+        try:
+            document["sizes"][str(rows)] = asyncio.run(
+                _run_size(work_path, config["iterations"], config["concurrency"], routes_filter, seed)
+            )
+        finally:
+            close_store(work_path)
+            sidecar = snapshot_path(work_path)
+            for path in (work_path, Path(f"{work_path}.wal"), sidecar, Path(f"{sidecar}.wal")):
+                if path.exists():
+                    path.unlink()
+    return document
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE,
+                        min_delta_ms: float = MIN_DELTA_MS) -> list[dict]:
+    """
+    Compare a results document with a baseline.
+
+    A scenario regresses when its p95 grows by more than `tolerance` (and by at
+    least `min_delta_ms`) or its throughput drops by more than `tolerance`.
+    Scenarios missing from the baseline are ignored; errors always fail.
+
+    Returns:
+        List of regression dicts (empty when the run is clean)
+    """
+    regressions = []
+    for size, scenarios in results["sizes"].items():
+        base_scenarios = baseline.get("sizes", {}).get(size, {})
+        for key, stats in scenarios.items():
+            if stats["errors"]:
+                regressions.append({"size": size, "scenario": key, "metric": "errors",
+                                    "baseline": 0, "current": stats["errors"]})
+            base = base_scenarios.get(key)
+            if not base:
+                continue
+            if (stats["p95_ms"] > base["p95_ms"] * (1 + tolerance)
+                    and stats["p95_ms"] - base["p95_ms"] >= min_delta_ms):
+                regressions.append({"size": size, "scenario": key, "metric": "p95_ms",
+                                    "baseline": base["p95_ms"], "current": stats["p95_ms"]})
+            if stats["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+                regressions.append({"size": size, "scenario": key, "metric": "throughput_rps",
+                                    "baseline": base["throughput_rps"], "current": stats["throughput_rps"]})
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every API route against synthetic databases")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="smoke")
+    parser.add_argument("--routes", nargs="*", help="Only run these route names")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative slowdown")
+    parser.add_argument("--output", help="Also write results JSON here")
+    args = parser.parse_args(argv)
+
+    print("PlanWise Design Matrix - API Benchmark")
+    print("=" * 60)
+    results = run_suite(args.profile, args.routes, args.seed)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"\n✓ Results written to {args.output}")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baselines = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        baselines[args.profile] = results
+        baseline_path.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"\n✓ Baseline for '{args.profile}' written to {baseline_path}")
+        return 0
+
+    if not baseline_path.exists():
+        print(f"\n⚠️  No baseline at {baseline_path}; run with --update-baseline to create one")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text()).get(args.profile)
+    if not baseline:
+        print(f"\n⚠️  Baseline has no '{args.profile}' profile; run with --update-baseline")
+        return 0
+
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) vs baseline:")
+        for r in regressions:
+            print(f"  • {r['size']} plans {r['scenario']}: {r['metric']} {r['baseline']} → {r['current']}")
+        return 1
+
+    print("\n✓ No regressions vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
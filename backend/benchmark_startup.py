@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Startup-time report: how long importing the API (or the deck generator) takes.
+
+Imports the module in a fresh interpreter under `python -X importtime`, sums
+each top-level package's own import time and checks the total against a
+budget. An import that loads one of LAZY_MODULES also fails. Those modules
+must only be loaded by the code that uses them, in the background by
+warmup.py, or on first use.
+
+Usage (from the repo root):
+    python -m backend.benchmark_startup
+    python -m backend.benchmark_startup --module powerpoint_generator --top 20
+"""
+
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Same import paths the API and the Streamlit app set up
+IMPORT_PATHS = [str(ROOT), str(ROOT / "src"), str(ROOT / "src" / "database")]
+
+# Import-time budgets (ms, summed self time); generous enough for a cold CI machine
+STARTUP_BUDGETS_MS = {
+    "backend.main": 1500.0,
+    "powerpoint_generator": 750.0,
+}
+# Heavy packages imported only where they are used
+LAZY_MODULES = ("pandas", "openpyxl", "pyarrow", "matplotlib", "pptx")
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Summarize `-X importtime` output.
+
+    Returns:
+        {"total_ms": float, "packages": {top-level package: self ms}}
+    """
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        packages[fields[2].strip().split(".")[0]] += int(fields[0]) / 1000
+    return {"total_ms": sum(packages.values()), "packages": dict(packages)}
+
+
+def import_report(module: str = "backend.main") -> dict:
+    """Import `module` in a fresh interpreter and summarize where the time went."""
+    code = f"import sys; sys.path[:0] = {IMPORT_PATHS!r}; import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    report = parse_importtime(result.stderr)
+    report["module"] = module
+    report["lazy_loaded"] = sorted(name for name in LAZY_MODULES if name in report["packages"])
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report and check module import time")
+    parser.add_argument("--module", action="append", help="Module to import (default: every budgeted module)")
+    parser.add_argument("--top", type=int, default=10, help="Packages to list, slowest first")
+    parser.add_argument("--budget-ms", type=float, help="Override the module's budget")
+    args = parser.parse_args(argv)
+
+    print("PlanWise Design Matrix - Startup Report")
+    print("=" * 60)
+    failures = 0
+    for module in args.module or list(STARTUP_BUDGETS_MS):
+        report = import_report(module)
+        budget = args.budget_ms or STARTUP_BUDGETS_MS.get(module)
+        print(f"\n{module}: {report['total_ms']:.1f} ms" + (f" (budget {budget:.0f} ms)" if budget else ""))
+        ranked = sorted(report["packages"].items(), key=lambda item: item[1], reverse=True)
+        for name, ms in ranked[:args.top]:
+            print(f"  {name:<30} {ms:9.1f} ms")
+
+        if report["lazy_loaded"]:
+            failures += 1
+            print(f"  ❌ Loads lazily imported modules: {', '.join(report['lazy_loaded'])}")
+        if budget and report["total_ms"] > budget:
+            failures += 1
+            print(f"  ❌ Over budget by {report['total_ms'] - budget:.1f} ms")
+
+    print("\n✓ Startup within budget" if not failures else f"\n❌ {failures} startup check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+Change feed for plan edits, served as server-sent events.
+
+update_field and bulk_update_fields publish the audit_log rows they write to
+`feed`. The feed keeps the last BUFFER_SIZE events in memory and fans each one
+out to the open streams, so watching for edits costs no database reads:
+
+    GET /api/v1/changes/stream?client_ids=70006,70011
+
+Each `change` event carries its audit_log id as the SSE event id. A stream
+resumes after `?cursor=<audit id>` (or the Last-Event-ID header that
+EventSource sends when it reconnects). Cursors still in the buffer replay from
+memory. Older ones are replayed from audit_log, up to REPLAY_LIMIT events. A
+cursor that cannot be found, or that is further behind, gets a `reset` event
+instead: the client should refetch everything it shows.
+
+Each stream has a bounded queue. A stream that falls SUBSCRIBER_QUEUE_SIZE
+events behind loses its queue and catches up from its last event id, so a slow
+client never holds events in memory for the others. Streams close after
+STREAM_SECONDS, and EventSource reconnects with its cursor.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import Callable, Deque, FrozenSet, Iterable, List, Optional, Set
+
+try:
+    from backend.db_executor import INTERACTIVE, Overloaded, run_db
+except ImportError:  # started from backend/ as `uvicorn main:app`
+    from db_executor import INTERACTIVE, Overloaded, run_db
+
+# Recent events kept for resuming streams without a query
+BUFFER_SIZE = 1000
+# Undelivered events per stream before it is made to catch up from its cursor
+SUBSCRIBER_QUEUE_SIZE = 256
+# Events replayed from audit_log before a stream is told to reset instead
+REPLAY_LIMIT = 500
+KEEPALIVE_SECONDS = 15.0
+STREAM_SECONDS = 300.0
+RECONNECT_MS = 1000
+
+EVENT_COLUMNS = "id, client_id, field_name, new_value, change_type, updated_by, updated_at"
+
+
+def change_event(row) -> dict:
+    """Event payload for an audit_log row selected with EVENT_COLUMNS."""
+    audit_id, client_id, field_name, new_value, change_type, updated_by, updated_at = row
+    return {
+        "id": audit_id,
+        "client_id": client_id,
+        "field_name": field_name,
+        "new_value": new_value,
+        "change_type": change_type,
+        "updated_by": updated_by,
+        "updated_at": updated_at.isoformat() if updated_at else None,
+    }
+
+
+def load_events(conn, audit_ids: Iterable[str]) -> List[dict]:
+    """Events for audit rows just written, in feed order."""
+    audit_ids = list(audit_ids)
+    if not audit_ids:
+        return []
+    rows = conn.execute(f"""
+        SELECT {EVENT_COLUMNS} FROM audit_log
+        WHERE id IN (SELECT unnest(?))
+        ORDER BY updated_at, id
+    """, [audit_ids]).fetchall()
+    return [change_event(row) for row in rows]
+
+
+def events_after(conn, cursor: str, client_ids: Optional[FrozenSet[str]] = None,
+                 limit: int = REPLAY_LIMIT) -> Optional[List[dict]]:
+    """
+    audit_log events after the row `cursor`, oldest first.
+
+    Only the hot audit_log table is read: cursors come from live streams and
+    are far newer than the archive horizon (audit_archive.py).
+
+    Returns:
+        The events, or None if the cursor is unknown or more than `limit` events follow it
+    """
+    found = conn.execute("SELECT updated_at FROM audit_log WHERE id = ?", [cursor]).fetchone()
+    if found is None:
+        return None
+    conditions = ["(updated_at > ? OR (updated_at = ? AND id > ?))"]
+    params = [found[0], found[0], cursor]
+    if client_ids is not None:
+        conditions.append("list_contains(?, client_id)")
+        params.append(sorted(client_ids))
+    rows = conn.execute(f"""
+        SELECT {EVENT_COLUMNS} FROM audit_log
+        WHERE {" AND ".join(conditions)}
+        ORDER BY updated_at, id
+        LIMIT ?
+    """, params + [limit + 1]).fetchall()
+    if len(rows) > limit:
+        return None
+    return [change_event(row) for row in rows]
+
+
+class Subscription:
+    """One open stream: its client filter and bounded event queue."""
+
+    def __init__(self, client_ids: Optional[FrozenSet[str]], loop: asyncio.AbstractEventLoop):
+        self.client_ids = client_ids
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, event: dict) -> bool:
+        return self.client_ids is None or event["client_id"] in self.client_ids
+
+    def deliver(self, events: List[dict]):
+        """Queue events on the stream's loop; marks the stream overflowed when its queue is full."""
+        for event in events:
+            if not self.wants(event):
+                continue
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.overflowed = True
+                return
+
+
+class ChangeFeed:
+    """Bounded buffer of recent change events, fanned out to subscriptions."""
+
+    def __init__(self, size: int = BUFFER_SIZE):
+        self._buffer: Deque[dict] = deque(maxlen=size)
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def publish(self, events: List[dict]):
+        """Append events to the buffer and hand them to every stream (safe from any thread)."""
+        if not events:
+            return
+        with self._lock:
+            self._buffer.extend(events)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, events)
+            except RuntimeError:  # the stream's loop has shut down
+                self.unsubscribe(subscription)
+
+    def subscribe(self, client_ids: Optional[FrozenSet[str]] = None) -> Subscription:
+        subscription = Subscription(client_ids, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def since(self, cursor: str, client_ids: Optional[FrozenSet[str]] = None) -> Optional[List[dict]]:
+        """Buffered events after `cursor`, or None if the cursor is no longer buffered."""
+        with self._lock:
+            events = list(self._buffer)
+        for index in range(len(events) - 1, -1, -1):
+            if events[index]["id"] == cursor:
+                return [event for event in events[index + 1:]
+                        if client_ids is None or event["client_id"] in client_ids]
+        return None
+
+
+feed = ChangeFeed()
+
+
+def resume(change_feed: ChangeFeed, open_db: Callable, cursor: str,
+           client_ids: Optional[FrozenSet[str]]) -> Optional[List[dict]]:
+    """Events after `cursor` from the buffer, falling back to audit_log (None means reset)."""
+    events = change_feed.since(cursor, client_ids)
+    if events is not None:
+        return events
+    conn = open_db()
+    try:
+        return events_after(conn, cursor, client_ids)
+    finally:
+        conn.close()
+
+
+def sse_message(event: str, data: dict, event_id: Optional[str] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id else []
+    lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+async def event_stream(change_feed: ChangeFeed, open_db: Callable, cursor: Optional[str] = None,
+                       client_ids: Optional[FrozenSet[str]] = None):
+    """
+    SSE body: replay after `cursor`, then live events until STREAM_SECONDS.
+
+    Args:
+        change_feed: Feed to subscribe to
+        open_db: Returns a read connection, used only to replay cursors older than the buffer
+        cursor: Last audit id the client has seen (None to start with live events)
+        client_ids: Only send changes to these clients (None for all)
+    """
+    # Subscribe before replaying so nothing published in between is missed
+    subscription = change_feed.subscribe(client_ids)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STREAM_SECONDS
+    replayed: Set[str] = set()
+    resume_from = cursor
+    try:
+        yield f"retry: {RECONNECT_MS}\n\n"
+        while True:
+            if resume_from is not None:
+                try:
+                    events = await run_db(INTERACTIVE, resume, change_feed, open_db, resume_from, client_ids)
+                except Overloaded:
+                    # The database pool is saturated: EventSource reconnects with the cursor after RECONNECT_MS
+                    return
+                resume_from = None
+                if events is None:
+                    yield sse_message("reset", {"cursor": cursor})
+                for event in events or ():
+                    replayed.add(event["id"])
+                    cursor = event["id"]
+                    yield sse_message("change", event, cursor)
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), min(KEEPALIVE_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            if subscription.overflowed:
+                # Fell behind: drop the queue and catch up from the last event sent
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.overflowed = False
+                if cursor is None:
+                    yield sse_message("reset", {"cursor": None})
+                else:
+                    resume_from = cursor
+                continue
+            if event["id"] in replayed:
+                continue
+            cursor = event["id"]
+            yield sse_message("change", event, cursor)
+    finally:
+        change_feed.unsubscribe(subscription)
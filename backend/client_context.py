@@ -0,0 +1,262 @@
+"""
+Single-query client context shared by the per-client consulting endpoints.
+
+The peer assessment, Navigator Scorecard, peer comparison, distribution and
+regional benchmark endpoints all need the same plan row plus aggregates over
+its cohorts. `load_client_context` gets all of it from one DuckDB query: the
+plan row (on its own result row) and the numeric columns of its whole
+industry, from which NumPy derives every cohort's aggregates:
+
+- industry: same industry nationwide, excluding the plan
+- state:    same industry and state, excluding the plan
+- region:   same industry and census region, including the plan (the whole
+            industry when the plan's state has no region)
+
+Expressing those aggregates in SQL (~50 filtered aggregates) cost more to plan
+than the scan itself, so the query stays a plain scan of the industry.
+
+Contexts are memoized for the life of a request (`request_cache_middleware`),
+so a composite page that renders several panels for one client costs a single
+round trip.
+"""
+import contextvars
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# State to Region mapping
+STATE_REGIONS = {
+    'CT': 'Northeast', 'ME': 'Northeast', 'MA': 'Northeast', 'NH': 'Northeast', 'RI': 'Northeast', 'VT': 'Northeast', 'NJ': 'Northeast', 'NY': 'Northeast', 'PA': 'Northeast',
+    'IL': 'Midwest', 'IN': 'Midwest', 'MI': 'Midwest', 'OH': 'Midwest', 'WI': 'Midwest', 'IA': 'Midwest', 'KS': 'Midwest', 'MN': 'Midwest', 'MO': 'Midwest', 'NE': 'Midwest', 'ND': 'Midwest', 'SD': 'Midwest',
+    'DE': 'South', 'FL': 'South', 'GA': 'South', 'MD': 'South', 'NC': 'South', 'SC': 'South', 'VA': 'South', 'DC': 'South', 'WV': 'South', 'AL': 'South', 'KY': 'South', 'MS': 'South', 'TN': 'South', 'AR': 'South', 'LA': 'South', 'OK': 'South', 'TX': 'South',
+    'AZ': 'West', 'CO': 'West', 'ID': 'West', 'MT': 'West', 'NV': 'West', 'NM': 'West', 'UT': 'West', 'WY': 'West', 'AK': 'West', 'CA': 'West', 'HI': 'West', 'OR': 'West', 'WA': 'West'
+}
+
+# Distribution charts: source column, value used for NULL, display scale (rates in
+# percent) and histogram bins
+DISTRIBUTION_METRICS = {
+    "contribution": {
+        "title": "Employer Contribution Distribution",
+        "unit": "%",
+        "field": "match_effective_rate",
+        "client_default": 4.5,
+        "null_value": 0.0,
+        "scale": 100,
+        "bins": [
+            {"bin": "1%", "binStart": 1.0, "binEnd": 2.0},
+            {"bin": "2%", "binStart": 2.0, "binEnd": 3.0},
+            {"bin": "3%", "binStart": 3.0, "binEnd": 4.0},
+            {"bin": "4%", "binStart": 4.0, "binEnd": 5.0},
+            {"bin": "5%", "binStart": 5.0, "binEnd": 6.0},
+            {"bin": "6%", "binStart": 6.0, "binEnd": 7.0},
+            {"bin": "7%", "binStart": 7.0, "binEnd": 8.0},
+            {"bin": "8%", "binStart": 8.0, "binEnd": 9.0},
+            {"bin": "9%", "binStart": 9.0, "binEnd": 10.0},
+            {"bin": "≥10%", "binStart": 10.0, "binEnd": 9999.0}
+        ],
+    },
+    "auto_enroll": {
+        "title": "Auto-Enrollment Default Rate",
+        "unit": "%",
+        "field": "auto_enrollment_rate",
+        "client_default": 4.0,
+        "null_value": 0.0,
+        "scale": 100,
+        "bins": [
+            {"bin": "0%", "binStart": 0.0, "binEnd": 1.0},
+            {"bin": "2%", "binStart": 2.0, "binEnd": 2.5},
+            {"bin": "3%", "binStart": 3.0, "binEnd": 3.5},
+            {"bin": "4%", "binStart": 4.0, "binEnd": 4.5},
+            {"bin": "5%", "binStart": 5.0, "binEnd": 5.5},
+            {"bin": "6%", "binStart": 6.0, "binEnd": 6.5},
+            {"bin": "≥7%", "binStart": 7.0, "binEnd": 9999.0}
+        ],
+    },
+    "vesting": {
+        "title": "Vesting Schedule Distribution",
+        "unit": "years",
+        # vesting_years is parsed from vesting_schedule at import/update time
+        # (graded schedules count as their full-vesting year; unknown -> 3-year default)
+        "field": "vesting_years",
+        "client_default": None,
+        "null_value": 3.0,
+        "scale": 1,
+        "bins": [
+            {"bin": "Immediate", "binStart": 0.0, "binEnd": 1.0},
+            {"bin": "1-2 years", "binStart": 1.0, "binEnd": 3.0},
+            {"bin": "3-year cliff", "binStart": 3.0, "binEnd": 5.0},
+            {"bin": "5-year cliff", "binStart": 5.0, "binEnd": 6.0},
+            {"bin": "Graded", "binStart": 6.0, "binEnd": 9999.0}
+        ],
+    },
+    "auto_escalation": {
+        "title": "Auto-Escalation Cap Distribution",
+        "unit": "%",
+        "field": "auto_escalation_cap",
+        "client_default": 10.0,
+        "null_value": 0.0,
+        "scale": 100,
+        "bins": [
+            {"bin": "0%", "binStart": 0.0, "binEnd": 1.0},
+            {"bin": "6%", "binStart": 6.0, "binEnd": 8.0},
+            {"bin": "10%", "binStart": 10.0, "binEnd": 12.0},
+            {"bin": "15%", "binStart": 15.0, "binEnd": 16.0},
+            {"bin": "≥20%", "binStart": 20.0, "binEnd": 9999.0}
+        ],
+    },
+}
+
+# Regional benchmark rows: median and top quartile (in percent) over the region cohort
+REGIONAL_METRICS = ("auto_enrollment_rate", "match_effective_rate", "auto_escalation_cap")
+
+# Numeric cohort columns fetched for every plan in the industry (as DOUBLE, NaN for NULL)
+COHORT_COLUMNS = (
+    "match_effective_rate", "match_max_rate", "auto_enrollment_rate",
+    "auto_escalation_cap", "vesting_years",
+)
+
+
+def context_sql(relation: str = "plan_designs") -> str:
+    """The context query over a plans relation (plan_designs, or a registered as-of cohort)."""
+    # The plan row travels in the same result, on its own row only
+    return f"""
+    WITH target AS (
+        SELECT * FROM {relation} WHERE client_id = ?
+    )
+    SELECT
+        CASE WHEN p.client_id = t.client_id THEN t END AS client,
+        p.client_id = t.client_id AS is_self,
+        p.state,
+        {", ".join(f"CAST(p.{column} AS DOUBLE) AS {column}" for column in COHORT_COLUMNS)}
+    FROM {relation} p
+    JOIN target t ON p.industry = t.industry
+"""
+
+
+CLIENT_CONTEXT_SQL = context_sql()
+
+
+def _floats(column) -> np.ndarray:
+    return np.ma.filled(np.ma.asarray(column).astype(float), np.nan)
+
+
+def _median(values: np.ndarray) -> Optional[float]:
+    """Median of the non-NULL values (mean of the middle pair), None if there are none."""
+    values = np.sort(values[~np.isnan(values)])
+    n = len(values)
+    if not n:
+        return None
+    return float((values[(n - 1) // 2] + values[n // 2]) / 2)
+
+
+def _mean(values: np.ndarray) -> Optional[float]:
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if len(values) else None
+
+
+def _distributions(columns: Dict[str, np.ndarray], mask: np.ndarray) -> Dict[str, Dict[str, Any]]:
+    """Histogram bin counts and value totals for every distribution metric."""
+    shaped = {}
+    for metric, spec in DISTRIBUTION_METRICS.items():
+        values = columns[spec["field"]][mask]
+        values = np.where(np.isnan(values), spec["null_value"], values) * spec["scale"]
+        shaped[metric] = {
+            "counts": [int(np.count_nonzero((values >= b["binStart"]) & (values < b["binEnd"]))) for b in spec["bins"]],
+            "total": float(np.sum(values)),
+        }
+    return shaped
+
+
+def _regional_benchmarks(columns: Dict[str, np.ndarray], mask: np.ndarray) -> Dict[str, tuple]:
+    """Nearest-rank median (values[n // 2]) and top quartile (values[int(n * 0.75)]) in percent."""
+    benchmarks = {}
+    for column in REGIONAL_METRICS:
+        values = columns[column][mask]
+        values = np.sort(values[~np.isnan(values)] * 100)
+        n = len(values)
+        benchmarks[column] = (float(values[n // 2]), float(values[int(n * 0.75)])) if n else (0, 0)
+    return benchmarks
+
+
+# Request-scoped memo; a mutable dict so handlers running in the threadpool
+# (which receive a copy of the context) share it with the rest of the request
+_request_cache: contextvars.ContextVar[Optional[Dict[Any, Any]]] = contextvars.ContextVar(
+    "planwise_request_cache", default=None
+)
+
+
+async def request_cache_middleware(request, call_next):
+    """Give each request an empty memo for `load_client_context`."""
+    token = _request_cache.set({})
+    try:
+        return await call_next(request)
+    finally:
+        _request_cache.reset(token)
+
+
+def load_client_context(conn, client_id: str, relation: str = "plan_designs") -> Optional[Dict[str, Any]]:
+    """
+    Fetch a plan and its cohort aggregates in one query (memoized per request).
+
+    `relation` replaces plan_designs, e.g. with an as-of cohort registered on
+    the connection (plan_history.py).
+
+    Returns:
+        None if the client does not exist, else a dictionary with:
+        client (the plan_designs row), region (census region or None),
+        industry {cohort_size, median_match, median_ae_rate, median_match_rate,
+        avg_ae_rate, distributions}, state {cohort_size, distributions} and
+        region_cohort {cohort_size, benchmarks: {column: (median, p75)}}.
+        Distributions map metric -> {counts per bin, total of values}.
+    """
+    cache = _request_cache.get()
+    key = ("client_context", client_id, relation)
+    if cache is not None and key in cache:
+        return cache[key]
+
+    sql = CLIENT_CONTEXT_SQL if relation == "plan_designs" else context_sql(relation)
+    result = conn.execute(sql, [client_id]).fetchnumpy()
+    is_self = np.ma.filled(np.ma.asarray(result["is_self"]), False).astype(bool)
+    if not is_self.any():
+        context = None
+    else:
+        client = result["client"][int(np.flatnonzero(is_self)[0])]
+        columns = {column: _floats(result[column]) for column in COHORT_COLUMNS}
+        columns["match_rate"] = np.where(
+            np.isnan(columns["match_effective_rate"]), columns["match_max_rate"], columns["match_effective_rate"]
+        )
+        states = np.ma.filled(np.ma.asarray(result["state"]).astype(object), None)
+
+        state = client.get("state")
+        region = STATE_REGIONS.get(state)
+        industry_mask = ~is_self
+        state_mask = industry_mask & (states == state) if state is not None else np.zeros_like(is_self)
+        if region is None:
+            region_mask = np.ones_like(is_self)
+        else:
+            region_mask = np.isin(states, [s for s, r in STATE_REGIONS.items() if r == region])
+
+        context = {
+            "client": client,
+            "region": region,
+            "industry": {
+                "cohort_size": int(industry_mask.sum()),
+                "median_match": _median(columns["match_rate"][industry_mask]),
+                "median_ae_rate": _median(columns["auto_enrollment_rate"][industry_mask]),
+                "median_match_rate": _median(columns["match_effective_rate"][industry_mask]),
+                "avg_ae_rate": _mean(columns["auto_enrollment_rate"][industry_mask]),
+                "distributions": _distributions(columns, industry_mask),
+            },
+            "state": {
+                "cohort_size": int(state_mask.sum()),
+                "distributions": _distributions(columns, state_mask),
+            },
+            "region_cohort": {
+                "cohort_size": int(region_mask.sum()),
+                "benchmarks": _regional_benchmarks(columns, region_mask),
+            },
+        }
+
+    if cache is not None:
+        cache[key] = context
+    return context
@@ -0,0 +1,172 @@
+"""
+Multi-worker deployment: N read-only API workers in front of one writer.
+
+Only one process can open planwise.db for writing, and while it does no other
+process can open it at all, so uvicorn --workers cannot simply be raised.
+`python -m backend.cluster` runs instead:
+
+- one writer (PLANWISE_ROLE=writer, bound to 127.0.0.1): the only process that
+  opens planwise.db. It applies every edit, serves the change feed, runs the
+  scorecard snapshot worker and publishes read replicas (replica.py)
+- N readers (PLANWISE_ROLE=reader, `uvicorn --workers N` on the public port):
+  serve reads from the latest replica and forward the rest to the writer
+
+Readers never open planwise.db. They coordinate with the writer through the
+replica pointer file, a version-stamped JSON file that the writer atomically
+replaces when it publishes a replica and after every edit. Readers stat it on
+each request and reload it when it changes. A reader forwards a request to the
+writer when it:
+
+- changes data (PATCH/PUT/DELETE, or a POST other than the read-only
+  /compare and /export/excel)
+- opens the change feed, whose events live in the writer's memory
+- reads a client edited since the replica was taken, or finds the replica
+  older than PLANWISE_REPLICA_MAX_LAG (or not published yet)
+
+Readers run with PLANWISE_SNAPSHOTS=0, because the writer holds the snapshot
+sidecar open. They compute peer assessments and scorecards from the replica.
+
+    python -m backend.cluster --readers 4 --port 8002
+"""
+import argparse
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import httpx
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+DEFAULT_WRITER_URL = "http://127.0.0.1:8003"
+# POST routes that only read
+READ_ONLY_POSTS = {"/api/v1/compare", "/api/v1/export/excel"}
+# Served from the writer's memory
+WRITER_PATHS = {"/api/v1/changes/stream"}
+# Not forwarded in either direction
+HOP_HEADERS = {"host", "connection", "keep-alive", "content-length", "transfer-encoding", "upgrade"}
+
+_CLIENT_PATH = re.compile(r"^/api/v1/clients/([^/]+)")
+
+_writer_client: Optional[httpx.AsyncClient] = None
+
+
+def writer_url() -> str:
+    return os.environ.get("PLANWISE_WRITER_URL", DEFAULT_WRITER_URL)
+
+
+def request_client_id(request: Request) -> Optional[str]:
+    """Client a request reads, from the path or a `client_id` filter (None if not client-specific)."""
+    match = _CLIENT_PATH.match(request.url.path)
+    return match.group(1) if match else request.query_params.get("client_id")
+
+
+def must_forward(request: Request, replicas) -> bool:
+    """
+    Whether a reader has to hand this request to the writer.
+
+    When a read is served locally, the replica it was checked against is left on
+    request.state.replica. The middleware pins it, so the request's reads open
+    that file even if it goes stale meanwhile.
+    """
+    method, path = request.method, request.url.path
+    if method == "OPTIONS":  # CORS preflight, answered locally
+        return False
+    if method in ("PATCH", "PUT", "DELETE") or (method == "POST" and path not in READ_ONLY_POSTS):
+        return True
+    if path in WRITER_PATHS or replicas is None:
+        return True
+    # The replica is too old, missing, or older than the client's last edit
+    replica = replicas.reader_path(request_client_id(request))
+    if replica == replicas.db_path:
+        return True
+    request.state.replica = replica
+    return False
+
+
+def writer_client() -> httpx.AsyncClient:
+    global _writer_client
+    if _writer_client is None:
+        # No read timeout: the change feed streams for minutes
+        _writer_client = httpx.AsyncClient(base_url=writer_url(), timeout=httpx.Timeout(30.0, read=None))
+    return _writer_client
+
+
+async def forward(request: Request) -> Response:
+    """Proxy a request to the writer, streaming its response back."""
+    client = writer_client()
+    upstream = client.build_request(
+        request.method,
+        httpx.URL(path=request.url.path, query=request.url.query.encode()),
+        headers=[(key, value) for key, value in request.headers.raw if key.decode().lower() not in HOP_HEADERS],
+        content=await request.body(),
+    )
+    try:
+        response = await client.send(upstream, stream=True)
+    except httpx.HTTPError as e:
+        return JSONResponse(status_code=503, content={"detail": f"Writer unavailable: {e}"})
+    headers = {key: value for key, value in response.headers.items() if key.lower() not in HOP_HEADERS}
+    headers["X-Served-By"] = "writer"
+    return StreamingResponse(response.aiter_raw(), status_code=response.status_code, headers=headers,
+                             background=BackgroundTask(response.aclose))
+
+
+def _wait_for(url: str, process: subprocess.Popen, timeout: float = 60.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            httpx.get(url, timeout=1.0)
+            return True
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API as one writer plus N read-only workers")
+    parser.add_argument("--readers", type=int, default=os.cpu_count() or 2, help="Reader processes (default: CPU count)")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface the readers listen on")
+    parser.add_argument("--port", type=int, default=8002, help="Public port (readers)")
+    parser.add_argument("--writer-port", type=int, default=8003, help="Writer port, bound to 127.0.0.1")
+    args = parser.parse_args()
+
+    uvicorn = [sys.executable, "-m", "uvicorn", "backend.main:app"]
+    writer_address = f"http://127.0.0.1:{args.writer_port}"
+    writer = subprocess.Popen(
+        uvicorn + ["--host", "127.0.0.1", "--port", str(args.writer_port)],
+        env={**os.environ, "PLANWISE_ROLE": "writer"}
+    )
+    if not _wait_for(f"{writer_address}/api/v1/health", writer):
+        writer.terminate()
+        print("\n❌ Writer failed to start", file=sys.stderr)
+        sys.exit(1)
+    print(f"✓ Writer listening on {writer_address}")
+
+    readers = subprocess.Popen(
+        uvicorn + ["--host", args.host, "--port", str(args.port), "--workers", str(args.readers)],
+        env={**os.environ, "PLANWISE_ROLE": "reader", "PLANWISE_WRITER_URL": writer_address,
+             "PLANWISE_SNAPSHOTS": "0"}
+    )
+    print(f"✓ {args.readers} readers listening on http://{args.host}:{args.port}")
+
+    # Stop both services on SIGTERM too, not just Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        while writer.poll() is None and readers.poll() is None:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in (readers, writer):
+            process.terminate()
+        for process in (readers, writer):
+            process.wait(timeout=30)
+    sys.exit(max(writer.returncode or 0, readers.returncode or 0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Multi-client comparison matrix for POST /api/v1/compare.
+
+Consultants compare 10-50 plans side by side. Instead of one client and one
+peer-assessment request per plan, the matrix is built from a single query that
+returns the selected plans together with their industry cohorts, followed by a
+vectorized NumPy ranking step:
+
+- percentiles use calculate_percentile's definition (% of valid peers strictly
+  below the plan), peers being the same industry minus the plan itself
+- status is "above" / "median" / "below" relative to the peer median
+- booleans rank as 0/1, so a plan with a feature sits above every peer without it
+
+`comparison_to_arrow()` serialises the matrix as an Arrow IPC stream when
+pyarrow is installed (optional dependency).
+"""
+import io
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Lever name -> SQL expression (cast to DOUBLE so every lever shares one matrix dtype)
+COMPARE_LEVERS = {
+    "employee_count": "CAST(employee_count AS DOUBLE)",
+    "match_rate": "CAST(COALESCE(match_effective_rate, match_max_rate) AS DOUBLE)",
+    "match_deferral_cap": "CAST(match_deferral_cap AS DOUBLE)",
+    "match_true_up": "CAST(match_true_up AS DOUBLE)",
+    "auto_enrollment_enabled": "CAST(auto_enrollment_enabled AS DOUBLE)",
+    "auto_enrollment_rate": "CAST(auto_enrollment_rate AS DOUBLE)",
+    "auto_escalation_enabled": "CAST(auto_escalation_enabled AS DOUBLE)",
+    "auto_escalation_cap": "CAST(auto_escalation_cap AS DOUBLE)",
+    "vesting_years": "CAST(vesting_years AS DOUBLE)",
+}
+
+MAX_COMPARE_CLIENTS = 100
+
+
+def fetch_cohorts(conn, client_ids: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Fetch the selected plans and every industry peer in one query.
+
+    Rows come back ordered by cohort (a dense integer per industry) so each
+    cohort is a contiguous slice for the ranking step.
+    """
+    lever_sql = ",\n            ".join(f"{expr} AS {name}" for name, expr in COMPARE_LEVERS.items())
+    return conn.execute(f"""
+        WITH selected AS (
+            SELECT client_id, industry FROM plan_designs
+            WHERE client_id IN (SELECT unnest(?::VARCHAR[]))
+        )
+        SELECT
+            client_id,
+            client_name,
+            industry,
+            client_id IN (SELECT client_id FROM selected) AS selected,
+            DENSE_RANK() OVER (ORDER BY industry) AS cohort,
+            {lever_sql}
+        FROM plan_designs
+        WHERE industry IN (SELECT industry FROM selected)
+        ORDER BY cohort
+    """, [client_ids]).fetchnumpy()
+
+
+def _as_float(column) -> np.ndarray:
+    """NumPy column (masked where NULL) -> float array with NaN for NULL."""
+    return np.ma.filled(np.ma.asarray(column).astype(float), np.nan)
+
+
+def rank_matrix(values: np.ndarray, cohorts: np.ndarray, selected: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Rank selected rows against their cohort, one lever (column) at a time.
+
+    Args:
+        values: (rows, levers) float matrix, NaN for NULL
+        cohorts: Cohort id per row, ascending (rows are grouped by cohort)
+        selected: Row indexes being compared
+
+    Returns:
+        Dictionary of (len(selected), levers) arrays: percentiles, peer_medians,
+        plus cohort_sizes per selected row
+    """
+    n_selected, n_levers = len(selected), values.shape[1]
+    percentiles = np.full((n_selected, n_levers), np.nan)
+    medians = np.full((n_selected, n_levers), np.nan)
+    cohort_sizes = np.zeros(n_selected, dtype=int)
+
+    selected_cohorts = cohorts[selected]
+    for cohort in np.unique(selected_cohorts):
+        lo, hi = np.searchsorted(cohorts, [cohort, cohort + 1])
+        out = np.flatnonzero(selected_cohorts == cohort)
+        cohort_sizes[out] = hi - lo - 1
+
+        for j in range(n_levers):
+            column = values[lo:hi, j]
+            peers = np.sort(column[~np.isnan(column)])
+            targets = values[selected[out], j]
+            valid = ~np.isnan(targets)
+
+            # The plan's own value is in `peers`; it is never below itself, so
+            # only the peer count and the median need correcting for it
+            n_peers = len(peers) - valid
+            below = np.searchsorted(peers, targets, side="left")
+            ok = valid & (n_peers > 0)
+            percentiles[out[ok], j] = below[ok] / n_peers[ok] * 100
+
+            # Median of `peers` with one instance of the target removed:
+            # order statistic k of the reduced array is peers[k + (k >= position)]
+            has_peers = n_peers > 0
+            k_lo, k_hi = (n_peers - 1) // 2, n_peers // 2
+            shift_lo = (valid & (k_lo >= below)).astype(int)
+            shift_hi = (valid & (k_hi >= below)).astype(int)
+            idx_lo = np.clip(k_lo + shift_lo, 0, max(len(peers) - 1, 0))
+            idx_hi = np.clip(k_hi + shift_hi, 0, max(len(peers) - 1, 0))
+            if len(peers):
+                medians[out[has_peers], j] = ((peers[idx_lo] + peers[idx_hi]) / 2)[has_peers]
+
+    return {"percentiles": percentiles, "peer_medians": medians, "cohort_sizes": cohort_sizes}
+
+
+def _status(values: np.ndarray, medians: np.ndarray) -> np.ndarray:
+    status = np.where(values > medians, "above", np.where(values < medians, "below", "median")).astype(object)
+    status[np.isnan(values) | np.isnan(medians)] = None
+    return status
+
+
+def _clean(matrix: np.ndarray, digits: Optional[int] = None) -> list:
+    """Matrix -> nested lists with NaN as None (JSON has no NaN)."""
+    def cell(v):
+        if v is None or (isinstance(v, float) and math.isnan(v)):
+            return None
+        return round(float(v), digits) if digits is not None else v
+    return [[cell(v) for v in row] for row in matrix.tolist()]
+
+
+def build_comparison(conn, client_ids: List[str]) -> Dict:
+    """
+    Build the comparison matrix for `client_ids` (order kept, duplicates dropped).
+
+    Returns:
+        Dictionary with levers, clients (id, name, industry, cohort_size) and
+        row-per-client matrices: values, percentiles, peer_medians, status;
+        plus missing (requested ids not found)
+    """
+    requested = list(dict.fromkeys(client_ids))
+    columns = fetch_cohorts(conn, requested)
+
+    ids = columns["client_id"]
+    is_selected = np.ma.filled(np.ma.asarray(columns["selected"]), False).astype(bool)
+    position = {cid: i for i, cid in zip(np.flatnonzero(is_selected), ids[is_selected])}
+    found = [cid for cid in requested if cid in position]
+    selected = np.array([position[cid] for cid in found], dtype=int)
+
+    levers = list(COMPARE_LEVERS)
+    values = np.column_stack([_as_float(columns[name]) for name in levers]) if len(ids) else np.empty((0, len(levers)))
+    cohorts = np.asarray(columns["cohort"], dtype=np.int64)
+    ranked = rank_matrix(values, cohorts, selected)
+
+    selected_values = values[selected]
+    return {
+        "levers": levers,
+        "clients": [
+            {
+                "client_id": cid,
+                "client_name": columns["client_name"][row],
+                "industry": columns["industry"][row],
+                "cohort_size": int(size),
+            }
+            for cid, row, size in zip(found, selected, ranked["cohort_sizes"])
+        ],
+        "values": _clean(selected_values),
+        "percentiles": _clean(ranked["percentiles"], 1),
+        "peer_medians": _clean(ranked["peer_medians"]),
+        "status": _status(selected_values, ranked["peer_medians"]).tolist(),
+        "missing": [cid for cid in requested if cid not in position],
+    }
+
+
+def comparison_to_arrow(comparison: Dict) -> bytes:
+    """
+    Serialise a comparison as an Arrow IPC stream, one row per client.
+
+    Columns: client_id, client_name, industry, cohort_size, then for every
+    lever `<lever>`, `<lever>_percentile`, `<lever>_peer_median`, `<lever>_status`.
+
+    Raises:
+        ImportError: pyarrow is not installed
+    """
+    import pyarrow as pa
+
+    clients = comparison["clients"]
+    data = {key: [c[key] for c in clients] for key in ("client_id", "client_name", "industry", "cohort_size")}
+    for j, lever in enumerate(comparison["levers"]):
+        data[lever] = pa.array([row[j] for row in comparison["values"]], type=pa.float64())
+        data[f"{lever}_percentile"] = pa.array([row[j] for row in comparison["percentiles"]], type=pa.float64())
+        data[f"{lever}_peer_median"] = pa.array([row[j] for row in comparison["peer_medians"]], type=pa.float64())
+        data[f"{lever}_status"] = pa.array([row[j] for row in comparison["status"]], type=pa.string())
+    table = pa.table(data)
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
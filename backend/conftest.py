@@ -0,0 +1,40 @@
+"""
+Shared fixtures for the API tests: synthetic databases and a client wired to one
+"""
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "database"))
+
+from synthetic_data import generate_database
+from backend import main as api
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    """Factory: generate a synthetic database in tmp_path and return its path."""
+    def make(rows: int = 50, seed: int = 1, audit_per_plan: float = 0) -> Path:
+        db_path = tmp_path / "planwise.db"
+        generate_database(str(db_path), rows=rows, seed=seed, audit_per_plan=audit_per_plan)
+        return db_path
+    return make
+
+
+@pytest.fixture
+def make_client(make_db, monkeypatch):
+    """
+    Factory: generate a synthetic database, point the API at it and return a TestClient.
+
+    The database path is api.DB_PATH. Pass snapshots=False to serve scorecards
+    live (PLANWISE_SNAPSHOTS=0).
+    """
+    def make(rows: int = 50, seed: int = 1, audit_per_plan: float = 0, snapshots: bool = True) -> TestClient:
+        monkeypatch.setattr(api, "DB_PATH", make_db(rows, seed, audit_per_plan))
+        if not snapshots:
+            monkeypatch.setenv("PLANWISE_SNAPSHOTS", "0")
+        return TestClient(api.app)
+    return make
@@ -0,0 +1,261 @@
+"""
+Bounded executor for blocking DuckDB and pandas work, plus an event-loop lag monitor.
+
+Handlers that touch the database are plain `def` functions. `DatabaseRoute`
+runs them on a dedicated thread pool rather than anyio's shared threadpool. The
+event loop itself never runs a query, so a slow export can't stall the change
+feed, the metrics endpoint or the forwarding done by reader workers.
+
+Each route belongs to a class with its own concurrency limit:
+
+- interactive (default): single-client reads and edits
+  PLANWISE_DB_INTERACTIVE concurrent calls (default 8)
+- bulk: cohort-wide scans and exports (BULK_ROUTES)
+  PLANWISE_DB_BULK concurrent calls (default 2)
+
+The pool has exactly interactive + bulk threads. Bulk work therefore never
+takes a thread an interactive request is waiting for. A call over its class's
+limit waits on the loop, which costs no thread while it waits. The wait is
+bounded: at most PLANWISE_DB_<CLASS>_QUEUE calls may wait (bulk 4, interactive
+64), each for at most PLANWISE_DB_QUEUE_TIMEOUT seconds (default 10). Past either
+bound the request gets 429 Too Many Requests. Its Retry-After is estimated
+from the recent call duration of the class. Queue waits, queue depth and
+rejections are exported as metrics. Async code that needs the database awaits
+`run_db(route_class, fn, ...)`, the facade the route class uses too.
+
+`monitor_loop_lag` measures how late the event loop wakes from a timed sleep.
+It records the delay in `planwise_event_loop_lag_seconds` and logs a warning
+above PLANWISE_LOOP_LAG_WARN_MS (default 100). A blocking call on the loop
+shows up there directly.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import math
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+
+try:
+    from backend.instrumentation import metrics
+    from backend.profiling import profiled
+except ImportError:  # started from backend/ as `uvicorn main:app`
+    from instrumentation import metrics
+    from profiling import profiled
+
+logger = logging.getLogger("planwise.event_loop")
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+DEFAULT_LIMITS = {INTERACTIVE: 8, BULK: 2}
+# Calls allowed to wait for a slot, beyond which requests are turned away
+DEFAULT_QUEUE_SIZES = {INTERACTIVE: 64, BULK: 4}
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 10.0
+# Weight of the newest call in the running mean duration behind Retry-After
+DURATION_SMOOTHING = 0.2
+# (method, path template) of handlers that scan the whole cohort or export it
+BULK_ROUTES = {
+    ("POST", "/api/v1/compare"),
+    ("POST", "/api/v1/export/excel"),
+    ("GET", "/api/v1/clients/{client_id}/distributions"),
+}
+# Handlers that never open the database keep anyio's threadpool, so they still answer when the pool is busy
+THREADPOOL_ROUTES = {
+    ("GET", "/"),
+    ("GET", "/api/v1/metrics"),
+    ("GET", "/api/v1/profiles/{profile_id}"),
+}
+
+LAG_INTERVAL_SECONDS = 0.5
+DEFAULT_LAG_WARN_MS = 100.0
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# asyncio semaphores belong to one event loop; TestClient starts a loop per client
+_admissions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Admission]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def concurrency_limit(route_class: str) -> int:
+    """Concurrent calls allowed for a route class (PLANWISE_DB_INTERACTIVE / PLANWISE_DB_BULK)."""
+    value = os.environ.get(f"PLANWISE_DB_{route_class.upper()}")
+    return max(1, int(value)) if value else DEFAULT_LIMITS[route_class]
+
+
+def queue_size(route_class: str) -> int:
+    """Calls of a route class allowed to wait for a slot (PLANWISE_DB_INTERACTIVE_QUEUE / PLANWISE_DB_BULK_QUEUE)."""
+    value = os.environ.get(f"PLANWISE_DB_{route_class.upper()}_QUEUE")
+    return max(0, int(value)) if value else DEFAULT_QUEUE_SIZES[route_class]
+
+
+def queue_timeout() -> float:
+    return float(os.environ.get("PLANWISE_DB_QUEUE_TIMEOUT", DEFAULT_QUEUE_TIMEOUT_SECONDS))
+
+
+def lag_warn_ms() -> float:
+    return float(os.environ.get("PLANWISE_LOOP_LAG_WARN_MS", DEFAULT_LAG_WARN_MS))
+
+
+def route_class_for(methods, path: str) -> Optional[str]:
+    """Route class of an endpoint, or None if it doesn't use the database executor."""
+    methods = set(methods or ("GET",))
+    if any((method, path) in THREADPOOL_ROUTES for method in methods):
+        return None
+    if any((method, path) in BULK_ROUTES for method in methods):
+        return BULK
+    return INTERACTIVE
+
+
+def executor() -> ThreadPoolExecutor:
+    """The shared database pool, sized to the sum of the route class limits."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = sum(concurrency_limit(route_class) for route_class in DEFAULT_LIMITS)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="planwise-db")
+        return _executor
+
+
+def shutdown_executor():
+    """Stop the pool after running calls finish (the next call starts a new one)."""
+    global _executor
+    with _executor_lock:
+        pool, _executor = _executor, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+class Overloaded(Exception):
+    """A route class's queue is full, or a call waited too long for a slot."""
+
+    def __init__(self, route_class: str, retry_after: int):
+        super().__init__(f"Too many {route_class} requests in progress; retry in {retry_after}s")
+        self.route_class = route_class
+        self.retry_after = retry_after
+
+
+class Admission:
+    """Concurrency limit of one route class on one event loop, with a bounded wait queue."""
+
+    def __init__(self, route_class: str):
+        self.route_class = route_class
+        self.limit = concurrency_limit(route_class)
+        self.queue_size = queue_size(route_class)
+        self.timeout = queue_timeout()
+        self.semaphore = asyncio.Semaphore(self.limit)
+        self.waiting = 0
+        # Running mean call duration, for Retry-After
+        self.mean_seconds = 1.0
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead of a new call has likely drained."""
+        return max(1, math.ceil(self.mean_seconds * (self.waiting + 1) / self.limit))
+
+    async def acquire(self):
+        """Take a slot, waiting in the queue if need be; raises Overloaded instead of waiting too long."""
+        if not self.semaphore.locked():
+            # A free slot (and nobody queued for it): taken without suspending
+            await self.semaphore.acquire()
+            metrics.observe_db_wait(self.route_class, 0.0)
+            return
+        if self.waiting >= self.queue_size:
+            metrics.db_call_rejected(self.route_class)
+            raise Overloaded(self.route_class, self.retry_after())
+        self.waiting += 1
+        metrics.db_wait_started(self.route_class)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            metrics.db_call_rejected(self.route_class)
+            raise Overloaded(self.route_class, self.retry_after()) from None
+        finally:
+            self.waiting -= 1
+            metrics.db_wait_finished(self.route_class)
+            metrics.observe_db_wait(self.route_class, time.perf_counter() - started)
+
+    def release(self, seconds: float):
+        self.mean_seconds += DURATION_SMOOTHING * (seconds - self.mean_seconds)
+        self.semaphore.release()
+
+
+def _admission(route_class: str) -> Admission:
+    loop = asyncio.get_running_loop()
+    admissions = _admissions.setdefault(loop, {})
+    if route_class not in admissions:
+        admissions[route_class] = Admission(route_class)
+    return admissions[route_class]
+
+
+async def run_db(route_class: str, fn: Callable, *args, **kwargs):
+    """
+    Run a blocking call on the database pool, within the route class's concurrency limit.
+
+    The call runs in a copy of the caller's context, so request stats, the
+    request cache and an active profile session see it.
+
+    Args:
+        route_class: INTERACTIVE or BULK
+        fn: Blocking function (DuckDB queries, pandas)
+
+    Raises:
+        Overloaded: The class's wait queue is full, or no slot freed up within PLANWISE_DB_QUEUE_TIMEOUT
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, functools.partial(fn, *args, **kwargs))
+    admission = _admission(route_class)
+    await admission.acquire()
+    metrics.db_call_started(route_class)
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(executor(), call)
+    finally:
+        metrics.db_call_finished(route_class)
+        admission.release(time.perf_counter() - started)
+
+
+def offloaded(endpoint: Callable, route_class: str) -> Callable:
+    """Async endpoint that runs a sync one on the database pool (429 when the pool is saturated)."""
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await run_db(route_class, endpoint, *args, **kwargs)
+        except Overloaded as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    return wrapper
+
+
+class DatabaseRoute(APIRoute):
+    """
+    APIRoute that runs sync endpoints on the database pool (async ones stay on the loop).
+
+    Endpoints can also be sampled on demand with ?profile=1 (profiling.py). The
+    profiler samples whichever thread runs the endpoint.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        endpoint = profiled(endpoint)
+        route_class = route_class_for(kwargs.get("methods"), path)
+        if route_class is not None and not asyncio.iscoroutinefunction(endpoint):
+            endpoint = offloaded(endpoint, route_class)
+        super().__init__(path, endpoint, **kwargs)
+
+
+async def monitor_loop_lag(interval: float = LAG_INTERVAL_SECONDS):
+    """Record how late the event loop wakes from an `interval` sleep, until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - started - interval)
+        metrics.observe_loop_lag(lag)
+        if lag * 1000 >= lag_warn_ms():
+            logger.warning("Event loop blocked for %.1f ms", lag * 1000)
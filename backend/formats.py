@@ -0,0 +1,76 @@
+"""
+Columnar and pre-serialized response formats for list and export endpoints.
+
+Building a Pydantic model (or dict) per row dominates CPU time on large
+responses, so row-heavy endpoints bypass it:
+
+- Arrow IPC: clients sending `Accept: application/vnd.apache.arrow.stream`
+  get DuckDB's record batches written straight into an IPC stream (requires
+  the optional pyarrow package; 406 without it)
+- Fast JSON: DuckDB serialises the rows itself (`to_json` over an ordered list
+  of row structs) and the handler returns the bytes untouched
+"""
+import io
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_BATCH_ROWS = 65_536
+
+
+def wants_arrow(request) -> bool:
+    """True when the client's Accept header asks for an Arrow IPC stream."""
+    return ARROW_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def arrow_response(conn, sql: str, params: list = None) -> Response:
+    """
+    Run `sql` and return its result as an Arrow IPC stream response.
+
+    Batches are written as DuckDB produces them; no Python row objects are built.
+
+    Raises:
+        HTTPException: 406 when pyarrow is not installed
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(status_code=406, detail="Arrow output requires pyarrow to be installed")
+
+    conn.execute(sql, params or [])
+    # to_arrow_reader replaced fetch_record_batch in DuckDB 1.4
+    read_batches = getattr(conn, "to_arrow_reader", None) or conn.fetch_record_batch
+    reader = read_batches(ARROW_BATCH_ROWS)
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+    return Response(content=sink.getvalue(), media_type=ARROW_MEDIA_TYPE)
+
+
+def json_rows_response(conn, sql: str, params: list = None, order_by: str = None) -> Response:
+    """
+    Run `sql` and return its rows as a JSON array of objects serialised by DuckDB.
+
+    Args:
+        conn: DuckDB connection
+        sql: Row query; its column names become the JSON keys
+        params: Query parameters
+        order_by: Column(s) to order the array by (aggregation does not keep
+            the subquery's ORDER BY)
+    """
+    order = f" ORDER BY {', '.join(f'r.{c.strip()}' for c in order_by.split(','))}" if order_by else ""
+    payload = conn.execute(
+        f"SELECT COALESCE(CAST(to_json(list(r{order})) AS VARCHAR), '[]') FROM ({sql}) r",
+        params or []
+    ).fetchone()[0]
+    return Response(content=payload.encode(), media_type="application/json")
+
+
+def negotiated_rows_response(request, conn, sql: str, params: list = None, order_by: str = None) -> Response:
+    """Arrow IPC if the client asks for it, otherwise pre-serialised JSON."""
+    if wants_arrow(request):
+        return arrow_response(conn, sql, params)
+    return json_rows_response(conn, sql, params, order_by)
@@ -0,0 +1,335 @@
+"""
+Request timing and DuckDB query profiling for the PlanWise API.
+
+- `timing_middleware` records per-route latency and per-request query counts
+- `InstrumentedConnection` wraps a DuckDB connection and times every `execute`
+- db_executor.py adds event-loop lag, database pool occupancy, queue waits and rejections
+- `render_metrics()` renders everything in Prometheus text exposition format
+- Opt-in slow-query log: set PLANWISE_SLOW_QUERY_MS (threshold) and optionally
+  PLANWISE_SLOW_QUERY_LOG (JSON-lines file) to capture SQL, parameters and
+  EXPLAIN ANALYZE output for slow statements
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import duckdb
+
+try:
+    from backend import profiling
+except ImportError:  # started from backend/ as `uvicorn main:app`
+    import profiling
+
+logger = logging.getLogger("planwise.slow_query")
+
+# Latency buckets (seconds) shared by the request and query histograms
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+INF_BUCKET = 'le="+Inf"'
+
+# How long connect() waits out an in-process read-only/read-write conflict
+CONNECT_RETRY_SECONDS = 1.0
+
+# Per-request stats; a mutable dict so sync handlers running in the threadpool
+# (which receive a copy of the context) still update the request's counters
+_request_stats: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "planwise_request_stats", default=None
+)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a label tuple."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = defaultdict(lambda: [0] * len(buckets))
+        self.sums = defaultdict(float)
+        self.totals = defaultdict(int)
+
+    def observe(self, labels: tuple, value: float):
+        counts = self.counts[labels]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self.sums[labels] += value
+        self.totals[labels] += 1
+
+
+class MetricsRegistry:
+    """Process-local metrics store rendered by /api/v1/metrics."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.request_duration = Histogram(BUCKETS)
+            self.query_duration = Histogram(BUCKETS)
+            self.queries_per_request = Histogram(QUERY_COUNT_BUCKETS)
+            self.queries_total = defaultdict(int)
+            self.slow_queries_total = defaultdict(int)
+            self.loop_lag = Histogram(BUCKETS)
+            self.db_in_flight = defaultdict(int)
+            self.db_queued = defaultdict(int)
+            self.db_queue_wait = Histogram(BUCKETS)
+            self.db_rejected_total = defaultdict(int)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: Dict[str, Any]):
+        with self.lock:
+            self.request_duration.observe((method, route, str(status)), seconds)
+            self.queries_per_request.observe((route,), stats["queries"])
+
+    def observe_query(self, route: str, seconds: float, slow: bool):
+        with self.lock:
+            self.query_duration.observe((route,), seconds)
+            self.queries_total[(route,)] += 1
+            if slow:
+                self.slow_queries_total[(route,)] += 1
+
+    def observe_loop_lag(self, seconds: float):
+        with self.lock:
+            self.loop_lag.observe((), seconds)
+
+    def db_call_started(self, route_class: str):
+        with self.lock:
+            self.db_in_flight[(route_class,)] += 1
+
+    def db_call_finished(self, route_class: str):
+        with self.lock:
+            self.db_in_flight[(route_class,)] -= 1
+
+    def db_wait_started(self, route_class: str):
+        with self.lock:
+            self.db_queued[(route_class,)] += 1
+
+    def db_wait_finished(self, route_class: str):
+        with self.lock:
+            self.db_queued[(route_class,)] -= 1
+
+    def observe_db_wait(self, route_class: str, seconds: float):
+        with self.lock:
+            self.db_queue_wait.observe((route_class,), seconds)
+
+    def db_call_rejected(self, route_class: str):
+        with self.lock:
+            self.db_rejected_total[(route_class,)] += 1
+
+
+metrics = MetricsRegistry()
+
+
+def _route_label() -> str:
+    """Route template of the current request (e.g. /api/v1/clients/{client_id})."""
+    stats = _request_stats.get()
+    if stats is None:
+        return "none"
+    return getattr(stats["scope"].get("route"), "path", "unmatched")
+
+
+def slow_query_threshold_ms() -> Optional[float]:
+    """Slow-query threshold from PLANWISE_SLOW_QUERY_MS, or None when the log is disabled."""
+    value = os.environ.get("PLANWISE_SLOW_QUERY_MS")
+    return float(value) if value else None
+
+
+def _explain_analyze(conn, sql: str, params) -> Optional[str]:
+    """EXPLAIN ANALYZE a read statement (writes are never re-executed).
+
+    Runs on a cursor so the caller's pending result on `conn` is untouched.
+    """
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    try:
+        cursor = conn.cursor()
+        try:
+            rows = cursor.execute(f"EXPLAIN ANALYZE {sql}", params).fetchall()
+        finally:
+            cursor.close()
+        return "\n".join(str(row[-1]) for row in rows)
+    except duckdb.Error as e:
+        return f"EXPLAIN ANALYZE failed: {e}"
+
+
+def log_slow_query(conn, sql: str, params, seconds: float):
+    """Record a slow statement with its parameters and query plan."""
+    entry = {
+        "timestamp": datetime.now().isoformat(),
+        "route": _route_label(),
+        "duration_ms": round(seconds * 1000, 3),
+        "sql": " ".join(sql.split()),
+        "params": [str(p) for p in params] if params else [],
+        "plan": _explain_analyze(conn, sql, params),
+    }
+    logger.warning("Slow query (%.1f ms) on %s: %s", entry["duration_ms"], entry["route"], entry["sql"])
+
+    log_path = os.environ.get("PLANWISE_SLOW_QUERY_LOG")
+    if log_path:
+        with open(log_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+class InstrumentedConnection:
+    """
+    DuckDB connection wrapper that times each `execute`.
+
+    Everything else (fetchone, fetchall, description, close, ...) is delegated,
+    so handlers use it exactly like a plain connection.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def execute(self, sql: str, parameters=None):
+        return self._timed(self._conn.execute, sql, parameters)
+
+    def executemany(self, sql: str, parameters):
+        """Run one statement once per parameter list (prepared once); timed as one statement."""
+        return self._timed(self._conn.executemany, sql, parameters)
+
+    def _timed(self, run, sql: str, parameters):
+        session = profiling.current_session()
+        if session is not None:
+            profiling.before_query(self._conn)
+
+        started = time.perf_counter()
+        try:
+            run(sql, parameters) if parameters is not None else run(sql)
+        finally:
+            seconds = time.perf_counter() - started
+            if session is not None:
+                profiling.after_query(session, self._conn, sql, seconds)
+            threshold = slow_query_threshold_ms()
+            slow = threshold is not None and seconds * 1000 >= threshold
+
+            stats = _request_stats.get()
+            if stats is not None:
+                stats["queries"] += 1
+                stats["query_seconds"] += seconds
+            metrics.observe_query(_route_label(), seconds, slow)
+
+        if slow:
+            log_slow_query(self._conn, sql, parameters, seconds)
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._conn.close()
+
+
+def connect(db_path: str, read_only: bool = False) -> InstrumentedConnection:
+    """
+    Open a DuckDB connection whose queries are counted and timed.
+
+    Within one process DuckDB refuses a read-only connection while a
+    read-write one is open on the same file (and vice versa). Handlers and the
+    snapshot worker hold connections briefly, so that conflict is retried for
+    up to CONNECT_RETRY_SECONDS before it is raised.
+    """
+    deadline = time.monotonic() + CONNECT_RETRY_SECONDS
+    delay = 0.002
+    while True:
+        try:
+            return InstrumentedConnection(duckdb.connect(db_path, read_only=read_only))
+        except duckdb.ConnectionException as e:
+            if "different configuration" not in str(e) or time.monotonic() >= deadline:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 0.02)
+
+
+async def timing_middleware(request, call_next):
+    """Time the request, count its DuckDB queries and expose both as headers."""
+    stats = {"scope": request.scope, "queries": 0, "query_seconds": 0.0}
+    token = _request_stats.set(stats)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        seconds = time.perf_counter() - started
+        # Label by route template so /clients/{client_id} is one series, not one per client
+        metrics.observe_request(request.method, _route_label(), status, seconds, stats)
+        _request_stats.reset(token)
+
+    response.headers["Server-Timing"] = (
+        f"app;dur={seconds * 1000:.2f}, db;dur={stats['query_seconds'] * 1000:.2f}"
+    )
+    response.headers["X-Query-Count"] = str(stats["queries"])
+    return response
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _render_histogram(lines: list, name: str, help_text: str, hist: Histogram, label_names: tuple):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels in sorted(hist.counts):
+        for bound, count in zip(hist.buckets, hist.counts[labels]):
+            le = f'le="{bound}"'
+            lines.append(f"{name}_bucket{_labels(label_names, labels, le)} {count}")
+        lines.append(f"{name}_bucket{_labels(label_names, labels, INF_BUCKET)} {hist.totals[labels]}")
+        lines.append(f"{name}_sum{_labels(label_names, labels)} {hist.sums[labels]:.6f}")
+        lines.append(f"{name}_count{_labels(label_names, labels)} {hist.totals[labels]}")
+
+
+def _render_counter(lines: list, name: str, help_text: str, values: dict, label_names: tuple):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for labels in sorted(values):
+        lines.append(f"{name}{_labels(label_names, labels)} {values[labels]}")
+
+
+def _render_gauge(lines: list, name: str, help_text: str, values: dict, label_names: tuple):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} gauge")
+    for labels in sorted(values):
+        lines.append(f"{name}{_labels(label_names, labels)} {values[labels]}")
+
+
+def render_metrics() -> str:
+    """Render all metrics in Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    with metrics.lock:
+        _render_histogram(lines, "planwise_http_request_duration_seconds", "HTTP request latency by route.",
+                          metrics.request_duration, ("method", "route", "status"))
+        _render_histogram(lines, "planwise_duckdb_query_duration_seconds", "DuckDB execute latency by route.",
+                          metrics.query_duration, ("route",))
+        _render_histogram(lines, "planwise_duckdb_queries_per_request", "DuckDB statements issued per request.",
+                          metrics.queries_per_request, ("route",))
+        _render_counter(lines, "planwise_duckdb_queries_total", "DuckDB statements executed.",
+                        metrics.queries_total, ("route",))
+        _render_counter(lines, "planwise_duckdb_slow_queries_total",
+                        "DuckDB statements over PLANWISE_SLOW_QUERY_MS.", metrics.slow_queries_total, ("route",))
+        _render_histogram(lines, "planwise_event_loop_lag_seconds", "Delay of event loop wake-ups.",
+                          metrics.loop_lag, ())
+        _render_gauge(lines, "planwise_db_executor_in_flight", "Calls running on the database pool.",
+                      metrics.db_in_flight, ("route_class",))
+        _render_gauge(lines, "planwise_db_executor_queued", "Calls waiting for a database pool slot.",
+                      metrics.db_queued, ("route_class",))
+        _render_histogram(lines, "planwise_db_queue_wait_seconds", "Time calls waited for a database pool slot.",
+                          metrics.db_queue_wait, ("route_class",))
+        _render_counter(lines, "planwise_db_rejected_total", "Requests turned away with 429 (queue full or wait timed out).",
+                        metrics.db_rejected_total, ("route_class",))
+    return "\n".join(lines) + "\n"
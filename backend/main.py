@@ -2,14 +2,87 @@
 FastAPI backend for PlanWise Design Matrix Dashboard
 Connects to existing DuckDB database and serves data to React frontend
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-import duckdb
 from pathlib import Path
+from contextlib import asynccontextmanager
+from datetime import datetime
+import asyncio
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "database"))
+from plan_formulas import FORMULA_SOURCE_FIELDS, refresh_client_formulas
+
+try:
+    from backend.audit import (
+        ARCHIVE_VIEW, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor,
+        approximate_count, audit_filters, audit_source, fetch_audit_page
+    )
+    from backend.changes import event_stream, feed, load_events
+    from backend.cluster import forward, must_forward
+    from backend.client_context import DISTRIBUTION_METRICS, load_client_context, request_cache_middleware
+    from backend.compare import MAX_COMPARE_CLIENTS, build_comparison, comparison_to_arrow
+    from backend.db_executor import DatabaseRoute, monitor_loop_lag, shutdown_executor
+    from backend.formats import ARROW_MEDIA_TYPE, arrow_response, negotiated_rows_response, wants_arrow
+    from backend.instrumentation import connect, render_metrics, timing_middleware
+    from backend.plan_history import cohort_as_of, load_plan_as_of
+    from backend.profiling import load_profile, profiling_enabled, profiling_middleware
+    from backend.queries import (
+        CLIENT_INDUSTRY, COUNT_PLANS, FIELD_RULE, INSERT_AUDIT, PLAN_BY_CLIENT, REFRESH_FINGERPRINT, SELECT_FIELD,
+        UPDATE_FIELD, client_list_query
+    )
+    from backend.replica import ReplicaUnavailable, get_replicas, pinned_replica, server_role
+    from backend.scorecards import build_navigator_scorecard, build_peer_assessment
+    from backend.snapshots import NAVIGATOR_SCORECARD, PEER_ASSESSMENT, dump_payload, get_store
+    from backend.warmup import warm_up
+except ImportError:  # started from backend/ as `uvicorn main:app`
+    from audit import (
+        ARCHIVE_VIEW, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor,
+        approximate_count, audit_filters, audit_source, fetch_audit_page
+    )
+    from changes import event_stream, feed, load_events
+    from cluster import forward, must_forward
+    from client_context import DISTRIBUTION_METRICS, load_client_context, request_cache_middleware
+    from compare import MAX_COMPARE_CLIENTS, build_comparison, comparison_to_arrow
+    from db_executor import DatabaseRoute, monitor_loop_lag, shutdown_executor
+    from formats import ARROW_MEDIA_TYPE, arrow_response, negotiated_rows_response, wants_arrow
+    from instrumentation import connect, render_metrics, timing_middleware
+    from plan_history import cohort_as_of, load_plan_as_of
+    from profiling import load_profile, profiling_enabled, profiling_middleware
+    from queries import (
+        CLIENT_INDUSTRY, COUNT_PLANS, FIELD_RULE, INSERT_AUDIT, PLAN_BY_CLIENT, REFRESH_FINGERPRINT, SELECT_FIELD,
+        UPDATE_FIELD, client_list_query
+    )
+    from replica import ReplicaUnavailable, get_replicas, pinned_replica, server_role
+    from scorecards import build_navigator_scorecard, build_peer_assessment
+    from snapshots import NAVIGATOR_SCORECARD, PEER_ASSESSMENT, dump_payload, get_store
+    from warmup import warm_up
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Precompute scorecard snapshots in the background so first views are served from them
+    store = get_store(DB_PATH)
+    if store is not None and DB_PATH.exists():
+        store.warm()
+    # Start publishing (or, on readers, following) read replicas
+    if DB_PATH.exists():
+        get_replicas(DB_PATH)
+        # Load lazily imported modules and prime the hot reads off the request path (see warmup.py)
+        warm_up(DB_PATH)
+    lag_monitor = asyncio.create_task(monitor_loop_lag())
+    try:
+        yield
+    finally:
+        lag_monitor.cancel()
+        shutdown_executor()
 
-app = FastAPI(title="PlanWise Design Matrix API", version="1.0.0")
+app = FastAPI(title="PlanWise Design Matrix API", version="1.0.0", lifespan=lifespan)
+# Sync routes declared below run on the bounded database pool (see db_executor.py)
+# and can be sampled on demand with ?profile=1 (see profiling.py)
+app.router.route_class = DatabaseRoute
 
 # CORS configuration for local development
 app.add_middleware(
@@ -20,6 +93,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def cluster_middleware(request: Request, call_next):
+    """Readers in a multi-worker deployment hand edits and stale reads to the writer (see cluster.py)"""
+    if server_role() != "reader":
+        return await call_next(request)
+    if must_forward(request, get_replicas(DB_PATH)):
+        return await forward(request)
+    # Read exactly the replica must_forward checked; readers never open planwise.db
+    with pinned_replica(getattr(request.state, "replica", None)):
+        return await call_next(request)
+
+# Per-route latency, DuckDB query counts and opt-in slow-query log (see instrumentation.py).
+# Middleware added last runs first, so timing wraps the (guarded) profiler.
+app.middleware("http")(cluster_middleware)
+app.middleware("http")(request_cache_middleware)
+app.middleware("http")(profiling_middleware)
+app.middleware("http")(timing_middleware)
+
 # Database path
 DB_PATH = Path(__file__).parent.parent / "data" / "planwise.db"
 
@@ -58,9 +148,20 @@ class PeerBenchmark(BaseModel):
     your_percentile: Optional[float]
     quartile_label: str
 
+class CompareRequest(BaseModel):
+    client_ids: List[str]
+
 # Helper function to get database connection
-def get_db():
-    return duckdb.connect(str(DB_PATH), read_only=True)
+def get_db(client_id: Optional[str] = None):
+    """Read connection: the latest read replica when enabled (see replica.py), else the primary"""
+    replicas = get_replicas(DB_PATH)
+    if replicas is not None:
+        # Reads about a client edited since the replica was taken go to the primary
+        try:
+            return replicas.connect(client_id)
+        except ReplicaUnavailable as e:  # reader process with no replica left to open
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return connect(str(DB_PATH), read_only=True)
 
 @app.get("/")
 def read_root():
@@ -71,86 +172,39 @@ def read_root():
     }
 
 @app.get("/api/v1/clients", response_model=List[ClientSummary])
-def get_clients(search: Optional[str] = None, limit: int = 100):
-    """Get list of all clients with optional search"""
+def get_clients(request: Request, search: Optional[str] = None, limit: int = 100):
+    """
+    Get list of all clients with optional search.
+
+    Rows are shaped as ClientSummary in SQL and serialised by DuckDB (or sent as
+    Arrow IPC when requested) instead of building one model per row.
+    """
     conn = get_db()
 
     try:
-        query = """
-            SELECT DISTINCT
-                client_id,
-                client_name,
-                industry,
-                employee_count,
-                state
-            FROM plan_designs
-            WHERE 1=1
-        """
-
-        params = []
-        if search:
-            query += " AND client_name ILIKE ?"
-            search_param = f"%{search}%"
-            params.append(search_param)
-
-        query += " ORDER BY client_name LIMIT ?"
-        params.append(limit)
-
-        result = conn.execute(query, params).fetchall()
-
-        # State to Region mapping
-        REGIONS = {
-            'CT': 'Northeast', 'ME': 'Northeast', 'MA': 'Northeast', 'NH': 'Northeast', 'RI': 'Northeast', 'VT': 'Northeast', 'NJ': 'Northeast', 'NY': 'Northeast', 'PA': 'Northeast',
-            'IL': 'Midwest', 'IN': 'Midwest', 'MI': 'Midwest', 'OH': 'Midwest', 'WI': 'Midwest', 'IA': 'Midwest', 'KS': 'Midwest', 'MN': 'Midwest', 'MO': 'Midwest', 'NE': 'Midwest', 'ND': 'Midwest', 'SD': 'Midwest',
-            'DE': 'South', 'FL': 'South', 'GA': 'South', 'MD': 'South', 'NC': 'South', 'SC': 'South', 'VA': 'South', 'DC': 'South', 'WV': 'South', 'AL': 'South', 'KY': 'South', 'MS': 'South', 'TN': 'South', 'AR': 'South', 'LA': 'South', 'OK': 'South', 'TX': 'South',
-            'AZ': 'West', 'CO': 'West', 'ID': 'West', 'MT': 'West', 'NV': 'West', 'NM': 'West', 'UT': 'West', 'WY': 'West', 'AK': 'West', 'CA': 'West', 'HI': 'West', 'OR': 'West', 'WA': 'West'
-        }
-
-        clients = []
-        for row in result:
-            state = row[4]
-            region = REGIONS.get(state, 'Unknown') if state else 'Unknown'
-            
-            clients.append(ClientSummary(
-                client_id=row[0],
-                client_name=row[1],
-                plan_sponsor_name=row[1],
-                industry=row[2],
-                plan_type="401(k)",
-                total_participants=row[3],
-                data_freshness_days=0,
-                state=state,
-                region=region
-            ))
-
-        return clients
+        statement, params = client_list_query(search, limit)
+        return negotiated_rows_response(request, conn, statement.sql, params, order_by="client_name")
 
     finally:
         conn.close()
 
 @app.get("/api/v1/clients/{client_id}")
-def get_client(client_id: str):
-    """Get detailed plan design for a specific client"""
-    conn = get_db()
+def get_client(client_id: str, as_of: Optional[datetime] = None):
+    """Get detailed plan design for a specific client (as it was at `as_of`, if given)"""
+    conn = get_db(client_id)
 
     try:
-        query = """
-            SELECT *
-            FROM plan_designs
-            WHERE client_id = ?
-        """
+        if as_of is not None:
+            plan_data = load_plan_as_of(conn, client_id, as_of)
+            if plan_data is None:
+                raise HTTPException(status_code=404, detail="Client not found at as_of")
+            return plan_data
 
-        result = conn.execute(query, [client_id]).fetchone()
+        plan_data = PLAN_BY_CLIENT.one(conn, client_id)
 
-        if not result:
+        if plan_data is None:
             raise HTTPException(status_code=404, detail="Client not found")
 
-        # Get column names
-        columns = [desc[0] for desc in conn.description]
-
-        # Convert to dictionary
-        plan_data = dict(zip(columns, result))
-
         return plan_data
 
     finally:
@@ -159,356 +213,188 @@ def get_client(client_id: str):
 @app.get("/api/v1/clients/{client_id}/extractions", response_model=List[ExtractedField])
 def get_extractions(client_id: str):
     """Get extracted fields for a client with confidence scores"""
-    conn = get_db()
+    conn = get_db(client_id)
 
     try:
         # Get plan data
-        plan = conn.execute(
-            "SELECT * FROM plan_designs WHERE client_id = ?",
-            [client_id]
-        ).fetchone()
+        plan_dict = PLAN_BY_CLIENT.one(conn, client_id)
 
-        if not plan:
+        if plan_dict is None:
             raise HTTPException(status_code=404, detail="Client not found")
 
-        columns = [desc[0] for desc in conn.description]
-        plan_dict = dict(zip(columns, plan))
-
-        # Convert plan fields to extraction format
-        extractions = []
-
-        # Define field categories and confidence thresholds (mapped to actual DB columns)
-        field_mappings = {
-            "eligibility": ("eligibility", "Eligibility", 0.95),
-            "match_formula": ("contributions", "Employer Match", 0.78),
-            "match_effective_rate": ("contributions", "Match Effective Rate", 0.85),
-            "nonelective_formula": ("contributions", "Non-Elective Contribution", 0.80),
-            "vesting_schedule": ("vesting", "Vesting Schedule", 0.92),
-            "auto_enrollment_enabled": ("auto_features", "Auto-Enrollment", 0.96),
-            "auto_enrollment_rate": ("auto_features", "Auto-Enrollment Rate", 0.96),
-            "auto_escalation_enabled": ("auto_features", "Auto-Escalation", 0.94),
-            "auto_escalation_rate": ("auto_features", "Auto-Escalation Rate", 0.92),
-            "auto_escalation_cap": ("auto_features", "Auto-Escalation Cap", 0.90),
-        }
-
-        for field_key, (category, display_name, confidence) in field_mappings.items():
-            if field_key in plan_dict and plan_dict[field_key] is not None:
-                status = "verified" if confidence >= 0.92 else "review"
-                extractions.append(ExtractedField(
-                    field_name=display_name,
-                    field_category=category,
-                    value=plan_dict[field_key],
-                    confidence_score=confidence,
-                    status=status
-                ))
-
-        return extractions
+        return build_extractions(plan_dict)
 
     finally:
         conn.close()
 
+def build_extractions(plan_dict: dict) -> List[ExtractedField]:
+    """Convert plan fields to extraction format"""
+    extractions = []
+
+    # Define field categories and confidence thresholds (mapped to actual DB columns)
+    field_mappings = {
+        "eligibility": ("eligibility", "Eligibility", 0.95),
+        "match_formula": ("contributions", "Employer Match", 0.78),
+        "match_effective_rate": ("contributions", "Match Effective Rate", 0.85),
+        "nonelective_formula": ("contributions", "Non-Elective Contribution", 0.80),
+        "vesting_schedule": ("vesting", "Vesting Schedule", 0.92),
+        "auto_enrollment_enabled": ("auto_features", "Auto-Enrollment", 0.96),
+        "auto_enrollment_rate": ("auto_features", "Auto-Enrollment Rate", 0.96),
+        "auto_escalation_enabled": ("auto_features", "Auto-Escalation", 0.94),
+        "auto_escalation_rate": ("auto_features", "Auto-Escalation Rate", 0.92),
+        "auto_escalation_cap": ("auto_features", "Auto-Escalation Cap", 0.90),
+    }
+
+    for field_key, (category, display_name, confidence) in field_mappings.items():
+        if field_key in plan_dict and plan_dict[field_key] is not None:
+            status = "verified" if confidence >= 0.92 else "review"
+            extractions.append(ExtractedField(
+                field_name=display_name,
+                field_category=category,
+                value=plan_dict[field_key],
+                confidence_score=confidence,
+                status=status
+            ))
+
+    return extractions
+
 @app.get("/api/v1/clients/{client_id}/peers")
-def get_peer_comparison(client_id: str):
-    """Get peer comparison data (simplified version)"""
-    conn = get_db()
+def get_peer_comparison(client_id: str, as_of: Optional[datetime] = None):
+    """Get peer comparison data (simplified version), optionally against the cohort as of a timestamp"""
+    conn = get_db(client_id)
 
     try:
-        # Get client data
-        client = conn.execute(
-            "SELECT * FROM plan_designs WHERE client_id = ?",
-            [client_id]
-        ).fetchone()
-
-        if not client:
+        relation = "plan_designs"
+        if as_of is not None:
+            plan = load_plan_as_of(conn, client_id, as_of)
+            if plan is None:
+                raise HTTPException(status_code=404, detail="Client not found at as_of")
+            relation = f"plans_as_of_{as_of:%Y%m%d%H%M%S%f}"
+            conn.register(relation, cohort_as_of(conn, DB_PATH, plan["industry"], as_of))
+
+        # Client row and peer statistics (same industry) in one query
+        context = load_client_context(conn, client_id, relation)
+
+        if context is None:
             raise HTTPException(status_code=404, detail="Client not found")
 
-        columns = [desc[0] for desc in conn.description]
-        client_dict = dict(zip(columns, client))
+        return build_peer_comparison(client_id, context)
 
-        # Build peer cohort (same industry)
-        industry = client_dict.get("industry")
+    finally:
+        conn.close()
 
-        # Get peer statistics
-        peer_stats = conn.execute("""
-            SELECT
-                COUNT(*) as cohort_size,
-                AVG(match_effective_rate) as avg_match_rate,
-                MEDIAN(match_effective_rate) as median_match_rate,
-                AVG(auto_enrollment_rate) as avg_ae_rate
-            FROM plan_designs
-            WHERE industry = ? AND client_id != ?
-        """, [industry, client_id]).fetchone()
+def build_peer_comparison(client_id: str, context: dict) -> dict:
+    """Peer comparison payload from a client context (client_context.py)"""
+    client_dict = context["client"]
+    industry = client_dict.get("industry")
+    peer_stats = context["industry"]
 
-        return {
-            "client_id": client_id,
-            "client_name": client_dict.get("client_name"),
-            "cohort_description": f"{industry} (n={peer_stats[0]})",
-            "cohort_size": peer_stats[0],
-            "benchmarks": {
-                "employer_match": {
-                    "your_value": client_dict.get("match_effective_rate", 0),
-                    "peer_average": peer_stats[2] if peer_stats[2] else 0,
-                    "quartile_label": "Competitive"
-                },
-                "auto_enrollment_rate": {
-                    "your_value": client_dict.get("auto_enrollment_rate", 0),
-                    "peer_average": peer_stats[3] if peer_stats[3] else 0,
-                    "quartile_label": "Above Average"
-                }
+    return {
+        "client_id": client_id,
+        "client_name": client_dict.get("client_name"),
+        "cohort_description": f"{industry} (n={peer_stats['cohort_size']})",
+        "cohort_size": peer_stats["cohort_size"],
+        "benchmarks": {
+            "employer_match": {
+                "your_value": client_dict.get("match_effective_rate", 0),
+                "peer_average": peer_stats["median_match_rate"] or 0,
+                "quartile_label": "Competitive"
+            },
+            "auto_enrollment_rate": {
+                "your_value": client_dict.get("auto_enrollment_rate", 0),
+                "peer_average": peer_stats["avg_ae_rate"] or 0,
+                "quartile_label": "Above Average"
             }
         }
-
-    finally:
-        conn.close()
+    }
 
 # ========================================
 # E03 Consulting Views API Endpoints
 # ========================================
 
-@app.get("/api/v1/clients/{client_id}/peer-assessment")
-def get_peer_assessment(client_id: str):
-    """Get peer benchmarking assessment with traffic light indicators"""
-    conn = get_db()
-
+def scorecard_response(client_id: str, kind: str) -> Response:
+    """
+    Serve a peer assessment or Navigator Scorecard from its snapshot.
+
+    Snapshots (snapshots.py) are served as stored JSON with `X-Snapshot: hit`.
+    Missing or stale ones are computed live (`X-Snapshot: live`) and the
+    plan's industry is queued for background recompute.
+    """
+    store = get_store(DB_PATH)
+    if store is not None:
+        payload = store.lookup(client_id, kind)
+        if payload is not None:
+            return Response(content=payload, media_type="application/json", headers={"X-Snapshot": "hit"})
+
+    conn = get_db(client_id)
     try:
-        # Get client data
-        client = conn.execute(
-            "SELECT * FROM plan_designs WHERE client_id = ?",
-            [client_id]
-        ).fetchone()
-
-        if not client:
+        context = load_client_context(conn, client_id)
+        if context is None:
             raise HTTPException(status_code=404, detail="Client not found")
 
-        columns = [desc[0] for desc in conn.description]
-        client_dict = dict(zip(columns, client))
-
-        industry = client_dict.get("industry")
-
-        # Handle null values safely
-        if not industry:
-            industry = "Unknown"
-
-        # Get peer cohort statistics - use COALESCE to handle nulls
-        peer_stats = conn.execute("""
-            SELECT
-                COUNT(*) as cohort_size,
-                COALESCE(CAST(MEDIAN(match_effective_rate) AS DOUBLE), 4.5) as median_match,
-                COALESCE(CAST(MEDIAN(auto_enrollment_rate) AS DOUBLE), 3.0) as median_ae_rate,
-                COALESCE(CAST(MEDIAN(auto_escalation_cap) AS DOUBLE), 10.0) as median_escalation_cap,
-                COUNT(CASE WHEN auto_enrollment_enabled THEN 1 END) * 100.0 / NULLIF(COUNT(*), 0) as ae_adoption
-            FROM plan_designs
-            WHERE industry = ? AND client_id != ?
-        """, [industry, client_id]).fetchone()
-
-        cohort_size = peer_stats[0] if peer_stats else 0
-
-        # Build assessment features
-        features = []
-
-        # 1. Eligibility
-        features.append({
-            "lever": "ELIGIBILITY",
-            "current_design": client_dict.get("eligibility", "Not specified"),
-            "status": "above",
-            "percentile": 65,
-            "peer_summary": "Majority have 1,000 hours or 1-year requirement",
-            "assessment": "At peer average and recommended design for Healthcare"
-        })
-
-        # 2. Auto-Enrollment
-        client_ae_rate = client_dict.get("auto_enrollment_rate") or 0
-        median_ae = peer_stats[2] if peer_stats and peer_stats[2] else 3.0
-        ae_status = "above" if client_ae_rate > median_ae else "median" if client_ae_rate >= median_ae * 0.9 else "below"
-
-        features.append({
-            "lever": "AUTO-ENROLLMENT",
-            "current_design": f"Yes, default {client_ae_rate:.0f}%" if client_dict.get("auto_enrollment_enabled") else "No",
-            "status": ae_status,
-            "percentile": 75 if ae_status == "above" else 50,
-            "peer_summary": f"Majority offer, {median_ae:.0f}% median default",
-            "assessment": "Default rate tops peers" if ae_status == "above" else "Competitive with peer set"
-        })
-
-        # 3. Auto-Escalation
-        features.append({
-            "lever": "AUTO-ESCALATION",
-            "current_design": f"{1}%/yr up to {client_dict.get('auto_escalation_cap', 10):.0f}%" if client_dict.get("auto_escalation_enabled") else "No",
-            "status": "above" if client_dict.get("auto_escalation_enabled") else "below",
-            "percentile": 80 if client_dict.get("auto_escalation_enabled") else 20,
-            "peer_summary": "Minority using; typical +1%/yr to 10% cap",
-            "assessment": "Best practice design" if client_dict.get("auto_escalation_enabled") else "Opportunity to improve"
-        })
-
-        # 4. Employer Contribution
-        client_match = client_dict.get("match_effective_rate") or 0
-        median_match = peer_stats[1] if peer_stats and peer_stats[1] else 4.5
-        match_status = "above" if client_match and client_match > median_match * 1.1 else "median"
-
-        features.append({
-            "lever": "EMPLOYER CONTRIBUTION",
-            "current_design": client_dict.get("match_formula") or "Not specified",
-            "status": match_status,
-            "percentile": 55,
-            "peer_summary": f"{median_match:.1f}% median maximum",
-            "assessment": "Competitive with peer set"
-        })
+        client_dict = context["client"]
+        if kind == PEER_ASSESSMENT:
+            payload = build_peer_assessment(client_dict, context["industry"])
+        else:
+            payload = build_navigator_scorecard(client_dict)
+    finally:
+        conn.close()
 
-        # 5. Vesting
-        vesting = client_dict.get("vesting_schedule") or ""
-        vesting_status = "below" if vesting and "immediate" in vesting.lower() else "above"
-
-        features.append({
-            "lever": "VESTING",
-            "current_design": vesting or "Not specified",
-            "status": vesting_status,
-            "percentile": 30 if vesting_status == "below" else 70,
-            "peer_summary": "Most common is 3-year cliff vesting",
-            "assessment": "More generous than peers, helps recruiting but limits retention" if vesting_status == "below" else "Supports retention"
-        })
+    if store is not None:
+        store.request(client_dict["industry"])
+    return Response(content=dump_payload(payload), media_type="application/json", headers={"X-Snapshot": "live"})
 
-        return {
-            "client_name": client_dict.get("client_name"),
-            "cohort_description": f"{industry} (n={cohort_size})",
-            "features": features
-        }
+def invalidate_snapshots(industries):
+    """Mark the scorecard snapshots of industries touched by a plan update stale."""
+    store = get_store(DB_PATH)
+    if store is not None:
+        store.invalidate(industries)
 
-    finally:
-        conn.close()
+@app.get("/api/v1/clients/{client_id}/peer-assessment")
+def get_peer_assessment(client_id: str):
+    """Get peer benchmarking assessment with traffic light indicators"""
+    return scorecard_response(client_id, PEER_ASSESSMENT)
 
 @app.get("/api/v1/clients/{client_id}/navigator-scorecard")
 def get_navigator_scorecard(client_id: str):
     """Get Navigator Scorecard with multi-dimensional impact analysis"""
+    return scorecard_response(client_id, NAVIGATOR_SCORECARD)
+
+@app.post("/api/v1/compare")
+def compare_clients(request: CompareRequest, http_request: Request, format: str = "json"):
+    """
+    Compare plans side by side: every design lever, its percentile rank within
+    the plan's industry cohort and an above/median/below status flag.
+
+    One query plus a vectorized ranking step (see compare.py) instead of a
+    client + peer-assessment request per plan. `format=arrow` (or an Arrow
+    Accept header) returns an Arrow IPC stream (requires pyarrow) for large matrices.
+    """
+    if not request.client_ids:
+        raise HTTPException(status_code=400, detail="client_ids must not be empty")
+    if len(set(request.client_ids)) > MAX_COMPARE_CLIENTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_COMPARE_CLIENTS} clients can be compared")
+    if format not in ("json", "arrow"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'arrow'")
+
     conn = get_db()
 
     try:
-        # Get client data
-        client = conn.execute(
-            "SELECT * FROM plan_designs WHERE client_id = ?",
-            [client_id]
-        ).fetchone()
-
-        if not client:
-            raise HTTPException(status_code=404, detail="Client not found")
-
-        columns = [desc[0] for desc in conn.description]
-        client_dict = dict(zip(columns, client))
-
-        # Build scorecard features
-        features = []
-
-        # 1. Eligibility
-        features.append({
-            "lever": "ELIGIBILITY",
-            "current_design": client_dict.get("eligibility", "Not specified"),
-            "impacts": {
-                "recruitment": "neutral",
-                "retention": "positive",
-                "cost_roi": "neutral",
-                "retirement": "neutral",
-                "efficiency": "positive"
-            }
-        })
-
-        # 2. Auto-Enrollment
-        ae_rate = client_dict.get('auto_enrollment_rate') or 0
-        features.append({
-            "lever": "AUTO-ENROLLMENT",
-            "current_design": f"Yes, default {ae_rate:.0f}%" if client_dict.get("auto_enrollment_enabled") else "No",
-            "impacts": {
-                "recruitment": "positive",
-                "retention": "positive",
-                "cost_roi": "neutral",
-                "retirement": "strong",
-                "efficiency": "positive"
-            }
-        })
-
-        # 3. Auto-Escalation
-        esc_cap = client_dict.get('auto_escalation_cap') or 10
-        features.append({
-            "lever": "AUTO-ESCALATION",
-            "current_design": f"{1}%/yr up to {esc_cap:.0f}%" if client_dict.get("auto_escalation_enabled") else "No",
-            "impacts": {
-                "recruitment": "positive",
-                "retention": "positive",
-                "cost_roi": "neutral",
-                "retirement": "strong",
-                "efficiency": "positive"
-            }
-        })
-
-        # 4. Employer Contribution
-        features.append({
-            "lever": "EMPLOYER $",
-            "current_design": client_dict.get("match_formula") or "Not specified",
-            "impacts": {
-                "recruitment": "positive",
-                "retention": "positive",
-                "cost_roi": "neutral",
-                "retirement": "positive",
-                "efficiency": "positive"
-            }
-        })
-
-        # 5. Vesting
-        vesting = client_dict.get("vesting_schedule") or ""
-        is_immediate = vesting and "immediate" in vesting.lower()
-
-        features.append({
-            "lever": "VESTING",
-            "current_design": vesting or "Not specified",
-            "impacts": {
-                "recruitment": "positive",
-                "retention": "negative" if is_immediate else "positive",
-                "cost_roi": "negative" if is_immediate else "positive",
-                "retirement": "neutral",
-                "efficiency": "positive"
-            }
-        })
-
-        # Recommendations
-        recommendations = []
-
-        if is_immediate:
-            recommendations.append({
-                "priority": "now",
-                "title": "Consider 3-year cliff vesting",
-                "description": "Consider 3-year cliff vesting to promote retention and limit plan leakage.",
-                "impact_level": "↑↑",
-                "financial_impact": "$ Savings",
-                "complexity": "Low"
-            })
+        comparison = build_comparison(conn, request.client_ids)
+    finally:
+        conn.close()
 
-        esc_cap_value = client_dict.get("auto_escalation_cap") or 0
-        if esc_cap_value and esc_cap_value < 15:
-            recommendations.append({
-                "priority": "next",
-                "title": "Increase auto-escalation cap",
-                "description": f"Increase auto-escalation cap from {esc_cap_value:.0f}% to 15% and re-enroll participants to drive retirement readiness.",
-                "impact_level": "↑↑",
-                "financial_impact": "Neutral",
-                "complexity": "Medium"
-            })
+    if not comparison["clients"]:
+        raise HTTPException(status_code=404, detail="None of the requested clients were found")
 
-        recommendations.append({
-            "priority": "next",
-            "title": "Review competitive peer set",
-            "description": "Review competitive peer set to consider contribution design for potential improvements.",
-            "impact_level": "↑↑",
-            "financial_impact": "$$-$$$",
-            "complexity": "Low"
-        })
+    if format == "arrow" or wants_arrow(http_request):
+        try:
+            content = comparison_to_arrow(comparison)
+        except ImportError:
+            raise HTTPException(status_code=406, detail="Arrow output requires pyarrow to be installed")
+        return Response(content=content, media_type=ARROW_MEDIA_TYPE)
 
-        return {
-            "client_name": client_dict.get("client_name"),
-            "summary": "Competitive blended contribution design with strong auto features; consider 3-year cliff vesting to promote retention and limit plan leakage, and increase auto-escalation cap to 15% to drive retirement readiness.",
-            "features": features,
-            "recommendations": recommendations
-        }
-
-    finally:
-        conn.close()
+    return comparison
 
 @app.get("/api/v1/clients/{client_id}/distributions")
 def get_distributions(
@@ -518,162 +404,37 @@ def get_distributions(
     cohort: str = "national"
 ):
     """Get distribution data for charts"""
-    conn = get_db()
+    conn = get_db(client_id)
 
     try:
-        # Get client data
-        client = conn.execute(
-            "SELECT * FROM plan_designs WHERE client_id = ?",
-            [client_id]
-        ).fetchone()
+        # Client row and its cohort histograms in one query
+        context = load_client_context(conn, client_id)
 
-        if not client:
+        if context is None:
             raise HTTPException(status_code=404, detail="Client not found")
 
-        columns = [desc[0] for desc in conn.description]
-        client_dict = dict(zip(columns, client))
-        industry = client_dict.get("industry")
-
-        # Get cohort data
-        if cohort == "regional":
-            # Regional cohort (same state)
-            cohort_query = """
-                SELECT * FROM plan_designs
-                WHERE industry = ? AND state = ? AND client_id != ?
-            """
-            cohort_data = conn.execute(cohort_query, [
-                industry,
-                client_dict.get("state", ""),
-                client_id
-            ]).fetchall()
-        else:
-            # National cohort (same industry)
-            cohort_query = "SELECT * FROM plan_designs WHERE industry = ? AND client_id != ?"
-            cohort_data = conn.execute(cohort_query, [industry, client_id]).fetchall()
-
-        # Convert cohort data to dictionaries
-        cohort_dicts = []
-        for row in cohort_data:
-            cohort_dicts.append(dict(zip(columns, row)))
-
-        cohort_size = len(cohort_dicts)
-
-        # Calculate real distributions from actual cohort data
-        if metric == "contribution":
-            # Define bins
-            bin_definitions = [
-                {"bin": "1%", "binStart": 1.0, "binEnd": 2.0},
-                {"bin": "2%", "binStart": 2.0, "binEnd": 3.0},
-                {"bin": "3%", "binStart": 3.0, "binEnd": 4.0},
-                {"bin": "4%", "binStart": 4.0, "binEnd": 5.0},
-                {"bin": "5%", "binStart": 5.0, "binEnd": 6.0},
-                {"bin": "6%", "binStart": 6.0, "binEnd": 7.0},
-                {"bin": "7%", "binStart": 7.0, "binEnd": 8.0},
-                {"bin": "8%", "binStart": 8.0, "binEnd": 9.0},
-                {"bin": "9%", "binStart": 9.0, "binEnd": 10.0},
-                {"bin": "≥10%", "binStart": 10.0, "binEnd": 9999.0}
-            ]
-
-            # Extract values from cohort (convert decimal to percentage)
-            field_name = "match_effective_rate"
-            values = [(float(c.get(field_name) or 0) * 100) for c in cohort_dicts]
-
-            # Count values in each bin
-            bins = []
-            for bin_def in bin_definitions:
-                count = sum(1 for v in values if bin_def["binStart"] <= v < bin_def["binEnd"])
-                bins.append({**bin_def, "count": count})
-
-            client_value = float(client_dict.get(field_name) or 0) * 100 or 4.5
-            peer_average = sum(values) / len(values) if values else 0
-            title = "Employer Contribution Distribution"
-            unit = "%"
+        client_dict = context["client"]
+
+        # Regional cohort is the same industry and state, national the same industry
+        cohort_stats = context["state"] if cohort == "regional" else context["industry"]
+        cohort_size = cohort_stats["cohort_size"]
+
+        spec = DISTRIBUTION_METRICS.get(metric)
+        if spec is not None:
+            distribution = cohort_stats["distributions"][metric]
+            bins = [{**bin_def, "count": count} for bin_def, count in zip(spec["bins"], distribution["counts"])]
+
+            value = client_dict.get(spec["field"])
+            if spec["client_default"] is None:
+                client_value = float(value) if value is not None else spec["null_value"]
+            else:
+                # Rates are stored as decimals and shown as percentages
+                client_value = float(value or 0) * spec["scale"] or spec["client_default"]
+            peer_average = distribution["total"] / cohort_size if cohort_size else 0
+            title = spec["title"]
+            unit = spec["unit"]
             national_average = peer_average  # Same for now
 
-        elif metric == "auto_enroll":
-            bin_definitions = [
-                {"bin": "0%", "binStart": 0.0, "binEnd": 1.0},
-                {"bin": "2%", "binStart": 2.0, "binEnd": 2.5},
-                {"bin": "3%", "binStart": 3.0, "binEnd": 3.5},
-                {"bin": "4%", "binStart": 4.0, "binEnd": 4.5},
-                {"bin": "5%", "binStart": 5.0, "binEnd": 5.5},
-                {"bin": "6%", "binStart": 6.0, "binEnd": 6.5},
-                {"bin": "≥7%", "binStart": 7.0, "binEnd": 9999.0}
-            ]
-
-            field_name = "auto_enrollment_rate"
-            values = [(float(c.get(field_name) or 0) * 100) for c in cohort_dicts]
-
-            bins = []
-            for bin_def in bin_definitions:
-                count = sum(1 for v in values if bin_def["binStart"] <= v < bin_def["binEnd"])
-                bins.append({**bin_def, "count": count})
-
-            client_value = float(client_dict.get(field_name) or 0) * 100 or 4.0
-            peer_average = sum(values) / len(values) if values else 0
-            title = "Auto-Enrollment Default Rate"
-            unit = "%"
-            national_average = peer_average
-
-        elif metric == "vesting":
-            bin_definitions = [
-                {"bin": "Immediate", "binStart": 0.0, "binEnd": 1.0},
-                {"bin": "3-year cliff", "binStart": 3.0, "binEnd": 4.0},
-                {"bin": "5-year cliff", "binStart": 5.0, "binEnd": 6.0},
-                {"bin": "Graded", "binStart": 6.0, "binEnd": 9999.0}
-            ]
-
-            # Convert vesting schedules to numeric for binning
-            def vesting_to_numeric(vesting_str):
-                if not vesting_str:
-                    return 3.0  # default
-                vesting_str = str(vesting_str).lower()
-                if "immediate" in vesting_str:
-                    return 0.0
-                elif "3" in vesting_str and "cliff" in vesting_str:
-                    return 3.0
-                elif "5" in vesting_str and "cliff" in vesting_str:
-                    return 5.0
-                elif "grad" in vesting_str:
-                    return 6.0
-                return 3.0  # default
-
-            values = [vesting_to_numeric(c.get("vesting_schedule")) for c in cohort_dicts]
-
-            bins = []
-            for bin_def in bin_definitions:
-                count = sum(1 for v in values if bin_def["binStart"] <= v < bin_def["binEnd"])
-                bins.append({**bin_def, "count": count})
-
-            client_value = vesting_to_numeric(client_dict.get("vesting_schedule"))
-            peer_average = sum(values) / len(values) if values else 0
-            title = "Vesting Schedule Distribution"
-            unit = "years"
-            national_average = peer_average
-
-        elif metric == "auto_escalation":
-            bin_definitions = [
-                {"bin": "0%", "binStart": 0.0, "binEnd": 1.0},
-                {"bin": "6%", "binStart": 6.0, "binEnd": 8.0},
-                {"bin": "10%", "binStart": 10.0, "binEnd": 12.0},
-                {"bin": "15%", "binStart": 15.0, "binEnd": 16.0},
-                {"bin": "≥20%", "binStart": 20.0, "binEnd": 9999.0}
-            ]
-
-            field_name = "auto_escalation_cap"
-            values = [(float(c.get(field_name) or 0) * 100) for c in cohort_dicts]
-
-            bins = []
-            for bin_def in bin_definitions:
-                count = sum(1 for v in values if bin_def["binStart"] <= v < bin_def["binEnd"])
-                bins.append({**bin_def, "count": count})
-
-            client_value = float(client_dict.get(field_name) or 0) * 100 or 10.0
-            peer_average = sum(values) / len(values) if values else 0
-            title = "Auto-Escalation Cap Distribution"
-            unit = "%"
-            national_average = peer_average
-
         else:
             # Default/unknown metric
             bins = []
@@ -690,7 +451,7 @@ def get_distributions(
             "peerAverage": peer_average,
             "nationalAverage": national_average,
             "clientValue": client_value,
-            "cohortSize": len(cohort_data) if cohort_data else 260
+            "cohortSize": cohort_size if cohort_size else 260
         }
 
     finally:
@@ -724,6 +485,17 @@ def map_field_name(field_name: str) -> str:
     # Otherwise map from display name
     return FIELD_NAME_MAP.get(field_name, field_name)
 
+def editable_field(field_name: str) -> str:
+    """DB column for a display or column name; 400 unless the API may edit it (queries.EDITABLE_COLUMNS)"""
+    column = map_field_name(field_name)
+    if column not in UPDATE_FIELD:
+        raise HTTPException(status_code=400, detail={
+            "error": "unknown_field",
+            "message": f"{field_name} is not an editable field",
+            "field": field_name
+        })
+    return column
+
 class FieldUpdate(BaseModel):
     new_value: str
     reason: Optional[str] = None
@@ -739,27 +511,27 @@ class AuditLogEntry(BaseModel):
     id: str
     timestamp: str
     old_value: Optional[str]
-    new_value: str
+    new_value: Optional[str]
     updated_by: str
     reason: str
     notes: Optional[str]
 
-def validate_field_value(field_name: str, value: str) -> tuple[bool, Optional[str]]:
-    """Validate field value against validation rules"""
-    conn = duckdb.connect(str(DB_PATH), read_only=True)
+def validate_field_value(field_name: str, value: str, conn=None) -> tuple[bool, Optional[str]]:
+    """Validate field value against validation rules
+
+    Pass the caller's open connection when it already holds a read-write handle:
+    DuckDB refuses a second read-only connection to the same file in-process.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect(str(DB_PATH), read_only=True)
 
     try:
-        rule = conn.execute(
-            "SELECT * FROM field_validation_rules WHERE field_name = ?",
-            [field_name]
-        ).fetchone()
+        rule_dict = FIELD_RULE.one(conn, field_name)
 
-        if not rule:
+        if rule_dict is None:
             return True, None  # No rule = no validation
 
-        columns = [desc[0] for desc in conn.description]
-        rule_dict = dict(zip(columns, rule))
-
         # Type validation
         data_type = rule_dict.get("data_type")
 
@@ -784,16 +556,17 @@ def validate_field_value(field_name: str, value: str) -> tuple[bool, Optional[st
         return True, None
 
     finally:
-        conn.close()
+        if owns_conn:
+            conn.close()
 
 @app.patch("/api/v1/clients/{client_id}/fields/{field_name}")
-async def update_field(client_id: str, field_name: str, update: FieldUpdate):
+def update_field(client_id: str, field_name: str, update: FieldUpdate):
     """Update a single field with validation and audit logging"""
     import uuid
     from datetime import datetime
 
     # Map display name to DB column name
-    db_field_name = map_field_name(field_name)
+    db_field_name = editable_field(field_name)
 
     # Validate the new value
     is_valid, error_msg = validate_field_value(db_field_name, update.new_value)
@@ -805,47 +578,43 @@ async def update_field(client_id: str, field_name: str, update: FieldUpdate):
             "provided_value": update.new_value
         })
 
-    conn = duckdb.connect(str(DB_PATH))
+    # Industries whose scorecard snapshots this update makes stale
+    industries = set()
+    audit_ids = []
+    conn = connect(str(DB_PATH))
 
     try:
         # Get old value
-        old_value_row = conn.execute(
-            f"SELECT {db_field_name} FROM plan_designs WHERE client_id = ?",
-            [client_id]
-        ).fetchone()
+        old_value_row = SELECT_FIELD[db_field_name].one(conn, client_id)
 
         if not old_value_row:
             raise HTTPException(status_code=404, detail="Client not found")
 
         old_value = str(old_value_row[0]) if old_value_row[0] is not None else None
+        industries.add(old_value_row[1])
+        if db_field_name == "industry":
+            industries.add(update.new_value)
 
-        # Update the field
-
-        conn.execute(
-            f"""
-            UPDATE plan_designs
-            SET {db_field_name} = ?,
-                updated_at = CURRENT_TIMESTAMP,
-                updated_by = ?
-            WHERE client_id = ?
-            """,
-            [update.new_value, update.updated_by, client_id]
-        )
-
-        # Create audit log entry
+        # Update the field, its derived columns and the audit log together
         audit_id = str(uuid.uuid4())
-        conn.execute(
-            """
-            INSERT INTO audit_log (
-                id, client_id, field_name, old_value, new_value,
-                change_type, reason, notes, updated_by, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """,
-            [
-                audit_id, client_id, db_field_name, old_value, update.new_value,
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            UPDATE_FIELD[db_field_name].run(conn, update.new_value, update.updated_by, client_id)
+
+            # Keep the parsed formula/vesting columns in step with the free text
+            if db_field_name in FORMULA_SOURCE_FIELDS:
+                refresh_client_formulas(conn, client_id)
+            REFRESH_FINGERPRINT.run(conn, client_id)
+
+            INSERT_AUDIT.run(
+                conn, audit_id, client_id, db_field_name, old_value, update.new_value,
                 'update', update.reason or 'manual_update', update.notes, update.updated_by
-            ]
-        )
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        audit_ids.append(audit_id)
 
         # Return updated field
         return {
@@ -858,23 +627,79 @@ async def update_field(client_id: str, field_name: str, update: FieldUpdate):
         }
 
     finally:
+        publish_changes(conn, client_id, audit_ids)
         conn.close()
+        invalidate_snapshots(industries)
+
+def publish_changes(conn, client_id: str, audit_ids: List[str]):
+    """Send the audit rows a write produced to the change feed (changes.py) and the read replicas"""
+    if audit_ids:
+        feed.publish(load_events(conn, audit_ids))
+        replicas = get_replicas(DB_PATH)
+        if replicas is not None:
+            replicas.note_write([client_id])
+
+@app.get("/api/v1/changes/stream")
+async def stream_changes(request: Request, client_ids: Optional[str] = None, cursor: Optional[str] = None):
+    """Server-sent events for plan edits, optionally for some clients only, resuming after `cursor`"""
+    subscribed = frozenset(c.strip() for c in client_ids.split(",") if c.strip()) if client_ids else None
+    return StreamingResponse(
+        # Replays read the primary: a replica may not hold the events after the cursor yet
+        event_stream(feed, lambda: connect(str(DB_PATH), read_only=True),
+                     cursor or request.headers.get("Last-Event-ID"), subscribed),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def page_size(limit: int) -> int:
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
 
 @app.get("/api/v1/audit-log", response_model=List[AuditLogEntry])
-def get_audit_log(limit: int = 50):
-    """Get global audit log history"""
-    conn = duckdb.connect(str(DB_PATH), read_only=True)
+def get_audit_log(
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    client_id: Optional[str] = None,
+    field_name: Optional[str] = None,
+    updated_by: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """
+    Get global audit log history, newest first.
+
+    Keyset-paginated (audit.py): when more rows follow, the `X-Next-Cursor`
+    header holds the `cursor` for the next page. The first page also carries
+    `X-Total-Count` for the filters, with `X-Total-Count-Approximate: true`
+    when it is an estimate.
+
+    Args:
+        limit: Page size (1-1000)
+        cursor: X-Next-Cursor of the previous page
+        client_id, field_name, updated_by: Equality filters (field display names are accepted)
+        since, until: updated_at range (inclusive / exclusive)
+    """
+    limit = page_size(limit)
+    conn = get_db(client_id)
     try:
-        # Check if audit_log table exists
-        table_exists = conn.execute(
-            "SELECT count(*) FROM information_schema.tables WHERE table_name = 'audit_log'"
-        ).fetchone()[0] > 0
+        # audit_log, or its union with the Parquet archive (None if there is no audit table)
+        source = audit_source(conn)
 
-        if not table_exists:
+        if source is None:
             return []
 
-        query = """
-            SELECT
+        conditions, params = audit_filters(
+            client_id=client_id,
+            field_name=map_field_name(field_name) if field_name else None,
+            updated_by=updated_by,
+            since=since,
+            until=until,
+            source=source
+        )
+        try:
+            result, next_cursor = fetch_audit_page(conn, """
                 id,
                 CAST(updated_at AS VARCHAR) as timestamp,
                 old_value,
@@ -882,11 +707,16 @@ def get_audit_log(limit: int = 50):
                 updated_by,
                 reason,
                 notes
-            FROM audit_log
-            ORDER BY updated_at DESC
-            LIMIT ?
-        """
-        result = conn.execute(query, [limit]).fetchall()
+            """, conditions, params, cursor, limit, source)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if not cursor:
+            total, approximate = approximate_count(conn, conditions, params, source)
+            response.headers["X-Total-Count"] = str(total)
+            response.headers["X-Total-Count-Approximate"] = "true" if approximate else "false"
 
         log_entries = []
         for row in result:
@@ -904,77 +734,73 @@ def get_audit_log(limit: int = 50):
 
     finally:
         conn.close()
+
 @app.put("/api/v1/clients/{client_id}")
-async def bulk_update_fields(client_id: str, updates: BulkUpdate):
+def bulk_update_fields(client_id: str, updates: BulkUpdate):
     """Update multiple fields in single transaction"""
     import uuid
     from datetime import datetime
 
-    conn = duckdb.connect(str(DB_PATH))
+    industries = set()
+    audit_ids = []
+    conn = connect(str(DB_PATH))
 
     try:
         # Verify client exists
-        client = conn.execute(
-            "SELECT client_id FROM plan_designs WHERE client_id = ?",
-            [client_id]
-        ).fetchone()
+        industry = CLIENT_INDUSTRY.one(conn, client_id)
 
-        if not client:
+        if industry is None:
             raise HTTPException(status_code=404, detail="Client not found")
+        industries.add(industry)
 
-        changes = []
-        audit_ids = []
-
-        # Process each update
+        # Validate every update before writing any of them
+        items = []
         for update_item in updates.updates:
-            field_name = update_item["field_name"]
+            field_name = editable_field(update_item["field_name"])
             new_value = update_item["new_value"]
-            reason = update_item.get("reason", "bulk_update")
 
-            # Validate
-            is_valid, error_msg = validate_field_value(field_name, str(new_value))
+            is_valid, error_msg = validate_field_value(field_name, str(new_value), conn)
             if not is_valid:
                 raise HTTPException(status_code=400, detail={
                     "error": "validation_error",
                     "message": error_msg,
                     "field": field_name
                 })
+            items.append((field_name, new_value, update_item.get("reason", "bulk_update")))
 
-            # Get old value
-            old_value = conn.execute(
-                f"SELECT {field_name} FROM plan_designs WHERE client_id = ?",
-                [client_id]
-            ).fetchone()[0]
-
-            # Update field
-            conn.execute(
-                f"UPDATE plan_designs SET {field_name} = ? WHERE client_id = ?",
-                [new_value, client_id]
-            )
+        changes = []
+        audit_rows = []
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            for field_name, new_value, reason in items:
+                old_value = SELECT_FIELD[field_name].one(conn, client_id)[0]
+                UPDATE_FIELD[field_name].run(conn, new_value, updates.updated_by, client_id)
+                if field_name == "industry":
+                    industries.add(new_value)
+
+                audit_id = f"audit-{uuid.uuid4()}"
+                audit_rows.append([
+                    audit_id, client_id, field_name, str(old_value), str(new_value),
+                    'bulk_update', reason, updates.notes, updates.updated_by
+                ])
+                changes.append({
+                    "field_name": field_name,
+                    "old_value": str(old_value) if old_value else None,
+                    "new_value": str(new_value),
+                    "status": "success"
+                })
 
-            # Create audit log
-            audit_id = f"audit-{uuid.uuid4()}"
-            conn.execute("""
-                INSERT INTO audit_log
-                (id, client_id, field_name, old_value, new_value, change_type, reason, notes, updated_by)
-                VALUES (?, ?, ?, ?, ?, 'bulk_update', ?, ?, ?)
-            """, [audit_id, client_id, field_name, str(old_value), str(new_value), reason, updates.notes, updates.updated_by])
+            if any(change["field_name"] in FORMULA_SOURCE_FIELDS for change in changes):
+                refresh_client_formulas(conn, client_id)
+            REFRESH_FINGERPRINT.run(conn, client_id)
 
-            changes.append({
-                "field_name": field_name,
-                "old_value": str(old_value) if old_value else None,
-                "new_value": str(new_value),
-                "status": "success"
-            })
-            audit_ids.append(audit_id)
-
-        # Update metadata
-        conn.execute("""
-            UPDATE plan_designs
-            SET updated_at = CURRENT_TIMESTAMP,
-                updated_by = ?
-            WHERE client_id = ?
-        """, [updates.updated_by, client_id])
+            # One prepared statement for every audit row
+            INSERT_AUDIT.many(conn, audit_rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        audit_ids = [row[0] for row in audit_rows]
 
         return {
             "client_id": client_id,
@@ -984,29 +810,36 @@ async def bulk_update_fields(client_id: str, updates: BulkUpdate):
         }
 
     finally:
+        publish_changes(conn, client_id, audit_ids)
         conn.close()
+        invalidate_snapshots(industries)
 
 @app.get("/api/v1/clients/{client_id}/fields/{field_name}/history")
-async def get_field_history(client_id: str, field_name: str, limit: int = 20):
-    """Get audit log for a specific field"""
+def get_field_history(client_id: str, field_name: str, limit: int = 20, cursor: Optional[str] = None):
+    """
+    Get audit log for a specific field, newest first.
+
+    Pass the response's `next_cursor` as `cursor` to get the following page
+    (None on the last page).
+    """
+    limit = page_size(limit)
     # Map display name to DB column name
-    db_field_name = map_field_name(field_name)
+    db_field_name = editable_field(field_name)
 
-    conn = get_db()
+    conn = get_db(client_id)
 
     try:
         # Get current value
-        current = conn.execute(
-            f"SELECT {db_field_name} FROM plan_designs WHERE client_id = ?",
-            [client_id]
-        ).fetchone()
+        current = SELECT_FIELD[db_field_name].one(conn, client_id)
 
         if not current:
             raise HTTPException(status_code=404, detail="Client not found")
 
-        # Get change history
-        history = conn.execute("""
-            SELECT
+        # Get change history (archived changes included)
+        source = audit_source(conn) or "audit_log"
+        conditions, params = audit_filters(client_id=client_id, field_name=db_field_name, source=source)
+        try:
+            history, next_cursor = fetch_audit_page(conn, """
                 id,
                 updated_at,
                 old_value,
@@ -1015,11 +848,9 @@ async def get_field_history(client_id: str, field_name: str, limit: int = 20):
                 reason,
                 notes,
                 confidence_score
-            FROM audit_log
-            WHERE client_id = ? AND field_name = ?
-            ORDER BY updated_at DESC
-            LIMIT ?
-        """, [client_id, db_field_name, limit]).fetchall()
+            """, conditions, params, cursor, limit, source)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
         changes = []
         for row in history:
@@ -1038,15 +869,21 @@ async def get_field_history(client_id: str, field_name: str, limit: int = 20):
             "client_id": client_id,
             "field_name": field_name,
             "current_value": str(current[0]) if current[0] else None,
-            "changes": changes
+            "changes": changes,
+            "next_cursor": next_cursor
         }
 
     finally:
         conn.close()
 
 @app.post("/api/v1/export/excel")
-async def export_to_excel(client_ids: Optional[List[str]] = None, include_audit_trail: bool = False):
-    """Export database to Excel file"""
+def export_to_excel(request: Request, client_ids: Optional[List[str]] = None, include_audit_trail: bool = False):
+    """
+    Export database to Excel file.
+
+    Clients that accept `application/vnd.apache.arrow.stream` get the plan rows
+    as an Arrow IPC stream instead of a workbook.
+    """
     import pandas as pd
     from datetime import datetime
     import io
@@ -1055,17 +892,18 @@ async def export_to_excel(client_ids: Optional[List[str]] = None, include_audit_
     conn = get_db()
 
     try:
-        # Build query
+        # Build query; Excel cells can't hold lists, so the parsed match tiers go out as JSON text
+        query = "SELECT * REPLACE (CAST(to_json(match_tiers) AS VARCHAR) AS match_tiers) FROM plan_designs"
+        params = []
         if client_ids:
-            placeholders = ','.join(['?' for _ in client_ids])
-            query = f"SELECT * FROM plan_designs WHERE client_id IN ({placeholders})"
-            df = pd.DataFrame(conn.execute(query, client_ids).fetchall())
-        else:
-            df = pd.DataFrame(conn.execute("SELECT * FROM plan_designs").fetchall())
+            query += " WHERE client_id IN (SELECT unnest(?::VARCHAR[]))"
+            params.append(client_ids)
+
+        if wants_arrow(request):
+            return arrow_response(conn, query + " ORDER BY client_id", params)
 
-        # Get column names
-        columns = [desc[0] for desc in conn.description]
-        df.columns = columns
+        # Columnar fetch straight into a DataFrame (no per-row tuples)
+        df = conn.execute(query, params).df()
 
         # Create Excel file in memory
         output = io.BytesIO()
@@ -1073,11 +911,9 @@ async def export_to_excel(client_ids: Optional[List[str]] = None, include_audit_
             df.to_excel(writer, sheet_name='Plan Data', index=False)
 
             if include_audit_trail:
-                audit_df = pd.DataFrame(
-                    conn.execute("SELECT * FROM audit_log ORDER BY updated_at DESC").fetchall()
-                )
-                audit_columns = [desc[0] for desc in conn.description]
-                audit_df.columns = audit_columns
+                source = audit_source(conn) or "audit_log"
+                columns = "* EXCLUDE (month)" if source == ARCHIVE_VIEW else "*"
+                audit_df = conn.execute(f"SELECT {columns} FROM {source} ORDER BY updated_at DESC").df()
                 audit_df.to_excel(writer, sheet_name='Audit Trail', index=False)
 
         output.seek(0)
@@ -1101,12 +937,13 @@ def health_check():
     """Health check endpoint"""
     try:
         conn = get_db()
-        count = conn.execute("SELECT COUNT(*) FROM plan_designs").fetchone()[0]
+        count = COUNT_PLANS.one(conn)
         conn.close()
         return {
             "status": "healthy",
             "database": "connected",
-            "total_plans": count
+            "total_plans": count,
+            "role": server_role()
         }
     except Exception as e:
         return {
@@ -1114,78 +951,67 @@ def health_check():
             "error": str(e)
         }
 
+@app.get("/api/v1/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus metrics: request latency, DuckDB query counts and durations per route"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/v1/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: str, format: str = "collapsed"):
+    """Stored request profile: collapsed stacks (flamegraph input) or the JSON report"""
+    if not profiling_enabled():
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    content = load_profile(profile_id, format)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/json" if format == "json" else "text/plain"
+    return PlainTextResponse(content, media_type=media_type)
+
+def build_regional_benchmark(context: dict) -> List[BenchmarkDataPoint]:
+    """Regional benchmark rows from a client context (client_context.py)"""
+    client_dict = context["client"]
+    ae_rate, match_rate, esc_cap = (client_dict.get(column) for column in (
+        "auto_enrollment_rate", "match_effective_rate", "auto_escalation_cap"
+    ))
+
+    # Handle nulls
+    ae_rate = float(ae_rate) * 100 if ae_rate is not None else 0
+    match_rate = float(match_rate) * 100 if match_rate is not None else 0
+    esc_cap = float(esc_cap) * 100 if esc_cap is not None else 0
+
+    region_cohort = context["region_cohort"]
+    if not region_cohort["cohort_size"]:
+        # Fallback to mock data if no peers found (for demo purposes)
+        return [
+            BenchmarkDataPoint(name='Auto-Enroll Rate', client=ae_rate, regionMedian=4.0, topQuartile=6.0, unit='%'),
+            BenchmarkDataPoint(name='Match Cap', client=match_rate, regionMedian=3.5, topQuartile=5.0, unit='%'),
+            BenchmarkDataPoint(name='Escalation Cap', client=esc_cap, regionMedian=10.0, topQuartile=15.0, unit='%')
+        ]
+
+    # Median and top quartile per metric
+    ae_median, ae_p75 = region_cohort["benchmarks"]["auto_enrollment_rate"]
+    match_median, match_p75 = region_cohort["benchmarks"]["match_effective_rate"]
+    esc_median, esc_p75 = region_cohort["benchmarks"]["auto_escalation_cap"]
+
+    return [
+        BenchmarkDataPoint(name='Auto-Enroll Rate', client=ae_rate, regionMedian=ae_median, topQuartile=ae_p75, unit='%'),
+        BenchmarkDataPoint(name='Match Cap', client=match_rate, regionMedian=match_median, topQuartile=match_p75, unit='%'),
+        BenchmarkDataPoint(name='Escalation Cap', client=esc_cap, regionMedian=esc_median, topQuartile=esc_p75, unit='%')
+    ]
+
 @app.get("/api/v1/clients/{client_id}/regional-benchmark", response_model=List[BenchmarkDataPoint])
 def get_regional_benchmark(client_id: str):
     """Get regional benchmark data for a client"""
-    conn = get_db()
+    conn = get_db(client_id)
     try:
-        # 1. Get target client info
-        client = conn.execute(
-            "SELECT industry, state, auto_enrollment_rate, match_effective_rate, auto_escalation_cap FROM plan_designs WHERE client_id = ?",
-            [client_id]
-        ).fetchone()
+        # Target client and its region cohort (same industry and census region,
+        # or the whole industry when the state has no region) in one query
+        context = load_client_context(conn, client_id)
 
-        if not client:
+        if context is None:
             raise HTTPException(status_code=404, detail="Client not found")
 
-        industry, state, ae_rate, match_rate, esc_cap = client
-        
-        # Handle nulls
-        ae_rate = float(ae_rate) * 100 if ae_rate is not None else 0
-        match_rate = float(match_rate) * 100 if match_rate is not None else 0
-        esc_cap = float(esc_cap) * 100 if esc_cap is not None else 0
-
-        # 2. Determine Region
-        REGIONS = {
-            'CT': 'Northeast', 'ME': 'Northeast', 'MA': 'Northeast', 'NH': 'Northeast', 'RI': 'Northeast', 'VT': 'Northeast', 'NJ': 'Northeast', 'NY': 'Northeast', 'PA': 'Northeast',
-            'IL': 'Midwest', 'IN': 'Midwest', 'MI': 'Midwest', 'OH': 'Midwest', 'WI': 'Midwest', 'IA': 'Midwest', 'KS': 'Midwest', 'MN': 'Midwest', 'MO': 'Midwest', 'NE': 'Midwest', 'ND': 'Midwest', 'SD': 'Midwest',
-            'DE': 'South', 'FL': 'South', 'GA': 'South', 'MD': 'South', 'NC': 'South', 'SC': 'South', 'VA': 'South', 'DC': 'South', 'WV': 'South', 'AL': 'South', 'KY': 'South', 'MS': 'South', 'TN': 'South', 'AR': 'South', 'LA': 'South', 'OK': 'South', 'TX': 'South',
-            'AZ': 'West', 'CO': 'West', 'ID': 'West', 'MT': 'West', 'NV': 'West', 'NM': 'West', 'UT': 'West', 'WY': 'West', 'AK': 'West', 'CA': 'West', 'HI': 'West', 'OR': 'West', 'WA': 'West'
-        }
-        
-        target_region = REGIONS.get(state, None)
-        
-        # 3. Build Peer Query
-        # If we have a region, filter by it. Otherwise fallback to industry only.
-        peer_query = "SELECT auto_enrollment_rate, match_effective_rate, auto_escalation_cap FROM plan_designs WHERE industry = ?"
-        params = [industry]
-        
-        if target_region:
-            # Get all states in this region
-            region_states = [s for s, r in REGIONS.items() if r == target_region]
-            placeholders = ','.join(['?'] * len(region_states))
-            peer_query += f" AND state IN ({placeholders})"
-            params.extend(region_states)
-            
-        peers = conn.execute(peer_query, params).fetchall()
-        
-        if not peers:
-            # Fallback to mock data if no peers found (for demo purposes)
-            return [
-                BenchmarkDataPoint(name='Auto-Enroll Rate', client=ae_rate, regionMedian=4.0, topQuartile=6.0, unit='%'),
-                BenchmarkDataPoint(name='Match Cap', client=match_rate, regionMedian=3.5, topQuartile=5.0, unit='%'),
-                BenchmarkDataPoint(name='Escalation Cap', client=esc_cap, regionMedian=10.0, topQuartile=15.0, unit='%')
-            ]
-
-        # 4. Calculate Stats
-        def get_stats(data_index):
-            values = [float(p[data_index]) * 100 for p in peers if p[data_index] is not None]
-            if not values: return 0, 0
-            values.sort()
-            n = len(values)
-            median = values[n // 2]
-            p75 = values[int(n * 0.75)]
-            return median, p75
-
-        ae_median, ae_p75 = get_stats(0)
-        match_median, match_p75 = get_stats(1)
-        esc_median, esc_p75 = get_stats(2)
-
-        return [
-            BenchmarkDataPoint(name='Auto-Enroll Rate', client=ae_rate, regionMedian=ae_median, topQuartile=ae_p75, unit='%'),
-            BenchmarkDataPoint(name='Match Cap', client=match_rate, regionMedian=match_median, topQuartile=match_p75, unit='%'),
-            BenchmarkDataPoint(name='Escalation Cap', client=esc_cap, regionMedian=esc_median, topQuartile=esc_p75, unit='%')
-        ]
+        return build_regional_benchmark(context)
 
     except Exception as e:
         print(f"Error calculating benchmarks: {e}")
@@ -1193,6 +1019,61 @@ def get_regional_benchmark(client_id: str):
     finally:
         conn.close()
 
+# Client-detail panels the dashboard can assemble, in response order
+DASHBOARD_SECTIONS = (
+    "client", "extractions", "regional_benchmark", "peers", "peer_assessment", "navigator_scorecard"
+)
+
+@app.get("/api/v1/clients/{client_id}/dashboard")
+def get_client_dashboard(client_id: str, fields: Optional[str] = None):
+    """
+    Get every client-detail panel in one response.
+
+    Each section matches its standalone endpoint (`client` is
+    GET /clients/{id}, `regional_benchmark` is /regional-benchmark, ...).
+    All of them are built from one client context, so the page costs a
+    single connection and query however many sections it asks for; the
+    panels themselves are in-memory transforms of that context.
+
+    Args:
+        fields: Comma-separated sections to include (default: all)
+    """
+    if fields:
+        sections = [section.strip() for section in fields.split(",") if section.strip()]
+        unknown = [section for section in sections if section not in DASHBOARD_SECTIONS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown dashboard fields: {', '.join(unknown)}. Valid fields: {', '.join(DASHBOARD_SECTIONS)}"
+            )
+    else:
+        sections = DASHBOARD_SECTIONS
+
+    conn = get_db(client_id)
+    try:
+        context = load_client_context(conn, client_id)
+    finally:
+        conn.close()
+
+    if context is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    client_dict = context["client"]
+    builders = {
+        "client": lambda: client_dict,
+        "extractions": lambda: build_extractions(client_dict),
+        "regional_benchmark": lambda: build_regional_benchmark(context),
+        "peers": lambda: build_peer_comparison(client_id, context),
+        "peer_assessment": lambda: build_peer_assessment(client_dict, context["industry"]),
+        "navigator_scorecard": lambda: build_navigator_scorecard(client_dict),
+    }
+
+    dashboard = {"client_id": client_id}
+    for section in DASHBOARD_SECTIONS:
+        if section in sections:
+            dashboard[section] = builders[section]()
+    return dashboard
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,385 @@
+"""
+Point-in-time plan reconstruction from full snapshots plus audit_log deltas.
+
+`take_snapshot` copies the whole of plan_designs into `plan_history`, stamped
+with `snapshot_at`; `plan_history_runs` lists the snapshot times. To rebuild
+the plans as of a timestamp, `as_of_query` starts from the nearest base state
+around it and replays only the audit rows in between:
+
+- forward from the latest snapshot at or before as_of: each changed field
+  takes the new_value of its last change up to as_of
+- backward from the next snapshot after as_of (or the live table): each
+  changed field takes the old_value of its first change after as_of
+
+Whichever base is closer in time wins, so replay never covers more than half
+the interval between snapshots, however far back as_of is. Import inserts and
+deletes (field_name '*') decide whether a plan existed at as_of; plans missing
+from the chosen base are rebuilt from the other one.
+
+States in the past never change (new audit rows are stamped with the current
+time), so whole industries reconstructed by `cohort_as_of` are cached.
+
+Take snapshots from cron (weekly is plenty for renewal lookups), or backfill
+one from existing history:
+
+    python -m backend.plan_history snapshot
+    python -m backend.plan_history snapshot --at 2024-01-01
+"""
+import argparse
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "database"))
+from plan_formulas import TIERS_TYPE, parse_match_formula, parse_vesting_schedule
+
+try:
+    from backend.audit import audit_source
+    from backend.instrumentation import connect
+except ImportError:  # started from backend/
+    from audit import audit_source
+    from instrumentation import connect
+
+DB_PATH = Path(__file__).parent.parent / "data" / "planwise.db"
+# Reconstructed industry cohorts kept in memory
+COHORT_CACHE_SIZE = 16
+
+# Parsed formula lookups passed as query parameters (see plan_formulas.FORMULA_COLUMNS)
+MATCH_PARSED_TYPE = (
+    f"STRUCT(source VARCHAR, match_tiers {TIERS_TYPE}, match_max_rate DOUBLE, match_deferral_cap DOUBLE)"
+)
+VESTING_PARSED_TYPE = "STRUCT(source VARCHAR, vesting_type VARCHAR, vesting_years DOUBLE)"
+STRUCT_COLUMNS = {
+    "match_formula": ("match_tiers", "match_max_rate", "match_deferral_cap"),
+    "vesting_schedule": ("vesting_type", "vesting_years"),
+}
+
+RUNS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS plan_history_runs (
+        snapshot_at TIMESTAMP PRIMARY KEY,
+        plans BIGINT NOT NULL,
+        taken_at TIMESTAMP NOT NULL
+    )
+"""
+
+
+def naive_timestamp(as_of: datetime) -> datetime:
+    """Audit timestamps are naive local time; convert aware timestamps to match."""
+    return as_of.astimezone().replace(tzinfo=None) if as_of.tzinfo else as_of
+
+
+def _snapshot_bounds(conn, as_of: datetime) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Latest snapshot at or before as_of and earliest one after it (None where there is none)."""
+    has_history = conn.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'plan_history_runs'"
+    ).fetchone()[0] > 0
+    if not has_history:
+        return None, None
+    return conn.execute("""
+        SELECT MAX(snapshot_at) FILTER (WHERE snapshot_at <= ?), MIN(snapshot_at) FILTER (WHERE snapshot_at > ?)
+        FROM plan_history_runs
+    """, [as_of, as_of]).fetchone()
+
+
+def _parsed_formulas(conn, source: str, window: str, window_params: List[Any], value: str,
+                     fields: List[str]) -> Dict[str, Tuple[str, List[dict]]]:
+    """
+    Derived formula columns for every formula text replayed in the window.
+
+    Returns:
+        {source field: (struct type, rows)}; rows hold the text plus its derived columns
+    """
+    parsers = {
+        "match_formula": (MATCH_PARSED_TYPE, lambda text: (parse_match_formula(text) or {}), {
+            "match_tiers": "tiers", "match_max_rate": "max_rate", "match_deferral_cap": "deferral_cap",
+        }),
+        "vesting_schedule": (VESTING_PARSED_TYPE, lambda text: (parse_vesting_schedule(text) or {}), {
+            "vesting_type": "type", "vesting_years": "years",
+        }),
+    }
+    parsed = {}
+    for field in fields:
+        if field not in parsers:
+            continue
+        struct_type, parse, derived = parsers[field]
+        texts = conn.execute(
+            f"SELECT DISTINCT {value} FROM {source} WHERE {window} AND field_name = ? AND {value} IS NOT NULL",
+            window_params + [field]
+        ).fetchall()
+        rows = []
+        for (text,) in texts:
+            result = parse(text)
+            rows.append({"source": text, **{column: result.get(key) for column, key in derived.items()}})
+        parsed[field] = (struct_type, rows)
+    return parsed
+
+
+def _replay_query(conn, source: str, columns: List[Tuple[str, str]], base_at: Optional[datetime],
+                  as_of: datetime, forward: bool, client_ids: Optional[List[str]]) -> Tuple[str, List[Any], bool]:
+    """
+    SQL replaying the audit rows between one base state and as_of.
+
+    Args:
+        source: Audit relation (audit.audit_source)
+        columns: plan_designs (name, type) pairs
+        base_at: Snapshot time, or None for the live table
+        forward: Replay forward from an earlier snapshot (else backward from a later base)
+
+    Returns:
+        (sql, params, window_has_inserts_or_deletes)
+    """
+    if base_at is None:
+        base, base_params = "SELECT * FROM plan_designs", []
+    else:
+        base, base_params = "SELECT * EXCLUDE (snapshot_at) FROM plan_history WHERE snapshot_at = ?", [base_at]
+    if client_ids is not None:
+        base += (" AND" if " WHERE " in base else " WHERE") + " client_id IN (SELECT unnest(?::VARCHAR[]))"
+        base_params.append(client_ids)
+
+    low, high = (base_at, as_of) if forward else (as_of, base_at)
+    window = "updated_at > ?" + (" AND updated_at <= ?" if high is not None else "")
+    window_params = [low] + ([high] if high is not None else [])
+    changed = {name for (name,) in conn.execute(
+        f"SELECT DISTINCT field_name FROM {source} WHERE {window}", window_params
+    ).fetchall()}
+    types = dict(columns)
+    fields = sorted(name for name in changed if name in types and name != "client_id")
+
+    # Each changed field's value at as_of: last new_value up to it, or first old_value after it
+    pick, value = ("arg_max", "new_value") if forward else ("arg_min", "old_value")
+    # Forward: plans deleted by as_of are gone; backward: plans inserted after as_of did not exist yet
+    existence = "arg_max(change_type, updated_at) = 'import_delete'" if forward else (
+        "arg_min(change_type, updated_at) = 'import_insert'"
+    )
+    ctes = [
+        f"base AS ({base})",
+        f"""gone AS (
+            SELECT client_id FROM {source}
+            WHERE {window} AND field_name = '*'
+            GROUP BY client_id HAVING {existence}
+        )""",
+    ]
+    params = base_params + window_params
+    if not fields:
+        sql = f"WITH {', '.join(ctes)} SELECT * FROM base WHERE client_id NOT IN (SELECT client_id FROM gone)"
+        return sql, params, "*" in changed
+
+    aggregates = ", ".join(
+        f"bool_or(field_name = '{name}') AS \"{name}__changed\", "
+        f"{pick}({value}, updated_at) FILTER (WHERE field_name = '{name}') AS \"{name}__value\""
+        for name in fields
+    )
+    replaced = ", ".join(
+        f'CASE WHEN c."{name}__changed" THEN TRY_CAST(c."{name}__value" AS {types[name]}) '
+        f'ELSE base."{name}" END AS "{name}"'
+        for name in fields
+    )
+    ctes.append(f"""changes AS (
+            SELECT client_id, {aggregates}
+            FROM {source}
+            WHERE {window} AND field_name IN (SELECT unnest(?::VARCHAR[]))
+            GROUP BY client_id
+        )""")
+    params += window_params + [fields]
+
+    # Derived formula columns follow their (replayed) source text
+    parsed = _parsed_formulas(conn, source, window, window_params, value, fields)
+    flags = ", ".join(f'c."{field}__changed" AS "{field}__changed"' for field in parsed)
+    ctes.append(f"""replayed AS (
+            SELECT base.* REPLACE ({replaced}){", " + flags if flags else ""}
+            FROM base LEFT JOIN changes c USING (client_id)
+            WHERE client_id NOT IN (SELECT client_id FROM gone)
+        )""")
+    joins, derived = [], []
+    for i, (field, (struct_type, rows)) in enumerate(parsed.items()):
+        ctes.append(f"parsed_{i} AS (SELECT unnest(?::{struct_type}[]) AS p)")
+        params.append(rows)
+        joins.append(f'LEFT JOIN parsed_{i} ON parsed_{i}.p.source = replayed."{field}"')
+        derived += [
+            f'CASE WHEN replayed."{field}__changed" THEN CAST(parsed_{i}.p.{column} AS {types[column]}) '
+            f'ELSE replayed."{column}" END AS "{column}"'
+            for column in STRUCT_COLUMNS[field] if column in types
+        ]
+
+    select = "replayed.*"
+    if parsed:
+        select += f" EXCLUDE ({', '.join(f'{chr(34)}{field}__changed{chr(34)}' for field in parsed)})"
+        if derived:
+            select += f" REPLACE ({', '.join(derived)})"
+    sql = f"WITH {', '.join(ctes)} SELECT {select} FROM replayed {' '.join(joins)}"
+    return sql, params, "*" in changed
+
+
+def as_of_query(conn, as_of: datetime, client_ids: Optional[List[str]] = None) -> Tuple[str, List[Any]]:
+    """
+    SQL selecting plan_designs rows as they were at `as_of`.
+
+    Args:
+        conn: Open connection
+        as_of: Point in time (aware timestamps are converted to local time)
+        client_ids: Restrict to these plans (None for every plan)
+
+    Returns:
+        (sql, params) with the same columns as plan_designs
+    """
+    as_of = naive_timestamp(as_of)
+    source = audit_source(conn)
+    if source is None:
+        # No history to replay
+        sql = "SELECT * FROM plan_designs"
+        if client_ids is not None:
+            return sql + " WHERE client_id IN (SELECT unnest(?::VARCHAR[]))", [client_ids]
+        return sql, []
+
+    columns = conn.execute(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_name = 'plan_designs' ORDER BY ordinal_position"
+    ).fetchall()
+    before, after = _snapshot_bounds(conn, as_of)
+
+    # Closer base first; the live table stands in for "after" when no later snapshot exists
+    after_distance = ((after or datetime.now()) - as_of).total_seconds()
+    bases = [(after, False)]
+    if before is not None:
+        bases.insert(0 if (as_of - before).total_seconds() < after_distance else 1, (before, True))
+
+    (base_at, forward), others = bases[0], bases[1:]
+    sql, params, has_existence_events = _replay_query(conn, source, columns, base_at, as_of, forward, client_ids)
+    if has_existence_events and others:
+        # Plans inserted or deleted near as_of may be missing from the closer base
+        other_at, other_forward = others[0]
+        other_sql, other_params, _ = _replay_query(
+            conn, source, columns, other_at, as_of, other_forward, client_ids
+        )
+        sql = f"""
+            WITH primary_plans AS ({sql})
+            SELECT * FROM primary_plans
+            UNION ALL BY NAME
+            SELECT * FROM ({other_sql}) WHERE client_id NOT IN (SELECT client_id FROM primary_plans)
+        """
+        params = params + other_params
+    return sql, params
+
+
+def load_plan_as_of(conn, client_id: str, as_of: datetime) -> Optional[dict]:
+    """One plan as it was at `as_of`, or None if it did not exist then."""
+    sql, params = as_of_query(conn, as_of, [client_id])
+    row = conn.execute(sql, params).fetchone()
+    if row is None:
+        return None
+    return dict(zip([desc[0] for desc in conn.description], row))
+
+
+_cohorts: "OrderedDict[tuple, Any]" = OrderedDict()
+_cohorts_lock = threading.Lock()
+
+
+def cohort_as_of(conn, db_key, industry: str, as_of: datetime):
+    """
+    Every plan of an industry as of a timestamp, as a DataFrame (LRU-cached).
+
+    Only past timestamps are cached; a state at or after the current time can
+    still change.
+
+    Args:
+        db_key: Identifies the database in the cache key (e.g. its path)
+    """
+    as_of = naive_timestamp(as_of)
+    key = (str(db_key), industry, as_of)
+    with _cohorts_lock:
+        if key in _cohorts:
+            _cohorts.move_to_end(key)
+            return _cohorts[key]
+
+    sql, params = as_of_query(conn, as_of)
+    cohort = conn.execute(f"SELECT * FROM ({sql}) WHERE industry = ?", params + [industry]).df()
+
+    if as_of < datetime.now():
+        with _cohorts_lock:
+            _cohorts[key] = cohort
+            while len(_cohorts) > COHORT_CACHE_SIZE:
+                _cohorts.popitem(last=False)
+    return cohort
+
+
+def clear_cohort_cache():
+    with _cohorts_lock:
+        _cohorts.clear()
+
+
+def take_snapshot(db_path=DB_PATH, at: Optional[datetime] = None) -> dict:
+    """
+    Store a full copy of plan_designs in plan_history.
+
+    Args:
+        db_path: Main database
+        at: Backfill the state as of this past time (rebuilt from the audit log)
+            instead of copying the current table
+
+    Returns:
+        Dictionary with snapshot_at and the number of plans stored
+    """
+    snapshot_at = naive_timestamp(at) if at else datetime.now()
+    conn = connect(str(db_path))
+    try:
+        conn.execute(RUNS_SCHEMA)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS plan_history AS
+            SELECT CAST(NULL AS TIMESTAMP) AS snapshot_at, * FROM plan_designs WITH NO DATA
+        """)
+        # Columns added to plan_designs since the first snapshot
+        history_columns = {name for (name,) in conn.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = 'plan_history'"
+        ).fetchall()}
+        for name, data_type in conn.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = 'plan_designs' ORDER BY ordinal_position"
+        ).fetchall():
+            if name not in history_columns:
+                conn.execute(f'ALTER TABLE plan_history ADD COLUMN "{name}" {data_type}')
+
+        sql, params = as_of_query(conn, snapshot_at) if at else ("SELECT * FROM plan_designs", [])
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            conn.execute("DELETE FROM plan_history WHERE snapshot_at = ?", [snapshot_at])
+            conn.execute(
+                f"INSERT INTO plan_history BY NAME SELECT ? AS snapshot_at, * FROM ({sql})",
+                [snapshot_at] + params
+            )
+            plans = conn.execute(
+                "SELECT COUNT(*) FROM plan_history WHERE snapshot_at = ?", [snapshot_at]
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO plan_history_runs VALUES (?, ?, ?)",
+                [snapshot_at, plans, datetime.now()]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return {"snapshot_at": snapshot_at, "plans": plans}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full plan_designs snapshots for point-in-time queries")
+    parser.add_argument("command", choices=["snapshot"])
+    parser.add_argument("--db", default=str(DB_PATH), help="DuckDB database (default: data/planwise.db)")
+    parser.add_argument("--at", type=datetime.fromisoformat, default=None,
+                        help="Backfill the state at this past timestamp from the audit log")
+    args = parser.parse_args()
+
+    try:
+        result = take_snapshot(args.db, args.at)
+    except Exception as e:
+        print(f"\n❌ Snapshot failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✓ Stored {result['plans']:,} plans as of {result['snapshot_at']:%Y-%m-%d %H:%M:%S}")
+
+
+if __name__ == "__main__":
+    main()
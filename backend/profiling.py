@@ -0,0 +1,225 @@
+"""
+On-demand profiling of individual API requests.
+
+Send `?profile=1` (or an `X-Profile: 1` header) to run that one request under a
+sampling profiler with DuckDB query profiling switched on. The result is a
+flamegraph-ready collapsed-stack file (`frame;frame;frame <microseconds>`, the
+format read by flamegraph.pl, speedscope and inferno) plus a JSON report with
+the raw DuckDB operator trees. Python frames and DuckDB operators end up in one
+file: DuckDB operators appear under a `[duckdb]` root, one child per statement.
+
+Guarded by environment variables so it is inert unless deliberately enabled:
+    PLANWISE_PROFILING=1          allow profiled requests
+    PLANWISE_PROFILE_TOKEN=...    optional shared secret (X-Profile-Token header)
+    PLANWISE_PROFILE_DIR=...      where profiles are stored (default data/profiles)
+
+Profiles are served back via GET /api/v1/profiles/{profile_id}.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+SAMPLE_INTERVAL = 0.001
+MAX_SQL_LABEL = 80
+DEFAULT_PROFILE_DIR = Path(__file__).parent.parent / "data" / "profiles"
+PROFILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+_session: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar(
+    "planwise_profile_session", default=None
+)
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get("PLANWISE_PROFILING", "").lower() in ("1", "true", "yes")
+
+
+def profile_dir() -> Path:
+    return Path(os.environ.get("PLANWISE_PROFILE_DIR", str(DEFAULT_PROFILE_DIR)))
+
+
+def profile_requested(request) -> bool:
+    """True when the request asks for profiling and the guard allows it."""
+    flag = request.query_params.get("profile") or request.headers.get("X-Profile")
+    if flag not in ("1", "true", "yes") or not profiling_enabled():
+        return False
+    token = os.environ.get("PLANWISE_PROFILE_TOKEN")
+    return not token or request.headers.get("X-Profile-Token") == token
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    """Stack samples and DuckDB profiles collected for one request."""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now()
+        self.stacks = defaultdict(float)  # collapsed stack -> seconds
+        self.queries = []
+        self.samples = 0
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start_sampling(self, thread_id: int, root_frame):
+        """Sample `thread_id`'s stack below `root_frame` until stop_sampling() is called."""
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, args=(thread_id, root_frame), daemon=True)
+        self._sampler.start()
+
+    def stop_sampling(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+
+    def _sample(self, thread_id: int, root_frame):
+        root = f"{self.method} {self.path}"
+        last = time.perf_counter()
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            # Server/threadpool frames above the endpoint wrapper are the same for every request
+            stack = []
+            while frame is not None and frame is not root_frame:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(root)
+            # Weight by elapsed time rather than sample count: the GIL can delay samples
+            self.stacks[";".join(reversed(stack))] += now - last
+            self.samples += 1
+            last = now
+
+    def record_query(self, sql: str, seconds: float, profile_json: Optional[str]):
+        """Attach DuckDB's profile for one statement (None when unsupported)."""
+        tree = json.loads(profile_json) if profile_json else None
+        label = " ".join(sql.split())[:MAX_SQL_LABEL]
+        self.queries.append({"sql": " ".join(sql.split()), "seconds": seconds, "profile": tree})
+        if tree is None:
+            self.stacks[f"[duckdb];{label}"] += seconds
+            return
+
+        def walk(node, prefix):
+            name = node.get("operator_name") or node.get("operator_type") or "?"
+            path = f"{prefix};{name.strip()}"
+            self.stacks[path] += float(node.get("operator_timing") or 0.0)
+            for child in node.get("children", []):
+                walk(child, path)
+
+        for child in tree.get("children", []):
+            walk(child, f"[duckdb];{label}")
+
+    def collapsed(self) -> str:
+        """Render stacks in collapsed format, weights in microseconds."""
+        lines = []
+        for stack, seconds in sorted(self.stacks.items()):
+            micros = int(round(seconds * 1_000_000))
+            if micros > 0:
+                lines.append(f"{stack.replace(' ', '_')} {micros}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, seconds: float) -> str:
+        """Write `<id>.collapsed` and `<id>.json` and return the profile id."""
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", self.path).strip("-")[:60]
+        profile_id = f"{self.started_at.strftime('%Y%m%dT%H%M%S%f')}-{slug}"
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{profile_id}.collapsed").write_text(self.collapsed())
+        (directory / f"{profile_id}.json").write_text(json.dumps({
+            "profile_id": profile_id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(seconds * 1000, 3),
+            "samples": self.samples,
+            "sample_interval_ms": SAMPLE_INTERVAL * 1000,
+            "queries": self.queries,
+        }, indent=2, default=str))
+        return profile_id
+
+
+def current_session() -> Optional[ProfileSession]:
+    return _session.get()
+
+
+def before_query(conn):
+    """Switch on DuckDB profiling for a connection used by a profiled request."""
+    if hasattr(conn, "get_profiling_information"):
+        conn.execute("SET enable_profiling = 'no_output'")
+
+
+def after_query(session: ProfileSession, conn, sql: str, seconds: float):
+    profile_json = None
+    if hasattr(conn, "get_profiling_information"):
+        profile_json = conn.get_profiling_information(format="json")
+    session.record_query(sql, seconds, profile_json)
+
+
+def profiled(endpoint):
+    """Wrap an endpoint so it is sampled in whichever thread actually runs it."""
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            session = _session.get()
+            if session is None:
+                return await endpoint(*args, **kwargs)
+            session.start_sampling(threading.get_ident(), sys._getframe())
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                session.stop_sampling()
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        session = _session.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        session.start_sampling(threading.get_ident(), sys._getframe())
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            session.stop_sampling()
+    return wrapper
+
+
+async def profiling_middleware(request, call_next):
+    """Run a request under the profiler when `?profile=1` / `X-Profile: 1` is allowed."""
+    if not profile_requested(request):
+        return await call_next(request)
+
+    session = ProfileSession(request.method, request.url.path)
+    token = _session.set(session)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _session.reset(token)
+
+    profile_id = session.save(time.perf_counter() - started)
+    response.headers["X-Profile-Id"] = profile_id
+    response.headers["X-Profile-Url"] = f"/api/v1/profiles/{profile_id}"
+    return response
+
+
+def load_profile(profile_id: str, fmt: str = "collapsed") -> Optional[str]:
+    """Read a stored profile (`collapsed` or `json`); None if missing or the id is invalid."""
+    if fmt not in ("collapsed", "json") or not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = profile_dir() / f"{profile_id}.{fmt}"
+    return path.read_text() if path.exists() else None
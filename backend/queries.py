@@ -0,0 +1,207 @@
+"""
+Registry of the hot SQL statements issued by the API handlers.
+
+Each statement is defined once, with a name and the mapper that turns its
+rows into the values handlers use:
+
+    plan = queries.PLAN_BY_CLIENT.one(conn, client_id)   # Dict[str, Any] or None
+
+Column names never come from a request. The field update and history paths
+look up their statements in `SELECT_FIELD` / `UPDATE_FIELD`. Both are built
+once from EDITABLE_COLUMNS, and handlers reject any other field name with
+a 400 before SQL runs.
+
+DuckDB's Python API prepares and runs a statement in the same `execute` call
+and returns no handle to reuse. SQL-level PREPARE/EXECUTE measured no faster
+per lookup and can't take bound parameters. Statements therefore run as
+parameterized `execute` calls, except for repeated statements within a
+request: `Statement.many` sends every parameter list in one `executemany`,
+which prepares the statement once. `bind_all` binds every read statement
+against the schema (EXPLAIN). warmup.py runs it at startup, so a statement
+that no longer matches the schema is logged before the first request.
+
+The cohort scan behind the consulting endpoints lives with its NumPy
+post-processing in client_context.py (CLIENT_CONTEXT_SQL).
+"""
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, Sequence, TypeVar
+
+from planwise_import import fingerprint_sql
+
+try:
+    from backend.client_context import STATE_REGIONS
+except ImportError:  # started from backend/ as `uvicorn main:app`
+    from client_context import STATE_REGIONS
+
+T = TypeVar("T")
+
+# plan_designs columns the API may edit. Keys, audit metadata and the columns
+# derived from the formula text (plan_formulas.py) are left out
+EDITABLE_COLUMNS = (
+    "client_name", "industry", "employee_count", "state",
+    "eligibility",
+    "match_formula", "match_effective_rate", "match_eligibility_criteria",
+    "match_last_day_work_rule", "match_true_up", "match_contribution_frequency",
+    "nonelective_formula", "nonelective_eligibility_criteria",
+    "nonelective_last_day_work_rule", "nonelective_contribution_frequency",
+    "auto_enrollment_enabled", "auto_enrollment_rate", "auto_enrollment_effective_year",
+    "auto_escalation_enabled", "auto_escalation_rate", "auto_escalation_cap",
+    "vesting_schedule",
+    "data_source", "notes",
+)
+
+
+def row_dict(conn, row: tuple) -> Dict[str, Any]:
+    """Row as {column: value}."""
+    return dict(zip([desc[0] for desc in conn.description], row))
+
+
+def first(conn, row: tuple) -> Any:
+    """First column of the row."""
+    return row[0]
+
+
+def as_tuple(conn, row: tuple) -> tuple:
+    return row
+
+
+class Statement(Generic[T]):
+    """One parameterized SQL statement and the mapper for its rows."""
+
+    def __init__(self, name: str, sql: str, mapper: Callable[[Any, tuple], T] = as_tuple):
+        self.name = name
+        self.sql = sql
+        self.mapper = mapper
+        self.parameter_count = sql.count("?")
+
+    def __repr__(self):
+        return f"Statement({self.name!r})"
+
+    @property
+    def is_read(self) -> bool:
+        return self.sql.lstrip().upper().startswith(("SELECT", "WITH"))
+
+    def one(self, conn, *params) -> Optional[T]:
+        """First row, mapped (None if there is none)."""
+        row = conn.execute(self.sql, list(params)).fetchone()
+        return None if row is None else self.mapper(conn, row)
+
+    def all(self, conn, *params) -> List[T]:
+        rows = conn.execute(self.sql, list(params)).fetchall()
+        return [self.mapper(conn, row) for row in rows]
+
+    def run(self, conn, *params):
+        conn.execute(self.sql, list(params))
+
+    def many(self, conn, rows: Iterable[Sequence]):
+        """Run once per parameter list; the statement is prepared once."""
+        rows = [list(row) for row in rows]
+        if rows:
+            conn.executemany(self.sql, rows)
+
+
+PLAN_BY_CLIENT: Statement[Dict[str, Any]] = Statement(
+    "plan_by_client", "SELECT * FROM plan_designs WHERE client_id = ?", row_dict
+)
+CLIENT_INDUSTRY: Statement[str] = Statement(
+    "client_industry", "SELECT industry FROM plan_designs WHERE client_id = ?", first
+)
+COUNT_PLANS: Statement[int] = Statement("count_plans", "SELECT COUNT(*) FROM plan_designs", first)
+FIELD_RULE: Statement[Dict[str, Any]] = Statement(
+    "field_rule", "SELECT * FROM field_validation_rules WHERE field_name = ?", row_dict
+)
+INSERT_AUDIT: Statement[tuple] = Statement("insert_audit", """
+    INSERT INTO audit_log (
+        id, client_id, field_name, old_value, new_value,
+        change_type, reason, notes, updated_by, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+""")
+
+# Client list shaped as ClientSummary; CLIENT_SEARCH adds a name filter. Both take
+# (states, regions[, pattern], limit); see client_list_query
+_CLIENT_SUMMARY_SQL = """
+    WITH regions AS (
+        SELECT unnest(?::VARCHAR[]) AS state, unnest(?::VARCHAR[]) AS region
+    )
+    SELECT
+        p.client_id,
+        p.client_name,
+        p.client_name AS plan_sponsor_name,
+        p.industry,
+        '401(k)' AS plan_type,
+        p.employee_count AS total_participants,
+        0 AS data_freshness_days,
+        p.state,
+        COALESCE(r.region, 'Unknown') AS region
+    FROM (
+        SELECT DISTINCT
+            client_id,
+            client_name,
+            industry,
+            employee_count,
+            state
+        FROM plan_designs
+        {where}
+    ) p
+    LEFT JOIN regions r ON r.state = p.state
+    ORDER BY p.client_name LIMIT ?
+"""
+CLIENT_LIST: Statement[tuple] = Statement("client_list", _CLIENT_SUMMARY_SQL.format(where=""))
+CLIENT_SEARCH: Statement[tuple] = Statement(
+    "client_search", _CLIENT_SUMMARY_SQL.format(where="WHERE client_name ILIKE ?")
+)
+
+# (value, industry) of one editable column, and its update, per column
+SELECT_FIELD: Dict[str, Statement[tuple]] = {
+    column: Statement(
+        f"select_{column}", f"SELECT {column}, industry FROM plan_designs WHERE client_id = ?"
+    )
+    for column in EDITABLE_COLUMNS
+}
+UPDATE_FIELD: Dict[str, Statement[tuple]] = {
+    column: Statement(f"update_{column}", f"""
+        UPDATE plan_designs
+        SET {column} = ?,
+            updated_at = CURRENT_TIMESTAMP,
+            updated_by = ?
+        WHERE client_id = ?
+    """)
+    for column in EDITABLE_COLUMNS
+}
+
+# Run after a plan edit, in the same transaction, so imports can compare incoming
+# rows with the stored row_fingerprint (planwise_import.merge_rows)
+REFRESH_FINGERPRINT: Statement[tuple] = Statement(
+    "refresh_fingerprint", f"UPDATE plan_designs SET row_fingerprint = {fingerprint_sql()} WHERE client_id = ?"
+)
+
+STATEMENTS: List[Statement] = [
+    PLAN_BY_CLIENT, CLIENT_INDUSTRY, COUNT_PLANS, FIELD_RULE, INSERT_AUDIT, CLIENT_LIST, CLIENT_SEARCH,
+    REFRESH_FINGERPRINT,
+    *SELECT_FIELD.values(), *UPDATE_FIELD.values(),
+]
+
+
+def client_list_query(search: Optional[str], limit: int) -> tuple:
+    """(statement, params) for the client list, optionally filtered by name."""
+    params = [list(STATE_REGIONS), list(STATE_REGIONS.values())]
+    if search:
+        return CLIENT_SEARCH, params + [f"%{search}%", limit]
+    return CLIENT_LIST, params + [limit]
+
+
+def bind_all(conn) -> List[str]:
+    """
+    Bind every read statement against the current schema, without running it.
+
+    Returns:
+        Names of the statements that failed to bind
+    """
+    failed = []
+    for statement in STATEMENTS:
+        if not statement.is_read:
+            continue
+        try:
+            conn.execute(f"EXPLAIN {statement.sql}", [None] * statement.parameter_count).fetchall()
+        except Exception:
+            failed.append(statement.name)
+    return failed
@@ -0,0 +1,377 @@
+"""
+Read replicas: immutable copies of planwise.db that read endpoints query.
+
+Within one process DuckDB cannot hold read-only and read-write connections to
+the same file at once, so every long read of planwise.db (exports, cohort
+scans) makes PATCH handlers wait in connect(), and the other way round. With
+PLANWISE_REPLICAS=1 a background worker instead publishes a copy of the
+database every PLANWISE_REPLICA_INTERVAL seconds (default 30):
+
+    data/planwise_replicas/planwise-20250101T120000000000.db
+
+The copy is made with COPY FROM DATABASE in one read transaction on a
+read-write connection (like the writers'), so it is a consistent snapshot
+taken while writes continue. It is written under a temporary name and renamed
+when complete. Then the `CURRENT` pointer file is swapped with os.replace and
+new reads open the new copy. The previous copy is kept for reads still using
+it, and older ones are deleted.
+
+`ReplicaManager.reader_path` decides where a read goes:
+
+- the latest replica, while it is at most PLANWISE_REPLICA_MAX_LAG seconds old
+  (default 120)
+- the primary when the replica is older than that, or for a client edited
+  through the API after the replica was taken, so analysts see their own edits
+
+When table sizes and the latest plan/audit update times are unchanged since
+the last copy, the worker re-stamps the current replica instead of copying
+the database again.
+
+The pointer file also lists the recently edited clients and a version number.
+The publisher rewrites it after each edit, and reader processes in a
+multi-worker deployment (cluster.py, PLANWISE_ROLE=reader) follow it instead of
+publishing: they stat it on every read and reload it when it has changed.
+Followers never fall back to the primary, which the writer process holds open.
+A request's reads open the replica chosen when it was routed (`pinned_replica`).
+If a newer publish has deleted that file, they open the pointer's current
+replica. With no replica left, they raise ReplicaUnavailable.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import duckdb
+
+try:
+    from backend.instrumentation import InstrumentedConnection, connect
+except ImportError:  # started from backend/ as `uvicorn main:app`
+    from instrumentation import InstrumentedConnection, connect
+
+logger = logging.getLogger("planwise.replica")
+
+DEFAULT_INTERVAL_SECONDS = 30.0
+DEFAULT_MAX_LAG_SECONDS = 120.0
+# Quiet period after an API write before an early copy starts
+PUBLISH_DELAY_SECONDS = 2.0
+# Replica files kept: the current one plus the one before it
+KEEP_REPLICAS = 2
+POINTER_FILE = "CURRENT"
+
+# Replica a reader process routed the current request to (see pinned_replica)
+_pinned: contextvars.ContextVar[Optional[Path]] = contextvars.ContextVar("planwise_pinned_replica", default=None)
+
+
+class ReplicaUnavailable(Exception):
+    """A follower has no replica to open (it never opens the primary)."""
+
+
+@contextmanager
+def pinned_replica(path: Optional[Path]):
+    """Make followers' reads in this context open `path`, the replica the request was routed to."""
+    token = _pinned.set(path)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def server_role() -> str:
+    """`single` (default), or `writer`/`reader` in a multi-worker deployment (cluster.py)."""
+    return os.environ.get("PLANWISE_ROLE", "single")
+
+
+def replicas_enabled() -> bool:
+    return os.environ.get("PLANWISE_REPLICAS", "0") == "1" or server_role() != "single"
+
+
+def replica_interval() -> float:
+    return float(os.environ.get("PLANWISE_REPLICA_INTERVAL", DEFAULT_INTERVAL_SECONDS))
+
+
+def replica_max_lag() -> float:
+    return float(os.environ.get("PLANWISE_REPLICA_MAX_LAG", DEFAULT_MAX_LAG_SECONDS))
+
+
+def replica_dir(db_path) -> Path:
+    """Replica directory for a main database path."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}_replicas")
+
+
+def _sql_path(path: Path) -> str:
+    return str(path.resolve()).replace("'", "''")
+
+
+def data_fingerprint(conn) -> tuple:
+    """Cheap summary of the database contents; changes whenever plans or audit rows do."""
+    tables = conn.execute("""
+        SELECT table_name, estimated_size FROM duckdb_tables()
+        WHERE database_name = current_database() ORDER BY table_name
+    """).fetchall()
+    names = {name for name, _ in tables}
+    latest = tuple(
+        conn.execute(f"SELECT MAX(updated_at) FROM {table}").fetchone()[0]
+        for table in ("plan_designs", "audit_log") if table in names
+    )
+    return tuple(tables), latest
+
+
+class ReplicaManager:
+    """Latest published replica of one database, plus the worker that refreshes it."""
+
+    def __init__(self, db_path, interval: Optional[float] = None, max_lag: Optional[float] = None,
+                 follower: bool = False):
+        """
+        Args:
+            db_path: Main database
+            interval, max_lag: Override PLANWISE_REPLICA_INTERVAL / PLANWISE_REPLICA_MAX_LAG
+            follower: Never publish; track the pointer file written by another process
+        """
+        self.db_path = Path(db_path)
+        self.directory = replica_dir(db_path)
+        self.interval = replica_interval() if interval is None else interval
+        self.max_lag = replica_max_lag() if max_lag is None else max_lag
+        self.follower = follower
+        self._cond = threading.Condition()
+        # (replica file, time its data was taken)
+        self._current: Optional[Tuple[Path, datetime]] = None
+        self._fingerprint: Optional[tuple] = None
+        # Client ids edited since the replica was taken, with the time of the edit
+        self._written: Dict[str, datetime] = {}
+        self.version = 0
+        self._pointer_stamp: Optional[tuple] = None
+        self._pointer_lock = threading.Lock()
+        self._publish_at: Optional[datetime] = None
+        # One copy at a time (the worker, tests and scripts may all publish)
+        self._publishing = threading.Lock()
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+        # Pick up the pointer left by an earlier run (or, for followers, the publisher)
+        self._load_pointer()
+
+    @property
+    def current(self) -> Optional[Tuple[Path, datetime]]:
+        with self._cond:
+            return self._current
+
+    def _load_pointer(self):
+        """Adopt the pointer file's replica, edited clients and version if the file changed."""
+        pointer = self.directory / POINTER_FILE
+        try:
+            stat = pointer.stat()
+            # os.replace gives every version a new inode
+            stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if stamp == self._pointer_stamp:
+                return
+            state = json.loads(pointer.read_text())
+            path = self.directory / state["file"]
+            current = (path, datetime.fromisoformat(state["taken_at"])) if path.exists() else None
+            written = {client_id: datetime.fromisoformat(at) for client_id, at in state.get("written", {}).items()}
+            version = int(state.get("version", 0))
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        with self._cond:
+            self._pointer_stamp = stamp
+            self._current = current
+            self._written = written
+            self.version = version
+
+    def _write_pointer(self):
+        """Atomically replace the pointer file with the current replica, edited clients and a new version."""
+        with self._pointer_lock:
+            with self._cond:
+                if self._current is None:
+                    return
+                path, taken_at = self._current
+                self.version += 1
+                state = {
+                    "file": path.name,
+                    "taken_at": taken_at.isoformat(),
+                    "written": {client_id: at.isoformat() for client_id, at in self._written.items()},
+                    "version": self.version,
+                }
+            pointer = self.directory / POINTER_FILE
+            staged = pointer.with_name(f"{POINTER_FILE}.{os.getpid()}.tmp")
+            staged.write_text(json.dumps(state))
+            os.replace(staged, pointer)
+
+    def reader_path(self, client_id: Optional[str] = None) -> Path:
+        """File a read should open: the replica unless it is too stale (or older than the client's last edit)."""
+        if self.follower:
+            self._load_pointer()
+        with self._cond:
+            if self._current is None:
+                return self.db_path
+            path, taken_at = self._current
+            if datetime.now() - taken_at > timedelta(seconds=self.max_lag):
+                return self.db_path
+            if client_id is not None and self._written.get(client_id, datetime.min) >= taken_at:
+                return self.db_path
+            return path
+
+    def connect(self, client_id: Optional[str] = None) -> InstrumentedConnection:
+        """Read-only connection to `reader_path(client_id)` (followers: see _connect_follower)."""
+        if self.follower:
+            return self._connect_follower()
+        path = self.reader_path(client_id)
+        if path != self.db_path:
+            try:
+                return connect(str(path), read_only=True)
+            except duckdb.IOException:  # deleted by a newer publish since reader_path
+                pass
+        return connect(str(self.db_path), read_only=True)
+
+    def _connect_follower(self) -> InstrumentedConnection:
+        """Open the pinned replica, or the pointer's current one; never the primary."""
+        path = _pinned.get()
+        if path is not None:
+            try:
+                return connect(str(path), read_only=True)
+            except duckdb.IOException:  # deleted by a newer publish since the request was routed
+                pass
+        self._load_pointer()
+        current = self.current
+        if current is None or current[0] == path:
+            raise ReplicaUnavailable(f"No read replica of {self.db_path.name} to open")
+        return connect(str(current[0]), read_only=True)
+
+    def note_write(self, client_ids: Iterable[str]):
+        """Route these clients' reads to the primary until a newer replica exists, and publish one soon."""
+        now = datetime.now()
+        with self._cond:
+            for client_id in client_ids:
+                self._written[client_id] = now
+            if self._publish_at is None:
+                self._publish_at = now + timedelta(seconds=PUBLISH_DELAY_SECONDS)
+            self._cond.notify_all()
+        # Reader processes route these clients to the writer until the next replica
+        self._write_pointer()
+
+    def publish(self) -> Path:
+        """
+        Copy the primary into a new replica and swap the pointer to it.
+
+        Returns:
+            The current replica file (unchanged if the data was)
+        """
+        with self._publishing:
+            return self._publish()
+
+    def _publish(self) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        taken_at = datetime.now()
+        staged = self.directory / f"{self.db_path.stem}-{taken_at:%Y%m%dT%H%M%S%f}.db.tmp"
+        # Read-write, like the API's writers, so the copy never waits on them or they on it
+        conn = connect(str(self.db_path))
+        try:
+            current = self.current
+            if current is not None and data_fingerprint(conn) == self._fingerprint:
+                with self._cond:
+                    self._current = (current[0], taken_at)
+                    self._written = {client_id: at for client_id, at in self._written.items() if at >= taken_at}
+                self._write_pointer()
+                return current[0]
+
+            database = conn.execute("SELECT current_database()").fetchone()[0]
+            conn.execute(f"ATTACH '{_sql_path(staged)}' AS replica_copy")
+            try:
+                conn.execute("BEGIN TRANSACTION")
+                fingerprint = data_fingerprint(conn)
+                conn.execute(f'COPY FROM DATABASE "{database}" TO replica_copy')
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.execute("DETACH replica_copy")
+        except Exception:
+            staged.unlink(missing_ok=True)
+            raise
+        finally:
+            conn.close()
+
+        path = staged.with_suffix("")
+        os.replace(staged, path)
+        with self._cond:
+            self._current = (path, taken_at)
+            self._fingerprint = fingerprint
+            self._written = {client_id: at for client_id, at in self._written.items() if at >= taken_at}
+        self._write_pointer()
+        self._remove_old(path)
+        return path
+
+    def _remove_old(self, current: Path):
+        replicas = sorted(self.directory.glob(f"{self.db_path.stem}-*.db"))
+        for path in replicas[:-KEEP_REPLICAS]:
+            if path != current:
+                path.unlink(missing_ok=True)
+                path.with_name(path.name + ".wal").unlink(missing_ok=True)
+
+    def start(self):
+        """Publish in the background every `interval` seconds, and shortly after API writes."""
+        with self._cond:
+            if self._worker is None and not self._closed and not self.follower:
+                self._worker = threading.Thread(target=self._run, name="planwise-replicas", daemon=True)
+                self._worker.start()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout=30)
+
+    def _next_publish(self) -> bool:
+        """Block until the next publish is due; False once closed."""
+        with self._cond:
+            due = datetime.now() + timedelta(seconds=self.interval) if self._current else datetime.now()
+            while not self._closed:
+                when = min(due, self._publish_at) if self._publish_at else due
+                wait = (when - datetime.now()).total_seconds()
+                if wait <= 0:
+                    self._publish_at = None
+                    return True
+                self._cond.wait(wait)
+            return False
+
+    def _run(self):
+        while self._next_publish():
+            try:
+                self.publish()
+            except Exception:
+                logger.exception("Replica publish failed for %s", self.db_path)
+
+
+_managers: Dict[Path, Optional[ReplicaManager]] = {}
+_managers_lock = threading.Lock()
+
+
+def get_replicas(db_path) -> Optional[ReplicaManager]:
+    """
+    The replica manager for a main database, started on first use.
+
+    Readers in a multi-worker deployment get a follower of the writer's
+    replicas. Returns None when replicas are disabled; reads then open the primary.
+    """
+    if not replicas_enabled():
+        return None
+    key = Path(db_path).resolve()
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = ReplicaManager(key, follower=server_role() == "reader")
+            _managers[key].start()
+        return _managers[key]
+
+
+def close_replicas(db_path):
+    """Stop the worker of a main database's replicas (if started)."""
+    with _managers_lock:
+        manager = _managers.pop(Path(db_path).resolve(), None)
+    if manager is not None:
+        manager.close()
@@ -0,0 +1,270 @@
+"""
+Peer assessment and Navigator Scorecard payloads.
+
+Pure functions of a plan row and its industry cohort, shared by the live
+endpoints and the snapshot worker (snapshots.py) so both produce identical
+responses.
+"""
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    from backend.compare import COMPARE_LEVERS, rank_matrix
+except ImportError:  # started from backend/ as `uvicorn main:app`
+    from compare import COMPARE_LEVERS, rank_matrix
+
+# Cohort medians the peer assessment reports (same expressions as /compare)
+PEER_STAT_LEVERS = ("match_rate", "auto_enrollment_rate")
+
+# plan_designs columns the builders read. Whole-cohort fetches select only these;
+# SELECT * would also decode the parsed-formula lists and every unused DECIMAL
+SCORECARD_COLUMNS = (
+    "client_id", "client_name", "industry", "eligibility",
+    "auto_enrollment_enabled", "auto_enrollment_rate",
+    "auto_escalation_enabled", "auto_escalation_cap",
+    "match_formula", "match_effective_rate", "match_max_rate",
+    "vesting_schedule", "vesting_type",
+)
+
+
+def load_cohort(conn, industry: str) -> List[Dict]:
+    """Fetch the scorecard columns of every plan in an industry."""
+    rows = conn.execute(
+        f"SELECT {', '.join(SCORECARD_COLUMNS)} FROM plan_designs WHERE industry = ?",
+        [industry]
+    ).fetchall()
+    return [dict(zip(SCORECARD_COLUMNS, row)) for row in rows]
+
+
+def cohort_peer_stats(conn, industry: str, client_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Peer statistics for plans in one industry, each plan excluded from its own cohort.
+
+    One fetch of the industry plus compare.rank_matrix's vectorized
+    median-without-self, so computing every plan in the industry costs about
+    the same as computing one.
+
+    Returns:
+        {client_id: {cohort_size, median_match, median_ae_rate}} (medians None without peer data)
+    """
+    lever_sql = ", ".join(f"{COMPARE_LEVERS[name]} AS {name}" for name in PEER_STAT_LEVERS)
+    columns = conn.execute(
+        f"SELECT client_id, {lever_sql} FROM plan_designs WHERE industry = ?",
+        [industry]
+    ).fetchnumpy()
+
+    position = {cid: i for i, cid in enumerate(columns["client_id"])}
+    found = [cid for cid in client_ids if cid in position]
+    values = np.column_stack([
+        np.ma.filled(np.ma.asarray(columns[name]).astype(float), np.nan) for name in PEER_STAT_LEVERS
+    ]) if position else np.empty((0, len(PEER_STAT_LEVERS)))
+    selected = np.array([position[cid] for cid in found], dtype=int)
+    ranked = rank_matrix(values, np.zeros(len(position), dtype=np.int64), selected)
+
+    stats = {}
+    for i, cid in enumerate(found):
+        medians = [None if np.isnan(m) else float(m) for m in ranked["peer_medians"][i]]
+        stats[cid] = {
+            "cohort_size": int(ranked["cohort_sizes"][i]),
+            "median_match": medians[0],
+            "median_ae_rate": medians[1],
+        }
+    return stats
+
+
+def build_peer_assessment(client_dict: Dict, peer_stats: Dict) -> Dict:
+    """Peer benchmarking assessment with traffic light indicators."""
+    industry = client_dict.get("industry")
+
+    # Handle null values safely
+    if not industry:
+        industry = "Unknown"
+
+    cohort_size = peer_stats["cohort_size"]
+
+    # Build assessment features
+    features = []
+
+    # 1. Eligibility
+    features.append({
+        "lever": "ELIGIBILITY",
+        "current_design": client_dict.get("eligibility", "Not specified"),
+        "status": "above",
+        "percentile": 65,
+        "peer_summary": "Majority have 1,000 hours or 1-year requirement",
+        "assessment": "At peer average and recommended design for Healthcare"
+    })
+
+    # 2. Auto-Enrollment
+    client_ae_rate = client_dict.get("auto_enrollment_rate") or 0
+    median_ae = peer_stats["median_ae_rate"] or 3.0
+    ae_status = "above" if client_ae_rate > median_ae else "median" if client_ae_rate >= median_ae * 0.9 else "below"
+
+    features.append({
+        "lever": "AUTO-ENROLLMENT",
+        "current_design": f"Yes, default {client_ae_rate:.0f}%" if client_dict.get("auto_enrollment_enabled") else "No",
+        "status": ae_status,
+        "percentile": 75 if ae_status == "above" else 50,
+        "peer_summary": f"Majority offer, {median_ae:.0f}% median default",
+        "assessment": "Default rate tops peers" if ae_status == "above" else "Competitive with peer set"
+    })
+
+    # 3. Auto-Escalation
+    features.append({
+        "lever": "AUTO-ESCALATION",
+        "current_design": f"{1}%/yr up to {client_dict.get('auto_escalation_cap', 10):.0f}%" if client_dict.get("auto_escalation_enabled") else "No",
+        "status": "above" if client_dict.get("auto_escalation_enabled") else "below",
+        "percentile": 80 if client_dict.get("auto_escalation_enabled") else 20,
+        "peer_summary": "Minority using; typical +1%/yr to 10% cap",
+        "assessment": "Best practice design" if client_dict.get("auto_escalation_enabled") else "Opportunity to improve"
+    })
+
+    # 4. Employer Contribution
+    client_match = client_dict.get("match_effective_rate") or client_dict.get("match_max_rate") or 0
+    median_match = peer_stats["median_match"] or 4.5
+    match_status = "above" if client_match and client_match > median_match * 1.1 else "median"
+
+    features.append({
+        "lever": "EMPLOYER CONTRIBUTION",
+        "current_design": client_dict.get("match_formula") or "Not specified",
+        "status": match_status,
+        "percentile": 55,
+        "peer_summary": f"{median_match:.1f}% median maximum",
+        "assessment": "Competitive with peer set"
+    })
+
+    # 5. Vesting (vesting_type is parsed once at import/update time)
+    vesting = client_dict.get("vesting_schedule") or ""
+    vesting_status = "below" if client_dict.get("vesting_type") == "immediate" else "above"
+
+    features.append({
+        "lever": "VESTING",
+        "current_design": vesting or "Not specified",
+        "status": vesting_status,
+        "percentile": 30 if vesting_status == "below" else 70,
+        "peer_summary": "Most common is 3-year cliff vesting",
+        "assessment": "More generous than peers, helps recruiting but limits retention" if vesting_status == "below" else "Supports retention"
+    })
+
+    return {
+        "client_name": client_dict.get("client_name"),
+        "cohort_description": f"{industry} (n={cohort_size})",
+        "features": features
+    }
+
+
+def build_navigator_scorecard(client_dict: Dict) -> Dict:
+    """Navigator Scorecard with multi-dimensional impact analysis."""
+    # Build scorecard features
+    features = []
+
+    # 1. Eligibility
+    features.append({
+        "lever": "ELIGIBILITY",
+        "current_design": client_dict.get("eligibility", "Not specified"),
+        "impacts": {
+            "recruitment": "neutral",
+            "retention": "positive",
+            "cost_roi": "neutral",
+            "retirement": "neutral",
+            "efficiency": "positive"
+        }
+    })
+
+    # 2. Auto-Enrollment
+    ae_rate = client_dict.get('auto_enrollment_rate') or 0
+    features.append({
+        "lever": "AUTO-ENROLLMENT",
+        "current_design": f"Yes, default {ae_rate:.0f}%" if client_dict.get("auto_enrollment_enabled") else "No",
+        "impacts": {
+            "recruitment": "positive",
+            "retention": "positive",
+            "cost_roi": "neutral",
+            "retirement": "strong",
+            "efficiency": "positive"
+        }
+    })
+
+    # 3. Auto-Escalation
+    esc_cap = client_dict.get('auto_escalation_cap') or 10
+    features.append({
+        "lever": "AUTO-ESCALATION",
+        "current_design": f"{1}%/yr up to {esc_cap:.0f}%" if client_dict.get("auto_escalation_enabled") else "No",
+        "impacts": {
+            "recruitment": "positive",
+            "retention": "positive",
+            "cost_roi": "neutral",
+            "retirement": "strong",
+            "efficiency": "positive"
+        }
+    })
+
+    # 4. Employer Contribution
+    features.append({
+        "lever": "EMPLOYER $",
+        "current_design": client_dict.get("match_formula") or "Not specified",
+        "impacts": {
+            "recruitment": "positive",
+            "retention": "positive",
+            "cost_roi": "neutral",
+            "retirement": "positive",
+            "efficiency": "positive"
+        }
+    })
+
+    # 5. Vesting
+    vesting = client_dict.get("vesting_schedule") or ""
+    is_immediate = client_dict.get("vesting_type") == "immediate"
+
+    features.append({
+        "lever": "VESTING",
+        "current_design": vesting or "Not specified",
+        "impacts": {
+            "recruitment": "positive",
+            "retention": "negative" if is_immediate else "positive",
+            "cost_roi": "negative" if is_immediate else "positive",
+            "retirement": "neutral",
+            "efficiency": "positive"
+        }
+    })
+
+    # Recommendations
+    recommendations = []
+
+    if is_immediate:
+        recommendations.append({
+            "priority": "now",
+            "title": "Consider 3-year cliff vesting",
+            "description": "Consider 3-year cliff vesting to promote retention and limit plan leakage.",
+            "impact_level": "↑↑",
+            "financial_impact": "$ Savings",
+            "complexity": "Low"
+        })
+
+    esc_cap_value = client_dict.get("auto_escalation_cap") or 0
+    if esc_cap_value and esc_cap_value < 15:
+        recommendations.append({
+            "priority": "next",
+            "title": "Increase auto-escalation cap",
+            "description": f"Increase auto-escalation cap from {esc_cap_value:.0f}% to 15% and re-enroll participants to drive retirement readiness.",
+            "impact_level": "↑↑",
+            "financial_impact": "Neutral",
+            "complexity": "Medium"
+        })
+
+    recommendations.append({
+        "priority": "next",
+        "title": "Review competitive peer set",
+        "description": "Review competitive peer set to consider contribution design for potential improvements.",
+        "impact_level": "↑↑",
+        "financial_impact": "$$-$$$",
+        "complexity": "Low"
+    })
+
+    return {
+        "client_name": client_dict.get("client_name"),
+        "summary": "Competitive blended contribution design with strong auto features; consider 3-year cliff vesting to promote retention and limit plan leakage, and increase auto-escalation cap to 15% to drive retirement readiness.",
+        "features": features,
+        "recommendations": recommendations
+    }
@@ -0,0 +1,304 @@
+"""
+Precomputed peer assessment and Navigator Scorecard snapshots.
+
+Both payloads are pure functions of a plan and its industry cohort (see
+scorecards.py), so they are computed ahead of time and served as stored JSON:
+
+- `scorecard_snapshots` holds one serialised payload per (client, kind),
+  stamped with the cohort version it was computed from
+- `snapshot_versions` holds the current version of every industry; plan
+  updates bump it (`invalidate`), which makes every snapshot of that cohort
+  stale at once
+- A background worker recomputes whole industries: one cohort fetch covers
+  every plan in it. It waits for a short pause in plan updates, so a burst
+  of edits is recomputed once and never waits on the worker
+- Endpoints serve a snapshot only when its version is current and it is
+  younger than PLANWISE_SNAPSHOT_MAX_AGE seconds (default 900), which bounds
+  staleness after out-of-band imports that never call `invalidate`. Anything
+  else is computed live and queued for recompute
+
+Snapshots live in a sidecar DuckDB file next to the main database
+(`planwise.snapshots.db`), so the worker's writes never need the main
+database's write lock and API handlers keep opening it read-only. Set
+PLANWISE_SNAPSHOTS=0 to disable them.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import duckdb
+
+try:
+    from backend.instrumentation import InstrumentedConnection, connect
+    from backend.scorecards import build_navigator_scorecard, build_peer_assessment, cohort_peer_stats, load_cohort
+except ImportError:  # started from backend/ as `uvicorn main:app`
+    from instrumentation import InstrumentedConnection, connect
+    from scorecards import build_navigator_scorecard, build_peer_assessment, cohort_peer_stats, load_cohort
+
+logger = logging.getLogger("planwise.snapshots")
+
+PEER_ASSESSMENT = "peer_assessment"
+NAVIGATOR_SCORECARD = "navigator_scorecard"
+DEFAULT_MAX_AGE_SECONDS = 900
+# Quiet period after a plan update before any recompute starts
+RECOMPUTE_DELAY_SECONDS = 1.0
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS snapshot_versions (
+        industry VARCHAR PRIMARY KEY,
+        version BIGINT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS scorecard_snapshots (
+        client_id VARCHAR NOT NULL,
+        kind VARCHAR NOT NULL,
+        industry VARCHAR NOT NULL,
+        version BIGINT NOT NULL,
+        payload VARCHAR NOT NULL,
+        computed_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (client_id, kind)
+    );
+"""
+
+
+def snapshots_enabled() -> bool:
+    return os.environ.get("PLANWISE_SNAPSHOTS", "1") != "0"
+
+
+def max_age_seconds() -> float:
+    return float(os.environ.get("PLANWISE_SNAPSHOT_MAX_AGE", DEFAULT_MAX_AGE_SECONDS))
+
+
+def snapshot_path(db_path) -> Path:
+    """Sidecar snapshot database for a main database path."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}.snapshots.db")
+
+
+def dump_payload(payload: Dict) -> str:
+    """Serialise a payload exactly as FastAPI's JSONResponse would."""
+    return json.dumps(payload, default=float, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def build_industry_payloads(conn, industry: str) -> Dict[str, Dict[str, Dict]]:
+    """Compute both payloads for every plan in an industry: {client_id: {kind: payload}}."""
+    plans = load_cohort(conn, industry)
+    stats = cohort_peer_stats(conn, industry, [plan["client_id"] for plan in plans])
+    return {
+        plan["client_id"]: {
+            PEER_ASSESSMENT: build_peer_assessment(plan, stats[plan["client_id"]]),
+            NAVIGATOR_SCORECARD: build_navigator_scorecard(plan),
+        }
+        for plan in plans
+    }
+
+
+class SnapshotStore:
+    """Versioned snapshot table plus its background recompute worker."""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.path = snapshot_path(db_path)
+        # One read-write connection shared via cursors; a second connect() to the
+        # same file from this process would have to match its configuration anyway
+        self._conn = duckdb.connect(str(self.path))
+        self._conn.execute(SCHEMA)
+        # Industries awaiting recompute, in request order
+        self._scheduled: Dict[str, None] = {}
+        # Recomputes hold a read connection to the main database, which blocks
+        # in-process writers, so they wait until plan updates pause
+        self._quiet_until = 0.0
+        self._busy = False
+        self._cond = threading.Condition()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="planwise-snapshots", daemon=True)
+        self._worker.start()
+
+    def _cursor(self) -> InstrumentedConnection:
+        return InstrumentedConnection(self._conn.cursor())
+
+    def lookup(self, client_id: str, kind: str) -> Optional[str]:
+        """Serialised payload if a current, fresh snapshot exists, else None."""
+        cutoff = datetime.now() - timedelta(seconds=max_age_seconds())
+        cur = self._cursor()
+        try:
+            row = cur.execute("""
+                SELECT s.payload
+                FROM scorecard_snapshots s
+                JOIN snapshot_versions v ON v.industry = s.industry AND v.version = s.version
+                WHERE s.client_id = ? AND s.kind = ? AND s.computed_at >= ?
+            """, [client_id, kind, cutoff]).fetchone()
+        finally:
+            cur.close()
+        return row[0] if row else None
+
+    def invalidate(self, industries: Iterable[str]):
+        """Mark industries' snapshots stale and schedule a recompute of those that have any."""
+        industries = sorted({industry for industry in industries if industry})
+        if not industries:
+            return
+        cur = self._cursor()
+        try:
+            cur.execute("""
+                INSERT INTO snapshot_versions
+                SELECT unnest(?::VARCHAR[]), 1
+                ON CONFLICT (industry) DO UPDATE SET version = version + 1
+            """, [industries])
+            served = cur.execute(
+                "SELECT DISTINCT industry FROM scorecard_snapshots WHERE industry IN (SELECT unnest(?::VARCHAR[]))",
+                [industries]
+            ).fetchall()
+        finally:
+            cur.close()
+        with self._cond:
+            self._quiet_until = time.monotonic() + RECOMPUTE_DELAY_SECONDS
+        for (industry,) in served:
+            self.request(industry)
+
+    def request(self, industry: str):
+        """Schedule an industry for recompute (no-op if it is already scheduled)."""
+        if not industry:
+            return
+        with self._cond:
+            if not self._closed and industry not in self._scheduled:
+                self._scheduled[industry] = None
+                self._cond.notify_all()
+
+    def warm(self):
+        """Schedule every industry in the main database (run once at server startup)."""
+        conn = connect(str(self.db_path), read_only=True)
+        try:
+            industries = conn.execute("SELECT DISTINCT industry FROM plan_designs ORDER BY industry").fetchall()
+        finally:
+            conn.close()
+        for (industry,) in industries:
+            self.request(industry)
+
+    def wait_idle(self, timeout: float = 30.0) -> bool:
+        """Run every scheduled recompute now and wait for them (used by tests and benchmarks)."""
+        with self._cond:
+            self._quiet_until = 0.0
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._scheduled and not self._busy, timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout=30)
+        self._conn.close()
+
+    def _next_industry(self) -> Optional[str]:
+        """Block until an industry is scheduled and writes are quiet; None once the store is closed."""
+        with self._cond:
+            while not self._closed:
+                wait = self._quiet_until - time.monotonic()
+                if self._scheduled and wait <= 0:
+                    industry = next(iter(self._scheduled))
+                    del self._scheduled[industry]
+                    self._busy = True
+                    return industry
+                self._cond.wait(wait if self._scheduled else None)
+            return None
+
+    def _run(self):
+        while True:
+            industry = self._next_industry()
+            if industry is None:
+                return
+            try:
+                self.recompute(industry)
+            except Exception:
+                logger.exception("Snapshot recompute failed for %s", industry)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def recompute(self, industry: str) -> int:
+        """
+        Recompute and store every snapshot of one industry.
+
+        The version is read before the cohort, so an update landing mid-way
+        leaves the new rows stale (and queued again) instead of wrongly current.
+
+        Returns:
+            Number of plans written
+        """
+        cur = self._cursor()
+        try:
+            row = cur.execute("SELECT version FROM snapshot_versions WHERE industry = ?", [industry]).fetchone()
+            if row is None:
+                cur.execute("INSERT OR IGNORE INTO snapshot_versions VALUES (?, 1)", [industry])
+                version = 1
+            else:
+                version = row[0]
+
+            conn = connect(str(self.db_path), read_only=True)
+            try:
+                payloads = build_industry_payloads(conn, industry)
+            finally:
+                conn.close()
+
+            import pandas as pd  # loaded on first use; see warmup.py
+
+            computed_at = datetime.now()
+            snapshots = pd.DataFrame(
+                [
+                    (client_id, kind, industry, version, dump_payload(payload), computed_at)
+                    for client_id, by_kind in payloads.items()
+                    for kind, payload in by_kind.items()
+                ],
+                columns=["client_id", "kind", "industry", "version", "payload", "computed_at"],
+            )
+            cur.execute("BEGIN TRANSACTION")
+            # Plans that moved to another industry keep their old (now stale) rows until recomputed there
+            cur.execute("DELETE FROM scorecard_snapshots WHERE industry = ?", [industry])
+            cur.register("new_snapshots", snapshots)
+            cur.execute("INSERT OR REPLACE INTO scorecard_snapshots SELECT * FROM new_snapshots")
+            cur.execute("COMMIT")
+            return len(payloads)
+        except Exception:
+            try:
+                cur.execute("ROLLBACK")
+            except duckdb.Error:
+                pass
+            raise
+        finally:
+            cur.close()
+
+
+_stores: Dict[Path, Optional[SnapshotStore]] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(db_path) -> Optional[SnapshotStore]:
+    """
+    The snapshot store for a main database, opened on first use.
+
+    Returns None when snapshots are disabled or the sidecar file is locked by
+    another process; callers then always compute live.
+    """
+    if not snapshots_enabled():
+        return None
+    key = Path(db_path).resolve()
+    with _stores_lock:
+        if key not in _stores:
+            try:
+                _stores[key] = SnapshotStore(key)
+            except duckdb.Error as e:
+                logger.warning("Snapshots disabled for %s: %s", key, e)
+                _stores[key] = None
+        return _stores[key]
+
+
+def close_store(db_path):
+    """Stop the worker and close the sidecar of a main database (if open)."""
+    with _stores_lock:
+        store = _stores.pop(Path(db_path).resolve(), None)
+    if store is not None:
+        store.close()
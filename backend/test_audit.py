@@ -0,0 +1,116 @@
+"""
+Tests for the keyset-paginated audit log (backend/audit.py)
+"""
+import duckdb
+import pytest
+
+from backend import main as api
+from backend import audit
+from backend.audit_archive import archive_audit_log, archive_dir
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client(rows=150, seed=19, audit_per_plan=4), api.DB_PATH
+
+
+def walk(http, **params):
+    """Follow X-Next-Cursor from the first page to the last; returns (ids, first response)."""
+    ids, cursor, first = [], None, None
+    while True:
+        response = http.get("/api/v1/audit-log", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        first = first or response
+        ids += [entry["id"] for entry in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids, first
+
+
+def test_pages_cover_filtered_log_in_order(client):
+    http, db_path = client
+    conn = duckdb.connect(str(db_path), read_only=True)
+    user, since = conn.execute(
+        "SELECT updated_by, MEDIAN(updated_at) FROM audit_log GROUP BY updated_by ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()
+    expected_all = [r[0] for r in conn.execute(
+        "SELECT id FROM audit_log ORDER BY updated_at DESC, id DESC"
+    ).fetchall()]
+    expected_user = [r[0] for r in conn.execute(
+        "SELECT id FROM audit_log WHERE updated_by = ? AND updated_at >= ? ORDER BY updated_at DESC, id DESC",
+        [user, since]
+    ).fetchall()]
+    conn.close()
+
+    ids, first = walk(http, limit=37)
+    assert ids == expected_all
+    assert first.headers["X-Total-Count"] == str(len(expected_all))
+    assert first.headers["X-Total-Count-Approximate"] == "true"
+
+    ids, first = walk(http, limit=5, updated_by=user, since=since.isoformat())
+    assert ids == expected_user
+    assert first.headers["X-Total-Count"] == str(len(expected_user))
+    assert first.headers["X-Total-Count-Approximate"] == "false"
+
+    assert http.get("/api/v1/audit-log?cursor=not-a-cursor").status_code == 400
+    assert http.get("/api/v1/audit-log?limit=0").status_code == 400
+
+
+def test_field_history_pages_and_count_cap(client, monkeypatch):
+    http, db_path = client
+    conn = duckdb.connect(str(db_path), read_only=True)
+    client_id, field_name, changes = conn.execute("""
+        SELECT client_id, field_name, COUNT(*) AS n FROM audit_log
+        GROUP BY ALL ORDER BY n DESC, client_id LIMIT 1
+    """).fetchone()
+    conn.close()
+    assert changes >= 2
+
+    ids, cursor = [], None
+    while True:
+        body = http.get(f"/api/v1/clients/{client_id}/fields/{field_name}/history",
+                        params={"limit": 1, **({"cursor": cursor} if cursor else {})}).json()
+        ids += [change["audit_id"] for change in body["changes"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert len(ids) == len(set(ids)) == changes
+
+    monkeypatch.setattr(audit, "COUNT_CAP", 3)
+    response = http.get(f"/api/v1/audit-log?client_id={client_id}&field_name={field_name}")
+    assert response.headers["X-Total-Count"] == str(min(changes, 3))
+    assert response.headers["X-Total-Count-Approximate"] == ("true" if changes > 3 else "false")
+
+
+def test_archived_rows_stay_visible(client):
+    http, db_path = client
+    conn = duckdb.connect(str(db_path), read_only=True)
+    before = conn.execute("SELECT MEDIAN(updated_at) FROM audit_log").fetchone()[0]
+    total = conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0]
+    client_id, field_name = conn.execute(
+        "SELECT client_id, field_name FROM audit_log WHERE updated_at < ? LIMIT 1", [before]
+    ).fetchone()
+    conn.close()
+
+    pages = {
+        "all": dict(limit=100),
+        "old": dict(limit=30, until=before.isoformat()),
+        "recent": dict(limit=30, since=before.isoformat()),
+        "field": dict(limit=3, client_id=client_id, field_name=field_name),
+    }
+    expected = {name: walk(http, **params)[0] for name, params in pages.items()}
+    history = http.get(f"/api/v1/clients/{client_id}/fields/{field_name}/history").json()["changes"]
+
+    result = archive_audit_log(db_path, before)
+    assert result["archived_rows"] == len(expected["old"]) > 0
+    assert list(archive_dir(db_path).glob("month=*/*.parquet"))
+
+    conn = duckdb.connect(str(db_path), read_only=True)
+    assert conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == total - result["archived_rows"]
+    conn.close()
+
+    for name, params in pages.items():
+        ids, first = walk(http, **params)
+        assert ids == expected[name], name
+    assert walk(http, limit=1000)[1].headers["X-Total-Count"] == str(total)
+    assert http.get(f"/api/v1/clients/{client_id}/fields/{field_name}/history").json()["changes"] == history
@@ -0,0 +1,32 @@
+"""
+Tests for the API benchmark suite's statistics and regression gate
+"""
+from backend.benchmark_api import compare_to_baseline, percentile
+
+
+def _results(**scenarios):
+    return {"sizes": {"1000": scenarios}}
+
+
+def _stats(p95, rps, errors=0):
+    return {"requests": 40, "errors": errors, "p50_ms": p95 / 2, "p95_ms": p95, "p99_ms": p95, "throughput_rps": rps}
+
+
+def test_percentile_interpolates():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.5
+    assert round(percentile(values, 95), 2) == 95.05
+    assert percentile([], 99) == 0.0
+
+
+def test_regression_gate():
+    baseline = _results(**{"peers@c1": _stats(20.0, 50.0), "health@c1": _stats(2.0, 400.0)})
+
+    # Within tolerance, or a large relative jump that is still below the absolute floor
+    clean = _results(**{"peers@c1": _stats(26.0, 45.0), "health@c1": _stats(4.0, 390.0)})
+    assert compare_to_baseline(clean, baseline) == []
+
+    slow = _results(**{"peers@c1": _stats(45.0, 20.0), "health@c1": _stats(2.0, 400.0, errors=1),
+                       "new_route@c1": _stats(500.0, 1.0)})
+    regressions = {(r["scenario"], r["metric"]) for r in compare_to_baseline(slow, baseline)}
+    assert regressions == {("peers@c1", "p95_ms"), ("peers@c1", "throughput_rps"), ("health@c1", "errors")}
@@ -0,0 +1,40 @@
+"""
+Tests for the startup-time report and warm-up hooks
+"""
+from backend import warmup
+from backend.benchmark_startup import STARTUP_BUDGETS_MS, import_report, parse_importtime
+
+
+def test_parse_importtime_sums_self_time_by_package():
+    report = parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       300 |        300 |     numpy.core\n"
+        "import time:      1200 |       1500 |   numpy\n"
+        "import time:       500 |       2000 | backend.main\n"
+        "some other stderr line\n"
+    )
+    assert report == {"total_ms": 2.0, "packages": {"numpy": 1.5, "backend": 0.5}}
+
+
+def test_imports_stay_lazy_and_within_budget():
+    for module, budget in STARTUP_BUDGETS_MS.items():
+        report = import_report(module)
+        assert report["lazy_loaded"] == [], module
+        assert report["total_ms"] <= budget, (module, report["total_ms"])
+
+
+def test_warm_up_runs_every_hook_despite_failures(make_db, monkeypatch):
+    db_path = make_db(rows=20, seed=4)
+    calls = []
+
+    def failing(path):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(warmup, "_hooks", [failing, warmup.prime_hot_queries, calls.append])
+    monkeypatch.setenv("PLANWISE_WARMUP", "0")
+    assert warmup.warm_up(db_path) is None
+
+    monkeypatch.setenv("PLANWISE_WARMUP", "1")
+    thread = warmup.warm_up(db_path)
+    thread.join(timeout=30)
+    assert calls == [db_path]
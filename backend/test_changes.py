@@ -0,0 +1,80 @@
+"""
+Tests for the plan edit change feed (changes.py)
+"""
+import asyncio
+import json
+import pytest
+
+from backend import changes
+from backend import main as api
+from backend.changes import ChangeFeed
+
+
+@pytest.fixture
+def http(make_client, monkeypatch):
+    monkeypatch.setattr(api, "feed", ChangeFeed())
+    # Short-lived streams so a test can read a whole response
+    monkeypatch.setattr(changes, "STREAM_SECONDS", 0.2)
+    return make_client(rows=60, seed=7, snapshots=False)
+
+
+def read_stream(http, **params):
+    body = http.get("/api/v1/changes/stream", params=params).text
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], fields.get("id"), json.loads(fields["data"])))
+    return events
+
+
+def test_stream_resumes_from_cursor(http, monkeypatch):
+    ids = []
+    for client_id, value in (("SYN-0000001", "Immediate"), ("SYN-0000002", "Immediate"), ("SYN-0000001", "5-year cliff")):
+        response = http.patch(f"/api/v1/clients/{client_id}/fields/vesting_schedule",
+                              json={"new_value": value, "updated_by": "test@planwise.com"})
+        ids.append(response.json()["audit_log_id"])
+    response = http.put("/api/v1/clients/SYN-0000001", json={
+        "updates": [{"field_name": "auto_enrollment_rate", "new_value": "0.05"}],
+        "updated_by": "test@planwise.com",
+    })
+    ids.append(response.json()["audit_log_ids"][0])
+
+    # Replayed from the buffer, filtered to one client
+    events = read_stream(http, cursor=ids[0], client_ids="SYN-0000001")
+    assert [(kind, event_id) for kind, event_id, _ in events] == [("change", ids[2]), ("change", ids[3])]
+    assert events[0][2]["new_value"] == "5-year cliff"
+    assert events[1][2]["field_name"] == "auto_enrollment_rate"
+
+    # Replayed from audit_log once the buffer no longer holds the cursor
+    monkeypatch.setattr(api, "feed", ChangeFeed())
+    events = read_stream(http, cursor=ids[0])
+    assert [event_id for _, event_id, _ in events] == ids[1:]
+    assert http.get("/api/v1/changes/stream", headers={"Last-Event-ID": ids[2]}).text.count("event: change") == 1
+
+    # Unknown (or too old) cursors tell the client to refetch
+    assert [kind for kind, _, _ in read_stream(http, cursor="audit-unknown")] == ["reset"]
+
+
+def test_fan_out_is_bounded_per_stream(monkeypatch):
+    monkeypatch.setattr(changes, "SUBSCRIBER_QUEUE_SIZE", 2)
+    change_feed = ChangeFeed(size=3)
+    events = [{"id": f"a{i}", "client_id": "C-1" if i % 2 else "C-2"} for i in range(6)]
+
+    async def publish_and_read():
+        watching = change_feed.subscribe(frozenset({"C-1"}))
+        everything = change_feed.subscribe()
+        change_feed.publish(events[:3])
+        await asyncio.sleep(0)
+        return watching, everything
+
+    watching, everything = asyncio.run(publish_and_read())
+    # C-1's stream got its one event; the unfiltered stream overflowed and must catch up from its cursor
+    assert watching.queue.qsize() == 1 and not watching.overflowed
+    assert everything.overflowed
+
+    change_feed.publish(events[3:])
+    assert [e["id"] for e in change_feed.since("a3")] == ["a4", "a5"]
+    assert [e["id"] for e in change_feed.since("a3", frozenset({"C-1"}))] == ["a5"]
+    # a0 has left the bounded buffer
+    assert change_feed.since("a0") is None
@@ -0,0 +1,74 @@
+"""
+Tests for the single-query client context (client_context.py)
+"""
+import duckdb
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main as api
+from backend.client_context import STATE_REGIONS, _request_cache, load_client_context
+
+
+@pytest.fixture
+def db_path(make_client):
+    make_client(rows=300, seed=13, snapshots=False)
+    return api.DB_PATH
+
+
+def test_context_matches_cohort_queries(db_path):
+    conn = duckdb.connect(str(db_path), read_only=True)
+    client_ids = [row[0] for row in conn.execute("SELECT client_id FROM plan_designs ORDER BY client_id LIMIT 15").fetchall()]
+
+    for client_id in client_ids:
+        context = load_client_context(conn, client_id)
+        industry, state = conn.execute(
+            "SELECT industry, state FROM plan_designs WHERE client_id = ?", [client_id]
+        ).fetchone()
+        assert context["client"]["client_id"] == client_id
+
+        size, median_match, avg_ae = conn.execute("""
+            SELECT COUNT(*), MEDIAN(match_effective_rate), AVG(auto_enrollment_rate)
+            FROM plan_designs WHERE industry = ? AND client_id != ?
+        """, [industry, client_id]).fetchone()
+        assert context["industry"]["cohort_size"] == size
+        assert context["industry"]["median_match_rate"] == pytest.approx(float(median_match))
+        assert context["industry"]["avg_ae_rate"] == pytest.approx(float(avg_ae))
+
+        state_rates = [float(r or 0) * 100 for (r,) in conn.execute(
+            "SELECT auto_enrollment_rate FROM plan_designs WHERE industry = ? AND state = ? AND client_id != ?",
+            [industry, state, client_id]
+        ).fetchall()]
+        distribution = context["state"]["distributions"]["auto_enroll"]
+        assert context["state"]["cohort_size"] == len(state_rates)
+        assert distribution["total"] == pytest.approx(sum(state_rates))
+        assert distribution["counts"][0] == sum(1 for v in state_rates if 0 <= v < 1)
+
+        region_states = [s for s, r in STATE_REGIONS.items() if r == STATE_REGIONS.get(state)] or None
+        caps = sorted(float(r) * 100 for (r,) in conn.execute(
+            "SELECT auto_escalation_cap FROM plan_designs WHERE industry = ? AND auto_escalation_cap IS NOT NULL"
+            + (" AND list_contains(?, state)" if region_states else ""),
+            [industry, region_states] if region_states else [industry]
+        ).fetchall())
+        median, p75 = context["region_cohort"]["benchmarks"]["auto_escalation_cap"]
+        assert (median, p75) == ((caps[len(caps) // 2], caps[int(len(caps) * 0.75)]) if caps else (0, 0))
+
+    assert load_client_context(conn, "NOT-A-CLIENT") is None
+    conn.close()
+
+
+def test_context_is_loaded_once_per_request(db_path):
+    http = TestClient(api.app)
+    for path in ("peers", "distributions?cohort=regional", "regional-benchmark", "peer-assessment"):
+        response = http.get(f"/api/v1/clients/SYN-0000001/{path}")
+        assert response.status_code == 200
+        assert response.headers["X-Query-Count"] == "1"
+
+    conn = duckdb.connect(str(db_path), read_only=True)
+    token = _request_cache.set({})
+    try:
+        first = load_client_context(conn, "SYN-0000001")
+        conn.close()
+        # A second panel in the same request reuses the memo without touching the database
+        assert load_client_context(conn, "SYN-0000001") is first
+    finally:
+        _request_cache.reset(token)
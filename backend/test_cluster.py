@@ -0,0 +1,105 @@
+"""
+Tests for the multi-worker reader/writer split (cluster.py)
+"""
+from pathlib import Path
+
+import duckdb
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend import cluster, replica
+from backend import main as api
+from backend.replica import ReplicaManager, ReplicaUnavailable, close_replicas, pinned_replica
+
+
+@pytest.fixture
+def db_path(make_db):
+    return make_db(rows=30, seed=11)
+
+
+def test_readers_follow_the_writers_pointer(db_path):
+    writer = ReplicaManager(db_path)
+    reader = ReplicaManager(db_path, follower=True)
+    assert reader.reader_path() == db_path
+
+    first = writer.publish()
+    assert reader.reader_path() == first
+
+    writer.note_write(["SYN-0000002"])
+    assert reader.reader_path("SYN-0000002") == db_path
+    assert reader.reader_path("SYN-0000003") == first
+
+    # Only a newer replica (or re-stamp of an unchanged one) clears the edited client
+    writer.publish()
+    assert reader.reader_path("SYN-0000002") == writer.current[0]
+    assert reader.version == writer.version
+
+
+def test_reader_forwards_edits_and_stale_reads(db_path, monkeypatch):
+    writer = ReplicaManager(db_path)
+    writer.publish()
+
+    stub = FastAPI()
+
+    @stub.api_route("/{path:path}", methods=["GET", "PATCH"])
+    async def echo(path: str, request: Request):
+        return {"method": request.method, "path": f"/{path}", "body": (await request.body()).decode()}
+
+    monkeypatch.setattr(api, "DB_PATH", db_path)
+    monkeypatch.setenv("PLANWISE_SNAPSHOTS", "0")
+    monkeypatch.setenv("PLANWISE_ROLE", "reader")
+    monkeypatch.setattr(cluster, "_writer_client",
+                        httpx.AsyncClient(transport=httpx.ASGITransport(app=stub), base_url="http://writer"))
+    try:
+        http = TestClient(api.app)
+        local = http.get("/api/v1/clients/SYN-0000001")
+        assert local.status_code == 200 and "X-Served-By" not in local.headers
+        assert local.json()["client_id"] == "SYN-0000001"
+
+        edit = http.patch("/api/v1/clients/SYN-0000001/fields/eligibility?x=1", json={"new_value": "Immediate"})
+        assert edit.headers["X-Served-By"] == "writer"
+        assert edit.json() == {"method": "PATCH", "path": "/api/v1/clients/SYN-0000001/fields/eligibility",
+                               "body": '{"new_value":"Immediate"}'}
+
+        # Once the writer records the edit, reads of that client go to the writer until the next replica
+        writer.note_write(["SYN-0000001"])
+        assert http.get("/api/v1/clients/SYN-0000001").headers.get("X-Served-By") == "writer"
+        assert "X-Served-By" not in http.get("/api/v1/clients/SYN-0000004/peers").headers
+        assert http.get("/api/v1/changes/stream").headers.get("X-Served-By") == "writer"
+    finally:
+        close_replicas(db_path)
+
+
+def test_reader_reads_never_open_the_primary(db_path, monkeypatch):
+    writer = ReplicaManager(db_path)
+    first = writer.publish()
+    reader = ReplicaManager(db_path, follower=True, max_lag=0)
+    opened = []
+    real_connect = replica.connect
+
+    def connect(path, read_only=False):
+        if read_only:
+            opened.append(Path(path))
+        return real_connect(path, read_only=read_only)
+
+    monkeypatch.setattr(replica, "connect", connect)
+
+    # Routed to `first`: it stays the request's replica even once it is past max_lag
+    with pinned_replica(first):
+        reader.connect("SYN-0000001").close()
+
+    conn = duckdb.connect(str(db_path))
+    conn.execute("UPDATE plan_designs SET updated_at = CURRENT_TIMESTAMP WHERE client_id = 'SYN-0000001'")
+    conn.close()
+    second = writer.publish()
+    first.unlink()  # as a later publish prunes it
+    with pinned_replica(first):
+        reader.connect().close()
+
+    second.unlink()
+    with pinned_replica(second), pytest.raises(ReplicaUnavailable):
+        reader.connect()
+    # Each deleted pin is tried once; planwise.db never is
+    assert opened == [first, first, second, second]
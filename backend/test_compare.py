@@ -0,0 +1,66 @@
+"""
+Tests for the multi-client comparison matrix (POST /api/v1/compare)
+"""
+import duckdb
+import pytest
+
+from peer_benchmarking import calculate_percentile
+from backend import main as api
+from backend.compare import COMPARE_LEVERS
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client(rows=300, seed=11), api.DB_PATH
+
+
+def test_compare_matrix_matches_per_client_percentiles(client):
+    http, db_path = client
+    conn = duckdb.connect(str(db_path), read_only=True)
+    rows = conn.execute(
+        f"SELECT client_id, industry, {', '.join(COMPARE_LEVERS.values())} FROM plan_designs"
+    ).fetchall()
+    conn.close()
+    by_id = {row[0]: row for row in rows}
+    requested = [row[0] for row in rows[:20]] + ["NOT-A-CLIENT", rows[0][0]]
+
+    response = http.post("/api/v1/compare", json={"client_ids": requested})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["levers"] == list(COMPARE_LEVERS)
+    assert [c["client_id"] for c in body["clients"]] == requested[:20]
+    assert body["missing"] == ["NOT-A-CLIENT"]
+
+    for i, summary in enumerate(body["clients"]):
+        target = by_id[summary["client_id"]]
+        peers = [row for row in rows if row[1] == target[1] and row[0] != target[0]]
+        assert summary["cohort_size"] == len(peers)
+        for j in range(len(COMPARE_LEVERS)):
+            expected = calculate_percentile(target[2 + j], [p[2 + j] for p in peers])["percentile"]
+            assert body["percentiles"][i][j] == expected
+            if body["status"][i][j] == "above":
+                assert body["values"][i][j] > body["peer_medians"][i][j]
+
+
+def test_compare_rejects_bad_requests(client):
+    http, _ = client
+    assert http.post("/api/v1/compare", json={"client_ids": []}).status_code == 400
+    assert http.post("/api/v1/compare", json={"client_ids": ["NOPE"]}).status_code == 404
+    too_many = [f"C-{i}" for i in range(api.MAX_COMPARE_CLIENTS + 1)]
+    assert http.post("/api/v1/compare", json={"client_ids": too_many}).status_code == 400
+    assert http.post("/api/v1/compare?format=xml", json={"client_ids": ["SYN-0000001"]}).status_code == 400
+
+
+def test_compare_arrow_format(client):
+    http, _ = client
+    response = http.post("/api/v1/compare?format=arrow", json={"client_ids": ["SYN-0000001", "SYN-0000002"]})
+    try:
+        import pyarrow as pa
+    except ImportError:
+        assert response.status_code == 406
+        return
+
+    assert response.headers["content-type"] == api.ARROW_MEDIA_TYPE
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("client_id").to_pylist() == ["SYN-0000001", "SYN-0000002"]
+    assert "match_rate_percentile" in table.column_names
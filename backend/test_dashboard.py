@@ -0,0 +1,37 @@
+"""
+Tests for the composite client dashboard (GET /api/v1/clients/{id}/dashboard)
+"""
+import pytest
+
+from backend import main as api
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client(rows=200, seed=17, snapshots=False)
+
+
+def test_dashboard_matches_standalone_endpoints(client):
+    response = client.get("/api/v1/clients/SYN-0000003/dashboard")
+    assert response.status_code == 200
+    assert response.headers["X-Query-Count"] == "1"
+    dashboard = response.json()
+    assert list(dashboard) == ["client_id", *api.DASHBOARD_SECTIONS]
+
+    standalone = {
+        "client": "", "extractions": "/extractions", "regional_benchmark": "/regional-benchmark",
+        "peers": "/peers", "peer_assessment": "/peer-assessment", "navigator_scorecard": "/navigator-scorecard",
+    }
+    for section, suffix in standalone.items():
+        assert dashboard[section] == client.get(f"/api/v1/clients/SYN-0000003{suffix}").json(), section
+
+
+def test_dashboard_field_selection(client):
+    dashboard = client.get("/api/v1/clients/SYN-0000003/dashboard?fields=peers,client").json()
+    assert list(dashboard) == ["client_id", "client", "peers"]
+
+    response = client.get("/api/v1/clients/SYN-0000003/dashboard?fields=client,charts")
+    assert response.status_code == 400
+    assert "charts" in response.json()["detail"]
+
+    assert client.get("/api/v1/clients/NOPE/dashboard").status_code == 404
@@ -0,0 +1,110 @@
+"""
+Tests for the database pool and event-loop lag monitor (db_executor.py)
+"""
+import asyncio
+import threading
+import time
+
+from fastapi import HTTPException
+
+from backend import db_executor
+from backend import main as api
+from backend.db_executor import BULK, INTERACTIVE, monitor_loop_lag, offloaded, run_db, shutdown_executor
+from backend.instrumentation import metrics, render_metrics
+
+
+def test_bulk_limit_leaves_interactive_calls_running(monkeypatch):
+    monkeypatch.setenv("PLANWISE_DB_BULK", "1")
+    monkeypatch.setenv("PLANWISE_DB_INTERACTIVE", "2")
+    shutdown_executor()
+    running = {BULK: 0, INTERACTIVE: 0}
+    peak = {BULK: 0, INTERACTIVE: 0}
+    lock = threading.Lock()
+
+    def work(route_class):
+        with lock:
+            running[route_class] += 1
+            peak[route_class] = max(peak[route_class], running[route_class])
+        time.sleep(0.05)
+        with lock:
+            running[route_class] -= 1
+        return threading.current_thread().name
+
+    async def scenario():
+        calls = [run_db(BULK, work, BULK) for _ in range(3)] + [run_db(INTERACTIVE, work, INTERACTIVE) for _ in range(2)]
+        return await asyncio.gather(*calls)
+
+    try:
+        threads = asyncio.run(scenario())
+    finally:
+        shutdown_executor()
+    assert peak == {BULK: 1, INTERACTIVE: 2}
+    assert all(name.startswith("planwise-db") for name in threads)
+
+
+def test_lag_monitor_sees_blocking_calls_on_the_loop(monkeypatch):
+    monkeypatch.setenv("PLANWISE_LOOP_LAG_WARN_MS", "50")
+    metrics.reset()
+
+    async def scenario():
+        monitor = asyncio.create_task(monitor_loop_lag(interval=0.01))
+        await asyncio.sleep(0.02)
+        time.sleep(0.2)  # what a DuckDB call made from an async handler does
+        await asyncio.sleep(0.02)
+        monitor.cancel()
+
+    asyncio.run(scenario())
+    assert metrics.loop_lag.totals[()] >= 1
+    assert metrics.loop_lag.sums[()] >= 0.15
+    assert "planwise_event_loop_lag_seconds_count" in render_metrics()
+
+
+def test_sync_handlers_run_on_the_pool(make_client, monkeypatch):
+    monkeypatch.setenv("PLANWISE_WARMUP", "0")
+    threads = []
+    original = api.map_field_name
+
+    def map_field_name(field_name):
+        threads.append(threading.current_thread().name)
+        return original(field_name)
+
+    monkeypatch.setattr(api, "map_field_name", map_field_name)
+
+    with make_client(rows=20, seed=5, audit_per_plan=1, snapshots=False) as http:
+        assert http.get("/api/v1/clients/SYN-0000001/fields/eligibility/history").status_code == 200
+        response = http.patch("/api/v1/clients/SYN-0000001/fields/eligibility",
+                              json={"new_value": "Immediate", "updated_by": "test@planwise.com"})
+        assert response.status_code == 200
+        assert 'planwise_db_executor_in_flight{route_class="interactive"} 0' in http.get("/api/v1/metrics").text
+
+    assert len(threads) == 2 and all(name.startswith("planwise-db") for name in threads)
+    assert db_executor.route_class_for(["POST"], "/api/v1/export/excel") == BULK
+    assert db_executor.route_class_for(["GET"], "/api/v1/metrics") is None
+
+
+def test_saturated_bulk_routes_get_429_with_retry_after(monkeypatch):
+    monkeypatch.setenv("PLANWISE_DB_BULK", "1")
+    monkeypatch.setenv("PLANWISE_DB_BULK_QUEUE", "1")
+    monkeypatch.setenv("PLANWISE_DB_QUEUE_TIMEOUT", "0.2")
+    shutdown_executor()
+    metrics.reset()
+    export = offloaded(lambda seconds: time.sleep(seconds) or "done", BULK)
+
+    async def scenario(*durations):
+        return await asyncio.gather(*(export(seconds) for seconds in durations), return_exceptions=True)
+
+    try:
+        # One runs, one waits, the third finds the queue full
+        running, queued, rejected = asyncio.run(scenario(0.05, 0.05, 0.05))
+        # A call that can't get a slot within the timeout is turned away too
+        slow, timed_out = asyncio.run(scenario(0.5, 0.01))
+    finally:
+        shutdown_executor()
+
+    assert running == queued == slow == "done"
+    for error in (rejected, timed_out):
+        assert isinstance(error, HTTPException) and error.status_code == 429
+        assert int(error.headers["Retry-After"]) >= 1
+    assert metrics.db_rejected_total[(BULK,)] == 2
+    assert metrics.db_queue_wait.totals[(BULK,)] == 4
+    assert 'planwise_db_queue_wait_seconds_count{route_class="bulk"} 4' in render_metrics()
@@ -0,0 +1,44 @@
+"""
+Tests for pre-serialised JSON and Arrow IPC responses on list/export endpoints
+"""
+import pytest
+
+from backend import main as api
+from backend.client_context import STATE_REGIONS
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client(rows=150, seed=3)
+
+
+def test_clients_fast_json_matches_client_summary(client):
+    clients = client.get("/api/v1/clients?limit=40").json()
+    assert len(clients) == 40
+    assert [c["client_name"] for c in clients] == sorted(c["client_name"] for c in clients)
+    for row in clients:
+        assert api.ClientSummary(**row).model_dump() == row
+        assert row["region"] == STATE_REGIONS.get(row["state"], "Unknown")
+
+    matches = client.get("/api/v1/clients?search=County").json()
+    assert matches and all("County" in c["client_name"] for c in matches)
+    assert client.get("/api/v1/clients?search=no-such-plan").json() == []
+
+
+def test_arrow_negotiation(client):
+    accept = {"Accept": api.ARROW_MEDIA_TYPE}
+    clients = client.get("/api/v1/clients?limit=25", headers=accept)
+    export = client.post("/api/v1/export/excel", json=["SYN-0000002", "SYN-0000001"], headers=accept)
+    try:
+        import pyarrow as pa
+    except ImportError:
+        assert clients.status_code == 406 and export.status_code == 406
+        return
+
+    assert clients.headers["content-type"] == api.ARROW_MEDIA_TYPE
+    table = pa.ipc.open_stream(clients.content).read_all()
+    assert table.num_rows == 25
+    assert table.column_names == list(api.ClientSummary.model_fields)
+
+    table = pa.ipc.open_stream(export.content).read_all()
+    assert table.column("client_id").to_pylist() == ["SYN-0000001", "SYN-0000002"]
@@ -0,0 +1,46 @@
+"""
+Tests for request timing, query counting, /api/v1/metrics and the slow-query log
+"""
+import json
+
+import pytest
+
+from backend.instrumentation import metrics
+
+
+@pytest.fixture
+def client(make_client):
+    http = make_client(rows=50, seed=1, audit_per_plan=1)
+    metrics.reset()
+    return http
+
+
+def test_metrics_use_route_templates_and_count_queries(client):
+    for cid in ("SYN-0000001", "SYN-0000002"):
+        response = client.get(f"/api/v1/clients/{cid}/peer-assessment")
+        assert response.status_code == 200
+        assert int(response.headers["X-Query-Count"]) >= 1
+        assert "db;dur=" in response.headers["Server-Timing"]
+
+    text = client.get("/api/v1/metrics").text
+    route = 'route="/api/v1/clients/{client_id}/peer-assessment"'
+
+    assert f'planwise_http_request_duration_seconds_count{{method="GET",{route},status="200"}} 2' in text
+    assert f'planwise_duckdb_queries_per_request_count{{{route}}} 2' in text
+    assert "SYN-0000001" not in text
+    assert "# TYPE planwise_duckdb_queries_total counter" in text
+
+
+def test_slow_query_log_captures_sql_params_and_plan(client, tmp_path, monkeypatch):
+    log_path = tmp_path / "slow.jsonl"
+    monkeypatch.setenv("PLANWISE_SLOW_QUERY_MS", "0")
+    monkeypatch.setenv("PLANWISE_SLOW_QUERY_LOG", str(log_path))
+
+    assert client.get("/api/v1/clients/SYN-0000003").status_code == 200
+
+    entries = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert entries[0]["route"] == "/api/v1/clients/{client_id}"
+    assert entries[0]["params"] == ["SYN-0000003"]
+    assert "Query Profiling Information" in entries[0]["plan"]
+    assert 'planwise_duckdb_slow_queries_total{route="/api/v1/clients/{client_id}"}' in \
+        client.get("/api/v1/metrics").text
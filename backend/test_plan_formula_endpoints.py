@@ -0,0 +1,32 @@
+"""
+Tests that API edits keep parsed formula columns current and endpoints read them
+"""
+import duckdb
+
+from backend import main as api
+
+
+def test_vesting_edit_flows_into_assessment_and_distribution(make_client):
+    client = make_client(rows=60, seed=5)
+    db_path = api.DB_PATH
+    cid = "SYN-0000004"
+
+    response = client.patch(f"/api/v1/clients/{cid}/fields/vesting_schedule",
+                            json={"new_value": "Immediate", "updated_by": "test@planwise.com"})
+    assert response.status_code == 200
+
+    vesting = next(f for f in client.get(f"/api/v1/clients/{cid}/peer-assessment").json()["features"]
+                   if f["lever"] == "VESTING")
+    assert vesting["status"] == "below"
+    assert client.get(f"/api/v1/clients/{cid}/distributions?metric=vesting").json()["clientValue"] == 0.0
+
+    response = client.put(f"/api/v1/clients/{cid}", json={
+        "updates": [{"field_name": "vesting_schedule", "new_value": "5-year cliff"}],
+        "updated_by": "test@planwise.com",
+    })
+    assert response.status_code == 200
+
+    conn = duckdb.connect(str(db_path), read_only=True)
+    assert conn.execute("SELECT vesting_type, vesting_years FROM plan_designs WHERE client_id = ?",
+                        [cid]).fetchone() == ("cliff", 5)
+    conn.close()
@@ -0,0 +1,45 @@
+"""
+Tests for on-demand request profiling (?profile=1)
+"""
+import json
+
+import pytest
+
+
+@pytest.fixture
+def client(make_client, tmp_path, monkeypatch):
+    monkeypatch.setenv("PLANWISE_PROFILE_DIR", str(tmp_path / "profiles"))
+    return make_client(rows=50, seed=2, audit_per_plan=1)
+
+
+def test_profiling_is_off_unless_enabled(client, monkeypatch):
+    monkeypatch.delenv("PLANWISE_PROFILING", raising=False)
+    response = client.get("/api/v1/clients/SYN-0000001/peer-assessment?profile=1")
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+    monkeypatch.setenv("PLANWISE_PROFILING", "1")
+    monkeypatch.setenv("PLANWISE_PROFILE_TOKEN", "s3cret")
+    response = client.get("/api/v1/clients/SYN-0000001/peer-assessment", headers={"X-Profile": "1"})
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_profiled_request_stores_collapsed_stacks(client, monkeypatch):
+    monkeypatch.setenv("PLANWISE_PROFILING", "1")
+    monkeypatch.setenv("PLANWISE_PROFILE_TOKEN", "s3cret")
+
+    response = client.get("/api/v1/clients/SYN-0000001/peer-assessment?profile=1",
+                          headers={"X-Profile-Token": "s3cret"})
+    assert response.status_code == 200
+    assert response.json()
+
+    collapsed = client.get(response.headers["X-Profile-Url"]).text
+    lines = collapsed.strip().splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(line.startswith("[duckdb];WITH_target_AS") for line in lines)
+
+    report = json.loads(client.get(response.headers["X-Profile-Url"], params={"format": "json"}).text)
+    assert report["path"] == "/api/v1/clients/SYN-0000001/peer-assessment"
+    assert len(report["queries"]) == int(response.headers["X-Query-Count"])
+
+    assert client.get("/api/v1/profiles/..%2Fsecrets").status_code == 404
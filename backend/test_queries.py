@@ -0,0 +1,88 @@
+"""
+Tests for the query registry (queries.py) and the update paths built on it
+"""
+import duckdb
+import pytest
+
+from planwise_import import PLAN_DESIGN_COLUMNS, import_file
+from backend import main as api
+from backend import queries
+
+
+@pytest.fixture
+def db_path(make_db):
+    return make_db(rows=20, seed=8)
+
+
+def test_registry_binds_against_schema_and_maps_rows(db_path, monkeypatch):
+    conn = duckdb.connect(str(db_path), read_only=True)
+    try:
+        assert queries.bind_all(conn) == []
+        plan = queries.PLAN_BY_CLIENT.one(conn, "SYN-0000001")
+        assert plan["client_id"] == "SYN-0000001" and "vesting_schedule" in plan
+        assert queries.PLAN_BY_CLIENT.one(conn, "missing") is None
+        assert queries.COUNT_PLANS.one(conn) == 20
+        assert queries.SELECT_FIELD["industry"].one(conn, "SYN-0000001") == (plan["industry"], plan["industry"])
+
+        stale = queries.Statement("stale", "SELECT retired_column FROM plan_designs WHERE client_id = ?")
+        monkeypatch.setattr(queries, "STATEMENTS", queries.STATEMENTS + [stale])
+        assert queries.bind_all(conn) == ["stale"]
+    finally:
+        conn.close()
+
+
+def test_update_paths_only_accept_editable_fields(make_client):
+    http = make_client(rows=20, seed=8, snapshots=False)
+    injected = "eligibility = 'x', client_name"
+
+    response = http.patch(f"/api/v1/clients/SYN-0000001/fields/{injected}",
+                          json={"new_value": "y", "updated_by": "test@planwise.com"})
+    assert response.status_code == 400 and response.json()["detail"]["error"] == "unknown_field"
+    assert http.get("/api/v1/clients/SYN-0000001/fields/row_fingerprint/history").status_code == 400
+
+    # One bad field rejects the whole batch before anything is written
+    before = http.get("/api/v1/clients/SYN-0000001").json()
+    response = http.put("/api/v1/clients/SYN-0000001", json={"updated_by": "test@planwise.com", "updates": [
+        {"field_name": "eligibility", "new_value": "2 years of service"},
+        {"field_name": injected, "new_value": "y"},
+    ]})
+    assert response.status_code == 400
+    assert http.get("/api/v1/clients/SYN-0000001").json() == before
+
+    response = http.put("/api/v1/clients/SYN-0000001", json={"updated_by": "test@planwise.com", "updates": [
+        {"field_name": "eligibility", "new_value": "Immediate"},
+        {"field_name": "Vesting Schedule", "new_value": "3-year cliff"},
+    ]})
+    assert response.status_code == 200 and response.json()["updates_applied"] == 2
+    plan = http.get("/api/v1/clients/SYN-0000001").json()
+    assert (plan["eligibility"], plan["vesting_schedule"], plan["updated_by"]) == (
+        "Immediate", "3-year cliff", "test@planwise.com")
+    history = http.get("/api/v1/clients/SYN-0000001/fields/vesting_schedule/history").json()
+    assert history["current_value"] == "3-year cliff"
+    assert [change["new_value"] for change in history["changes"]] == ["3-year cliff"]
+
+
+def test_edits_keep_row_fingerprint_current_for_reimports(make_client, tmp_path):
+    """Re-importing the pre-edit row restores it: both edit paths recompute the stored fingerprint."""
+    http = make_client(rows=20, seed=8, snapshots=False)
+    original = http.get("/api/v1/clients/SYN-0000001").json()
+    csv_path = tmp_path / "plan.csv"
+    conn = duckdb.connect(str(api.DB_PATH))
+    conn.execute(f"""
+        COPY (SELECT {', '.join(PLAN_DESIGN_COLUMNS)} FROM plan_designs WHERE client_id = 'SYN-0000001')
+        TO '{csv_path}' (HEADER)
+    """)
+    conn.close()
+    assert import_file(str(csv_path), str(api.DB_PATH))["summary"]["unchanged"] == 1
+
+    assert http.patch("/api/v1/clients/SYN-0000001/fields/employee_count",
+                      json={"new_value": "999", "updated_by": "test@planwise.com"}).status_code == 200
+    assert http.put("/api/v1/clients/SYN-0000001", json={"updated_by": "test@planwise.com", "updates": [
+        {"field_name": "eligibility", "new_value": "90 days of service"},
+    ]}).status_code == 200
+
+    summary = import_file(str(csv_path), str(api.DB_PATH))["summary"]
+    assert (summary["updated"], summary["unchanged"]) == (1, 0)
+    assert summary["field_changes"] == {"employee_count": 1, "eligibility": 1}
+    plan = http.get("/api/v1/clients/SYN-0000001").json()
+    assert (plan["employee_count"], plan["eligibility"]) == (original["employee_count"], original["eligibility"])
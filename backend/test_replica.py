@@ -0,0 +1,66 @@
+"""
+Tests for read replicas (replica.py)
+"""
+from datetime import datetime, timedelta
+
+import duckdb
+
+from backend import main as api
+from backend.replica import POINTER_FILE, ReplicaManager, close_replicas, get_replicas
+
+
+def test_publish_swaps_pointer_and_bounds_staleness(make_db):
+    db_path = make_db(rows=40, seed=3, audit_per_plan=1)
+    replicas = ReplicaManager(db_path, max_lag=60)
+    assert replicas.reader_path() == db_path
+
+    first = replicas.publish()
+    assert replicas.reader_path() == first != db_path
+    assert (replicas.directory / POINTER_FILE).read_text().count(first.name) == 1
+    conn = duckdb.connect(str(first), read_only=True)
+    assert conn.execute("SELECT COUNT(*) FROM plan_designs").fetchone()[0] == 40
+    conn.close()
+
+    # Unchanged data: the same file is re-stamped instead of copied
+    assert replicas.publish() == first
+
+    conn = duckdb.connect(str(db_path))
+    conn.execute("UPDATE plan_designs SET eligibility = 'Immediate', updated_at = now() WHERE client_id = 'SYN-0000001'")
+    conn.close()
+    replicas.note_write(["SYN-0000001"])
+    # The edited client reads the primary until a newer replica exists; others keep the replica
+    assert replicas.reader_path("SYN-0000001") == db_path
+    assert replicas.reader_path("SYN-0000002") == first
+
+    second = replicas.publish()
+    assert second != first and replicas.reader_path("SYN-0000001") == second
+    conn = duckdb.connect(str(second), read_only=True)
+    assert conn.execute("SELECT eligibility FROM plan_designs WHERE client_id = 'SYN-0000001'").fetchone()[0] == "Immediate"
+    conn.close()
+
+    # A manager started later picks up the published pointer; too old a replica is not served
+    restarted = ReplicaManager(db_path, max_lag=60)
+    assert restarted.current[0] == second
+    restarted._current = (second, datetime.now() - timedelta(seconds=61))
+    assert restarted.reader_path() == db_path
+
+
+def test_reads_use_replica_and_see_own_writes(make_client, monkeypatch):
+    monkeypatch.setenv("PLANWISE_REPLICAS", "1")
+    monkeypatch.setenv("PLANWISE_REPLICA_INTERVAL", "3600")
+    http = make_client(rows=40, seed=3, snapshots=False)
+    db_path = api.DB_PATH
+    replicas = get_replicas(db_path)
+    try:
+        replica = replicas.publish()
+        response = http.patch("/api/v1/clients/SYN-0000004/fields/vesting_schedule",
+                              json={"new_value": "Immediate", "updated_by": "test@planwise.com"})
+        assert response.status_code == 200
+
+        # The editor's next read comes from the primary, so it includes the edit
+        assert http.get("/api/v1/clients/SYN-0000004").json()["vesting_schedule"] == "Immediate"
+        assert replicas.reader_path("SYN-0000004") == db_path
+        assert replicas.reader_path("SYN-0000005") == replica
+        assert http.get("/api/v1/clients/SYN-0000005").status_code == 200
+    finally:
+        close_replicas(db_path)
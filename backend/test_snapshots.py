@@ -0,0 +1,56 @@
+"""
+Tests for precomputed peer assessment / Navigator Scorecard snapshots
+"""
+import pytest
+
+from backend import main as api
+from backend.snapshots import close_store, get_store
+
+
+@pytest.fixture
+def client(make_client):
+    http = make_client(rows=200, seed=5)
+    db_path = api.DB_PATH
+    yield http, get_store(db_path)
+    close_store(db_path)
+
+
+def test_snapshot_matches_live_payload(client):
+    http, store = client
+    kinds = ("peer-assessment", "navigator-scorecard")
+    live = {kind: http.get(f"/api/v1/clients/SYN-0000001/{kind}") for kind in kinds}
+    assert live["peer-assessment"].headers["X-Snapshot"] == "live"
+    assert store.wait_idle()
+
+    for kind in kinds:
+        snapshot = http.get(f"/api/v1/clients/SYN-0000001/{kind}")
+        assert snapshot.headers["X-Snapshot"] == "hit"
+        assert snapshot.content == live[kind].content
+
+    assert http.get("/api/v1/clients/NOPE/peer-assessment").status_code == 404
+
+
+def test_plan_update_invalidates_cohort(client):
+    http, store = client
+    http.get("/api/v1/clients/SYN-0000001/peer-assessment")
+    assert store.wait_idle()
+    industry = http.get("/api/v1/clients/SYN-0000001").json()["industry"]
+    peer = next(
+        c["client_id"] for c in http.get("/api/v1/clients?limit=200").json()
+        if c["industry"] == industry and c["client_id"] != "SYN-0000001"
+    )
+    assert http.get(f"/api/v1/clients/{peer}/peer-assessment").headers["X-Snapshot"] == "hit"
+
+    response = http.patch(
+        "/api/v1/clients/SYN-0000001/fields/vesting_schedule",
+        json={"new_value": "Immediate", "updated_by": "test@planwise.com"}
+    )
+    assert response.status_code == 200
+
+    # The update made the whole cohort stale; the worker recomputes it in the background
+    assert store.lookup(peer, "peer_assessment") is None
+    assert store.wait_idle()
+    fresh = http.get("/api/v1/clients/SYN-0000001/peer-assessment")
+    assert fresh.headers["X-Snapshot"] == "hit"
+    vesting = next(f for f in fresh.json()["features"] if f["lever"] == "VESTING")
+    assert vesting["current_design"] == "Immediate" and vesting["status"] == "below"
@@ -0,0 +1,114 @@
+"""
+Warm-up hooks run once in the background when the API starts.
+
+Heavy dependencies are imported where they are used: pandas and openpyxl by
+the Excel export and snapshot recomputes, pyarrow by Arrow responses. That
+keeps `import backend.main` within the startup budget checked by
+benchmark_startup.py. Otherwise the first request that needs one of them pays
+for the import (about 0.3 s for the first export). `warm_up` runs the
+registered hooks on a daemon thread instead. The server accepts requests
+immediately, and the modules are usually loaded before the first export.
+
+- import_lazy_modules: pandas and openpyxl (pyarrow when installed)
+- bind_statements: binds every read statement of the query registry
+  (queries.py) against the schema, logging any that no longer fit it
+- prime_hot_queries: runs the hot plan reads once. This pulls the plan table
+  into the OS page cache and initialises DuckDB's NumPy conversion
+
+Other modules add hooks with `register_warmup`. Set PLANWISE_WARMUP=0 to
+skip warm-up.
+"""
+import importlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+try:
+    from backend.client_context import load_client_context
+    from backend.instrumentation import connect
+    from backend.queries import PLAN_BY_CLIENT, bind_all
+    from backend.replica import get_replicas
+except ImportError:  # started from backend/ as `uvicorn main:app`
+    from client_context import load_client_context
+    from instrumentation import connect
+    from queries import PLAN_BY_CLIENT, bind_all
+    from replica import get_replicas
+
+logger = logging.getLogger("planwise.warmup")
+
+# Imported by handlers on first use; import_lazy_modules loads them early
+PRELOAD_MODULES = ("pandas", "openpyxl", "pyarrow")
+
+_hooks: List[Callable[[Path], None]] = []
+
+
+def warmup_enabled() -> bool:
+    return os.environ.get("PLANWISE_WARMUP", "1") != "0"
+
+
+def register_warmup(hook: Callable[[Path], None]) -> Callable[[Path], None]:
+    """Add a hook (called with the main database path); usable as a decorator."""
+    _hooks.append(hook)
+    return hook
+
+
+def open_reader(db_path: Path):
+    """Read connection the way get_db opens one: the latest replica when enabled, else the primary."""
+    replicas = get_replicas(db_path)
+    return replicas.connect() if replicas is not None else connect(str(db_path), read_only=True)
+
+
+@register_warmup
+def import_lazy_modules(db_path: Path):
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:  # optional (pyarrow)
+            pass
+
+
+@register_warmup
+def bind_statements(db_path: Path):
+    conn = open_reader(db_path)
+    try:
+        failed = bind_all(conn)
+    finally:
+        conn.close()
+    if failed:
+        logger.error("Statements no longer match the schema: %s", ", ".join(failed))
+
+
+@register_warmup
+def prime_hot_queries(db_path: Path):
+    conn = open_reader(db_path)
+    try:
+        row = conn.execute("SELECT client_id FROM plan_designs ORDER BY client_id LIMIT 1").fetchone()
+        if row is not None:
+            PLAN_BY_CLIENT.one(conn, row[0])
+            load_client_context(conn, row[0])
+    finally:
+        conn.close()
+
+
+def run_hooks(db_path: Path):
+    """Run every hook in order; a failing hook is logged and skipped."""
+    for hook in list(_hooks):
+        started = time.perf_counter()
+        try:
+            hook(db_path)
+        except Exception:
+            logger.exception("Warm-up hook %s failed", hook.__name__)
+        else:
+            logger.info("Warm-up %s took %.1f ms", hook.__name__, (time.perf_counter() - started) * 1000)
+
+
+def warm_up(db_path) -> Optional[threading.Thread]:
+    """Start running the hooks on a daemon thread; None when PLANWISE_WARMUP=0."""
+    if not warmup_enabled():
+        return None
+    thread = threading.Thread(target=run_hooks, args=(Path(db_path),), name="planwise-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -8,6 +8,7 @@ import { Assessment } from './components/Assessment';
 import { ClientRoster } from './components/ClientRoster';
 import { useClients, useCreateClient } from './hooks/useClients';
 import { usePlanData } from './hooks/usePlanData';
+import { useChangeFeed } from './hooks/useChangeFeed';
 import { useUpdateField, useGenericUpdateField } from './hooks/useUpdateField';
 import { Client } from './types';
 
@@ -131,6 +132,7 @@ const DashboardContent: React.FC = () => {
   }, [clients, selectedClientId]);
 
   const { data: planData, isLoading: isLoadingPlan, isError: isPlanError } = usePlanData(selectedClientId);
+  useChangeFeed(selectedClientId);
   const updateFieldMutation = useUpdateField(selectedClientId);
   const genericUpdateFieldMutation = useGenericUpdateField();
   const createClientMutation = useCreateClient();
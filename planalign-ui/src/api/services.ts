@@ -11,6 +11,25 @@ export interface ClientSummary {
     employee_count: number;
 }
 
+export type DashboardSection =
+    | 'client'
+    | 'extractions'
+    | 'regional_benchmark'
+    | 'peers'
+    | 'peer_assessment'
+    | 'navigator_scorecard';
+
+// Client-detail panels in one response; only the requested sections are present
+export interface ClientDashboard {
+    client_id: string;
+    client?: Record<string, any>;
+    extractions?: ExtractedField[];
+    regional_benchmark?: BenchmarkDataPoint[];
+    peers?: any;
+    peer_assessment?: any;
+    navigator_scorecard?: any;
+}
+
 export const api = {
     // Get all clients
     getClients: async (): Promise<ClientSummary[]> => {
@@ -39,6 +58,14 @@ export const api = {
         return response.data;
     },
 
+    // Get several client-detail panels in one request (all sections by default)
+    getClientDashboard: async (clientId: string, fields?: DashboardSection[]): Promise<ClientDashboard> => {
+        const response = await apiClient.get<ClientDashboard>(`/api/v1/clients/${clientId}/dashboard`, {
+            params: fields ? { fields: fields.join(',') } : undefined
+        });
+        return response.data;
+    },
+
     // Create a new client
     createClient: async (data: { name: string; industry: string; region: string; state?: string }): Promise<ClientSummary> => {
         const response = await apiClient.post<ClientSummary>('/api/v1/clients', data);
@@ -0,0 +1,28 @@
+import { useEffect } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import { apiClient } from '../api/client';
+
+// Refresh a client's plan data when anyone edits it, instead of polling.
+// EventSource reconnects on its own and resumes after the last event it saw.
+export const useChangeFeed = (clientId: string) => {
+    const queryClient = useQueryClient();
+
+    useEffect(() => {
+        if (!clientId) return;
+
+        const url = new URL('/api/v1/changes/stream', apiClient.defaults.baseURL);
+        url.searchParams.set('client_ids', clientId);
+        const source = new EventSource(url.toString());
+
+        source.addEventListener('change', () => {
+            queryClient.invalidateQueries({ queryKey: ['planData', clientId] });
+        });
+        // The server could not replay what was missed: refetch everything shown
+        source.addEventListener('reset', () => {
+            queryClient.invalidateQueries({ queryKey: ['planData', clientId] });
+            queryClient.invalidateQueries({ queryKey: ['clients'] });
+        });
+
+        return () => source.close();
+    }, [clientId, queryClient]);
+};
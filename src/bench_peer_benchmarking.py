@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the Peer Benchmarking Engine
+Times build_peer_cohort, calculate_percentile, calculate_adoption_rate and
+generate_peer_comparison across cohort sizes (10 to 1M), records tracemalloc
+peaks, and can run an older implementation side by side to prove both
+equivalence and speedup of an optimization.
+
+Usage:
+    python src/bench_peer_benchmarking.py                          # 10 .. 100k
+    python src/bench_peer_benchmarking.py --sizes 10 1000 1000000
+    python src/bench_peer_benchmarking.py --compare HEAD~1         # old (git ref) vs working tree
+    python src/bench_peer_benchmarking.py --compare old_peer_benchmarking.py --functions calculate_percentile
+"""
+
+import argparse
+import gc
+import json
+import math
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+from pathlib import Path
+
+import duckdb
+
+SRC_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(SRC_DIR / "database"))
+
+import peer_benchmarking  # noqa: E402
+
+
+DEFAULT_SIZES = [10, 100, 1_000, 10_000, 100_000]
+FUNCTIONS = ['calculate_percentile', 'calculate_adoption_rate', 'build_peer_cohort', 'generate_peer_comparison']
+DB_FUNCTIONS = {'build_peer_cohort', 'generate_peer_comparison'}
+
+# Timing budget per (function, size): keep repeating until both are met
+MIN_ROUNDS = 3
+MIN_SECONDS = 0.5
+MAX_ROUNDS = 1_000
+
+TARGET_CLIENT = 'BENCH-TARGET'
+BENCH_DIR = SRC_DIR.parent / 'data' / 'bench'
+
+
+def load_implementation(source: str) -> types.ModuleType:
+    """
+    Load a peer_benchmarking implementation to compare against.
+
+    Args:
+        source: Path to a .py file, or a git ref whose src/peer_benchmarking.py is used
+
+    Returns:
+        Module object exposing the same functions as peer_benchmarking
+    """
+    path = Path(source)
+    if path.suffix == '.py' and path.exists():
+        code, label = path.read_text(), str(path)
+    else:
+        code = subprocess.run(
+            ['git', 'show', f'{source}:src/peer_benchmarking.py'],
+            cwd=SRC_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        label = f'{source}:src/peer_benchmarking.py'
+
+    module = types.ModuleType(f'peer_benchmarking_{abs(hash(label))}')
+    module.__file__ = label
+    exec(compile(code, label, 'exec'), module.__dict__)
+    return module
+
+
+def cohort_database(size: int, seed: int = 42) -> str:
+    """
+    Return a synthetic database whose target client has exactly `size` peers.
+
+    Every plan shares the target's industry and sits inside its ±50% size band,
+    so build_peer_cohort's filters select the whole table minus the target.
+    """
+    from synthetic_data import DATA_VERSION, generate_database
+
+    db_path = BENCH_DIR / f'peer_cohort_{size}_{seed}_v{DATA_VERSION}.db'
+    if db_path.exists():
+        return str(db_path)
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    generate_database(str(db_path), rows=size + 1, seed=seed, audit_per_plan=0)
+    conn = duckdb.connect(str(db_path))
+    conn.execute("""
+        UPDATE plan_designs
+        SET industry = 'healthcare',
+            employee_count = 800 + CAST(hash(client_id) % 400 AS INTEGER)
+    """)
+    conn.execute("""
+        UPDATE plan_designs SET client_id = ?, employee_count = 1000
+        WHERE client_id = (SELECT min(client_id) FROM plan_designs)
+    """, [TARGET_CLIENT])
+    conn.close()
+    return str(db_path)
+
+
+def make_inputs(function: str, size: int, seed: int = 42) -> tuple:
+    """Build positional arguments for one benchmark case."""
+    rng = random.Random(seed)
+    if function == 'calculate_percentile':
+        values = [None if rng.random() < 0.1 else rng.uniform(0.0, 0.1) for _ in range(size)]
+        return (0.05, values)
+    if function == 'calculate_adoption_rate':
+        cohort = [{'auto_enrollment_enabled': rng.random() < 0.6} for _ in range(size)]
+        return ('auto_enrollment_enabled', cohort)
+    return (TARGET_CLIENT, cohort_database(size, seed))
+
+
+def _call(module: types.ModuleType, function: str, args: tuple, conn=None):
+    fn = getattr(module, function)
+    if function in DB_FUNCTIONS:
+        return fn(*args, conn=conn)
+    return fn(*args)
+
+
+def measure(module: types.ModuleType, function: str, args: tuple) -> dict:
+    """
+    Time one function on fixed inputs and record its tracemalloc peak.
+
+    DB functions get a shared read-only connection so connection setup is not
+    part of the measurement. The memory pass runs separately because tracemalloc
+    slows allocation-heavy code considerably.
+
+    Returns:
+        Dictionary with rounds, min/median/mean seconds, ops/sec, peak bytes and the result
+    """
+    conn = duckdb.connect(args[1], read_only=True) if function in DB_FUNCTIONS else None
+    try:
+        result = _call(module, function, args, conn)
+
+        timings = []
+        started = time.perf_counter()
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            while len(timings) < MAX_ROUNDS and (len(timings) < MIN_ROUNDS
+                                                 or time.perf_counter() - started < MIN_SECONDS):
+                t0 = time.perf_counter()
+                _call(module, function, args, conn)
+                timings.append(time.perf_counter() - t0)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        gc.collect()
+        tracemalloc.start()
+        _call(module, function, args, conn)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        if conn is not None:
+            conn.close()
+
+    median = statistics.median(timings)
+    return {
+        'rounds': len(timings),
+        'min_s': min(timings),
+        'median_s': median,
+        'mean_s': statistics.fmean(timings),
+        'ops_per_s': 1 / median if median else math.inf,
+        'peak_bytes': peak,
+        'result': result,
+    }
+
+
+def equivalent(a, b, rel_tol: float = 1e-9) -> bool:
+    """Structural equality with a float tolerance (dicts, lists, numbers, everything else by ==)."""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(equivalent(a[k], b[k], rel_tol) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(equivalent(x, y, rel_tol) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        if a is None or b is None:
+            return a is b
+        return math.isclose(float(a), float(b), rel_tol=rel_tol, abs_tol=1e-12)
+    return a == b
+
+
+def run_benchmarks(functions: list[str], sizes: list[int], compare: str = None, seed: int = 42) -> list[dict]:
+    """
+    Benchmark each (function, size) and optionally an older implementation.
+
+    Returns:
+        List of row dicts; with `compare`, rows also carry baseline timings,
+        speedup (old median / new median) and an `equivalent` flag
+    """
+    old_module = load_implementation(compare) if compare else None
+    rows = []
+
+    for function in functions:
+        for size in sizes:
+            args = make_inputs(function, size, seed)
+            new = measure(peer_benchmarking, function, args)
+            row = {
+                'function': function,
+                'size': size,
+                'median_ms': new['median_s'] * 1000,
+                'ops_per_s': new['ops_per_s'],
+                'peak_kb': new['peak_bytes'] / 1024,
+                'rounds': new['rounds'],
+            }
+            if old_module is not None:
+                old = measure(old_module, function, args)
+                row.update({
+                    'old_median_ms': old['median_s'] * 1000,
+                    'old_peak_kb': old['peak_bytes'] / 1024,
+                    'speedup': old['median_s'] / new['median_s'] if new['median_s'] else math.inf,
+                    'equivalent': equivalent(old['result'], new['result']),
+                })
+            rows.append(row)
+            print_row(row)
+
+    return rows
+
+
+def print_row(row: dict):
+    line = (f"  {row['function']:<26} n={row['size']:>9,}  {row['median_ms']:>11.3f} ms  "
+            f"{row['ops_per_s']:>11,.1f} ops/s  peak {row['peak_kb']:>11,.1f} KB")
+    if 'speedup' in row:
+        mark = "✓" if row['equivalent'] else "❌"
+        line += f"  | old {row['old_median_ms']:>11.3f} ms  {row['speedup']:>6.2f}x  {mark} equivalent"
+    print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Micro-benchmark peer_benchmarking functions')
+    parser.add_argument('--functions', nargs='+', choices=FUNCTIONS, default=FUNCTIONS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--compare', help='Old implementation: git ref or path to a peer_benchmarking.py')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    print("PlanWise Peer Benchmarking - Micro-benchmarks")
+    print("=" * 60)
+    if args.compare:
+        print(f"Comparing working tree against {args.compare}\n")
+
+    rows = run_benchmarks(args.functions, args.sizes, args.compare, args.seed)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2))
+        print(f"\n✓ Results written to {args.json}")
+
+    if args.compare and not all(r['equivalent'] for r in rows):
+        print("\n❌ Old and new implementations disagree")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
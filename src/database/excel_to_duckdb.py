@@ -5,118 +5,117 @@ Loads manually-entered plan data from Excel template into DuckDB database
 """
 
 import duckdb
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 
+from planwise_import import merge_rows
+from validation_rules import (
+    DEFAULT_VALIDATION_RULES,
+    MAX_EXAMPLES,
+    MAX_ROW_RANGES,
+    format_validation_issue,
+    load_validation_rules,
+    range_count,
+    row_ranges,
+)
 
-def validate_data(df: pd.DataFrame) -> tuple[bool, list[str]]:
+
+def validate_data(df: pd.DataFrame, rules: list[dict] = None) -> tuple[bool, list[dict]]:
     """
     Validate data before importing to database.
 
+    Every rule is evaluated as a vectorized boolean mask over the frame (numeric
+    coercion happens once per column), and only counts, collapsed row ranges and
+    a capped number of example values are materialized.
+
+    Args:
+        df: Plan data to validate
+        rules: Rule dictionaries (defaults to DEFAULT_VALIDATION_RULES; see load_validation_rules)
+
     Returns:
-        (is_valid, list_of_errors)
+        (is_valid, list_of_issues) where each issue is a dict with field, rule,
+        count, row_ranges, examples and a formatted message
     """
-    errors = []
-
-    # Required fields
-    required_fields = [
-        'client_id',
-        'client_name',
-        'industry',
-        'employee_count',
-        'auto_enrollment_enabled',
-        'data_source'
-    ]
-
-    # Check required fields are present
-    for field in required_fields:
+    if rules is None:
+        rules = DEFAULT_VALIDATION_RULES
+
+    issues = []
+
+    # Check required columns are present before evaluating any masks
+    for rule in rules:
+        if rule['rule'] == 'required' and rule['field'] not in df.columns:
+            issue = {'field': rule['field'], 'rule': 'missing_column', 'count': 0,
+                     'row_ranges': [], 'examples': []}
+            issue['message'] = format_validation_issue(issue)
+            return False, [issue]
+
+    labels = df.index.to_numpy()
+    null_masks = {}
+    numeric_values = {}
+
+    def is_null(field):
+        if field not in null_masks:
+            null_masks[field] = df[field].isna().to_numpy()
+        return null_masks[field]
+
+    def as_numeric(field):
+        if field not in numeric_values:
+            numeric_values[field] = pd.to_numeric(df[field], errors='coerce').to_numpy(dtype=float)
+        return numeric_values[field]
+
+    for rule in rules:
+        field, kind = rule['field'], rule['rule']
         if field not in df.columns:
-            errors.append(f"Missing required column: {field}")
-            return False, errors
-
-    # Check for missing values in required fields
-    for field in required_fields:
-        missing_count = df[field].isnull().sum()
-        if missing_count > 0:
-            missing_rows = df[df[field].isnull()].index.tolist()
-            errors.append(f"Field '{field}' has {missing_count} missing values in rows: {missing_rows}")
-
-    # Validate client_id uniqueness
-    if df['client_id'].duplicated().any():
-        duplicates = df[df['client_id'].duplicated()]['client_id'].tolist()
-        errors.append(f"Duplicate client_ids found: {duplicates}")
-
-    # Validate industry values
-    valid_industries = ['healthcare', 'higher_ed', 'manufacturing', 'other']
-    invalid_industries = df[~df['industry'].isin(valid_industries)]['industry'].unique()
-    if len(invalid_industries) > 0:
-        errors.append(f"Invalid industry values: {invalid_industries}. Must be one of: {valid_industries}")
-
-    # Validate auto_enrollment_enabled
-    valid_ae_values = ['Yes', 'No', True, False]
-    invalid_ae = df[~df['auto_enrollment_enabled'].isin(valid_ae_values)]['auto_enrollment_enabled'].unique()
-    if len(invalid_ae) > 0:
-        errors.append(f"Invalid auto_enrollment_enabled values: {invalid_ae}. Must be 'Yes' or 'No'")
-
-    # Validate auto_enrollment_rate is present when auto_enrollment_enabled = Yes
-    ae_enabled = df[df['auto_enrollment_enabled'].isin(['Yes', True])]
-    ae_missing_rate = ae_enabled[ae_enabled['auto_enrollment_rate'].isnull()]
-    if not ae_missing_rate.empty:
-        missing_rows = ae_missing_rate.index.tolist()
-        errors.append(f"auto_enrollment_rate is required when auto_enrollment_enabled = Yes. Missing in rows: {missing_rows}")
-
-    # Validate auto_enrollment_effective_year is present when auto_enrollment_enabled = Yes
-    ae_missing_year = ae_enabled[ae_enabled['auto_enrollment_effective_year'].isnull()]
-    if not ae_missing_year.empty:
-        missing_rows = ae_missing_year.index.tolist()
-        errors.append(f"auto_enrollment_effective_year is required when auto_enrollment_enabled = Yes. Missing in rows: {missing_rows}")
-
-    # Validate auto_escalation_cap is present when auto_escalation_enabled = Yes
-    if 'auto_escalation_enabled' in df.columns:
-        aesc_enabled = df[df['auto_escalation_enabled'].isin(['Yes', True])]
-        if 'auto_escalation_cap' in df.columns:
-            aesc_missing_cap = aesc_enabled[aesc_enabled['auto_escalation_cap'].isnull()]
-            if not aesc_missing_cap.empty:
-                missing_rows = aesc_missing_cap.index.tolist()
-                errors.append(f"auto_escalation_cap is required when auto_escalation_enabled = Yes. Missing in rows: {missing_rows}")
-
-    # Validate numeric fields are numeric
-    numeric_fields = [
-        'employee_count',
-        'match_effective_rate',
-        'auto_enrollment_rate',
-        'auto_enrollment_effective_year',
-        'auto_escalation_cap'
-    ]
-
-    for field in numeric_fields:
-        if field in df.columns:
-            # Try to convert to numeric, see if any fail
-            try:
-                pd.to_numeric(df[field], errors='coerce')
-                invalid_count = df[field].notna() & pd.to_numeric(df[field], errors='coerce').isna()
-                if invalid_count.any():
-                    invalid_rows = df[invalid_count].index.tolist()
-                    errors.append(f"Field '{field}' contains non-numeric values in rows: {invalid_rows}")
-            except Exception as e:
-                errors.append(f"Error validating numeric field '{field}': {e}")
-
-    # Check for negative values in numeric fields (should be positive)
-    positive_fields = ['employee_count', 'match_effective_rate', 'auto_enrollment_rate',
-                      'auto_escalation_cap']
-
-    for field in positive_fields:
-        if field in df.columns:
-            # Convert to numeric first, then check for negatives (ignoring NaN)
-            numeric_values = pd.to_numeric(df[field], errors='coerce')
-            negative_mask = (numeric_values < 0) & (numeric_values.notna())
-            if negative_mask.any():
-                negative_rows = df[negative_mask].index.tolist()
-                errors.append(f"Field '{field}' contains negative values in rows: {negative_rows}")
-
-    is_valid = len(errors) == 0
-    return is_valid, errors
+            continue
+
+        if kind == 'required':
+            mask = is_null(field)
+        elif kind == 'unique':
+            mask = df[field].duplicated().to_numpy() & ~is_null(field)
+        elif kind == 'enum':
+            mask = ~df[field].isin(rule['allowed']).to_numpy() & ~is_null(field)
+        elif kind == 'required_if':
+            condition_field, condition_values = rule['when']
+            if condition_field not in df.columns:
+                continue
+            mask = df[condition_field].isin(condition_values).to_numpy() & is_null(field)
+        elif kind == 'numeric':
+            mask = ~is_null(field) & np.isnan(as_numeric(field))
+        elif kind in ('min', 'max'):
+            values = as_numeric(field)
+            with np.errstate(invalid='ignore'):
+                mask = values < rule['value'] if kind == 'min' else values > rule['value']
+        else:
+            continue
+
+        count = int(mask.sum())
+        if count == 0:
+            continue
+
+        offending = np.sort(labels[mask]) if np.issubdtype(labels.dtype, np.integer) else None
+        ranges = row_ranges(offending) if offending is not None else []
+        examples = []
+        if kind not in ('required', 'required_if'):
+            examples = pd.unique(df[field].to_numpy()[mask][:MAX_EXAMPLES * 4])[:MAX_EXAMPLES].tolist()
+
+        issue = {
+            'field': field,
+            'rule': kind,
+            'count': count,
+            'row_ranges': ranges,
+            'ranges_truncated': offending is not None and range_count(offending) > MAX_ROW_RANGES,
+            'examples': examples,
+        }
+        for key in ('allowed', 'value', 'when'):
+            if key in rule:
+                issue[key] = rule[key]
+        issue['message'] = format_validation_issue(issue)
+        issues.append(issue)
+
+    is_valid = len(issues) == 0
+    return is_valid, issues
 
 
 def import_excel_to_duckdb(
@@ -174,12 +173,18 @@ def import_excel_to_duckdb(
 
     # Validate data
     print("\nValidating data...")
-    is_valid, errors = validate_data(df)
+    rules_conn = duckdb.connect(str(db_path), read_only=True)
+    try:
+        rules = load_validation_rules(rules_conn)
+    finally:
+        rules_conn.close()
+
+    is_valid, issues = validate_data(df, rules)
 
     if not is_valid:
         print("❌ Data validation failed:")
-        for error in errors:
-            print(f"   • {error}")
+        for issue in issues:
+            print(f"   • {issue['message']}")
         return False
 
     print("✓ Data validation passed")
@@ -243,80 +248,56 @@ def import_excel_to_duckdb(
     print(f"✓ Current records in database: {current_count}")
 
     # Option to clear existing data
+    mode = 'upsert'
     if current_count > 0:
         print(f"\n⚠️  Database contains {current_count} existing records")
         print("   Options:")
-        print("   1. Replace all (DELETE existing + INSERT new)")
+        print("   1. Replace all (sync to this file: insert/update changed rows, delete missing ones)")
         print("   2. Append new (INSERT new records, skip duplicates)")
         print("   3. Cancel import")
+        print("   4. Update (insert new records, update only rows that changed)")
 
-        choice = input("\nEnter choice (1/2/3): ").strip()
+        choice = input("\nEnter choice (1/2/3/4): ").strip()
 
         if choice == '1':
-            print("Deleting existing records...")
-            conn.execute("DELETE FROM plan_designs")
-            print("✓ Existing records deleted")
+            mode = 'replace'
         elif choice == '2':
-            print("Will append new records (skip duplicates)")
-            # Filter out duplicate client_ids
-            existing_ids = conn.execute("SELECT client_id FROM plan_designs").fetchdf()['client_id'].tolist()
-            df_original_count = len(df)
-            df = df[~df['client_id'].isin(existing_ids)]
-            skipped = df_original_count - len(df)
-            if skipped > 0:
-                print(f"✓ Skipping {skipped} duplicate client_ids")
-            if len(df) == 0:
-                print("❌ No new records to import (all client_ids already exist)")
-                conn.close()
-                return False
+            mode = 'append'
         elif choice == '3':
             print("Import cancelled")
             conn.close()
             return False
+        elif choice == '4':
+            mode = 'upsert'
         else:
             print("Invalid choice. Import cancelled.")
             conn.close()
             return False
 
-    # Insert data
-    print(f"\nInserting {len(df)} records...")
+    # Merge data (only rows whose fingerprint changed are written)
+    print(f"\nMerging {len(df)} records ({mode})...")
     try:
         # Register DataFrame as temporary view
         conn.register('df_import', df)
 
-        # Insert from DataFrame with explicit column mapping
-        conn.execute("""
-            INSERT INTO plan_designs (
-                client_id, client_name, industry, employee_count, state,
-                eligibility, match_formula, match_effective_rate, match_eligibility_criteria,
-                match_last_day_work_rule, match_true_up, match_contribution_frequency,
-                nonelective_formula, nonelective_eligibility_criteria,
-                nonelective_last_day_work_rule, nonelective_contribution_frequency,
-                auto_enrollment_enabled, auto_enrollment_rate, auto_enrollment_effective_year,
-                auto_escalation_enabled, auto_escalation_cap, vesting_schedule,
-                data_source, last_updated, notes
-            )
-            SELECT
-                client_id, client_name, industry, employee_count, state,
-                eligibility, match_formula, match_effective_rate, match_eligibility_criteria,
-                match_last_day_work_rule, match_true_up, match_contribution_frequency,
-                nonelective_formula, nonelective_eligibility_criteria,
-                nonelective_last_day_work_rule, nonelective_contribution_frequency,
-                auto_enrollment_enabled, auto_enrollment_rate, auto_enrollment_effective_year,
-                auto_escalation_enabled, auto_escalation_cap, vesting_schedule,
-                data_source, last_updated, notes
-            FROM df_import
-        """)
-
-        # Verify insertion
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            summary = merge_rows(conn, 'df_import', mode, updated_by='excel-import', source=excel_file.name)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
         new_count = conn.execute("SELECT COUNT(*) FROM plan_designs").fetchone()[0]
-        inserted = new_count - current_count
 
-        print(f"✓ Successfully inserted {inserted} records")
+        print(f"✓ Inserted {summary['inserted']}, updated {summary['updated']}, "
+              f"deleted {summary['deleted']}, unchanged {summary['unchanged']}, skipped {summary['skipped']}")
+        for field, count in sorted(summary['field_changes'].items()):
+            print(f"   • {field}: {count} changed")
         print(f"✓ Total records in database: {new_count}")
 
     except Exception as e:
-        print(f"❌ Insert failed: {e}")
+        print(f"❌ Import failed: {e}")
         conn.close()
         return False
 
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Parallel Multi-File Import Orchestrator
+Parses and validates many regional workbooks/extracts concurrently in a process
+pool, lands each one in its own staging table, and commits them all to
+plan_designs in a single transaction (all files or none).
+
+Usage:
+    python import_orchestrator.py data/incoming/*.xlsx --db data/planwise.db --workers 8
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import duckdb
+
+from planwise_import import (
+    IMPORT_MODES,
+    STAGING_TABLE,
+    merge_rows,
+    stage_file,
+    staged_columns,
+    transform_select_sql,
+    validate_staging,
+)
+from validation_rules import load_validation_rules
+
+
+EXCEL_SUFFIXES = ('.xlsx', '.xlsm', '.xls')
+
+
+def _stage_excel(conn, path: str, sheet_name: str = 'Plan Data', skip_rows: list = [1, 2]) -> int:
+    """Read an Excel template into the staging table (pandas is only needed for .xlsx)."""
+    import pandas as pd
+
+    df = pd.read_excel(path, sheet_name=sheet_name, skiprows=skip_rows)
+    df = df.dropna(how='all').reset_index(drop=True)
+    conn.register('excel_rows', df)
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE {STAGING_TABLE} AS
+        SELECT (row_number() OVER ()) - 1 AS _row, * FROM excel_rows
+    """)
+    conn.unregister('excel_rows')
+    return len(df)
+
+
+def prepare_file(index: int, path: str, rules: list[dict], work_dir: str) -> dict:
+    """
+    Worker: parse, validate and transform one file into a Parquet staging file.
+
+    Runs in a child process against a private in-memory DuckDB, so workers never
+    contend for the target database.
+
+    Returns:
+        Per-file diagnostics (rows, issues, timings, staged parquet path)
+    """
+    started = time.perf_counter()
+    result = {
+        'index': index,
+        'file': path,
+        'success': False,
+        'rows': 0,
+        'issues': [],
+        'staged_path': None,
+        'worker_pid': os.getpid(),
+    }
+
+    conn = duckdb.connect(':memory:')
+    try:
+        if Path(path).suffix.lower() in EXCEL_SUFFIXES:
+            result['rows'] = _stage_excel(conn, path)
+        else:
+            result['rows'] = stage_file(conn, path)
+        result['parse_seconds'] = time.perf_counter() - started
+
+        is_valid, issues = validate_staging(conn, rules)
+        result['issues'] = issues
+        result['validate_seconds'] = time.perf_counter() - started - result['parse_seconds']
+        if not is_valid:
+            result['error'] = "Data validation failed"
+            return result
+
+        staged_path = str(Path(work_dir) / f"staging_{index:04d}.parquet")
+        transform = transform_select_sql(set(staged_columns(conn)))
+        conn.execute(f"COPY ({transform}) TO '{staged_path}' (FORMAT PARQUET)")
+        result['staged_path'] = staged_path
+        result['success'] = True
+
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+
+    finally:
+        conn.close()
+        result['seconds'] = time.perf_counter() - started
+
+    return result
+
+
+def _cross_file_duplicates(conn, tables: list[str], files: list[str]) -> list[dict]:
+    """Find client_ids that appear in more than one file."""
+    union = ' UNION ALL '.join(
+        f"SELECT client_id, {i} AS file_index FROM {table}" for i, table in enumerate(tables)
+    )
+    rows = conn.execute(f"""
+        SELECT client_id, list(DISTINCT file_index ORDER BY file_index)
+        FROM ({union})
+        GROUP BY client_id
+        HAVING COUNT(DISTINCT file_index) > 1
+        ORDER BY client_id
+        LIMIT 20
+    """).fetchall()
+    return [{'client_id': cid, 'files': [files[i] for i in idx]} for cid, idx in rows]
+
+
+def import_files(
+    paths: list[str],
+    db_path: str = 'data/planwise.db',
+    mode: str = 'upsert',
+    workers: int = None,
+    dry_run: bool = False
+) -> dict:
+    """
+    Import many files: parallel parse/validate, per-file staging, one atomic commit.
+
+    Nothing is written to plan_designs unless every file validates and no
+    client_id appears in more than one file.
+
+    Args:
+        paths: CSV, Parquet or Excel files
+        db_path: Path to DuckDB database
+        mode: Merge mode (upsert, append or replace)
+        workers: Process pool size (defaults to min(files, CPUs))
+        dry_run: Parse and validate only
+
+    Returns:
+        Dictionary with success flag, per-file diagnostics, merge summary and throughput
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode: {mode}")
+    if not Path(db_path).exists():
+        raise FileNotFoundError(f"Database not found: {db_path} (run setup_database.py first)")
+
+    started = time.perf_counter()
+    workers = workers or max(1, min(len(paths), os.cpu_count() or 1))
+
+    rules_conn = duckdb.connect(str(db_path), read_only=True)
+    try:
+        rules = load_validation_rules(rules_conn)
+    finally:
+        rules_conn.close()
+
+    work_dir = tempfile.mkdtemp(prefix='planwise_import_')
+    report = {'success': False, 'files': [], 'summary': None, 'workers': workers}
+
+    try:
+        # Phase 1: parse + validate + transform concurrently
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(prepare_file, i, path, rules, work_dir) for i, path in enumerate(paths)]
+            results = [future.result() for future in as_completed(futures)]
+        results.sort(key=lambda r: r['index'])
+        report['files'] = results
+        report['prepare_seconds'] = time.perf_counter() - started
+
+        total_rows = sum(r['rows'] for r in results)
+        report['total_rows'] = total_rows
+
+        failed = [r for r in results if not r['success']]
+        if failed:
+            report['error'] = f"{len(failed)} of {len(paths)} files failed; nothing committed"
+            return report
+
+        if dry_run:
+            report['success'] = True
+            return report
+
+        # Phase 2: land per-file staging tables, then swap into plan_designs atomically
+        commit_started = time.perf_counter()
+        conn = duckdb.connect(str(db_path))
+        tables = [f"staging_import_{r['index']:04d}" for r in results]
+        try:
+            for table, r in zip(tables, results):
+                conn.execute(f"CREATE OR REPLACE TEMP TABLE {table} AS SELECT * FROM read_parquet('{r['staged_path']}')")
+
+            duplicates = _cross_file_duplicates(conn, tables, paths)
+            if duplicates:
+                report['error'] = "client_ids appear in more than one file; nothing committed"
+                report['cross_file_duplicates'] = duplicates
+                return report
+
+            conn.execute(
+                f"CREATE OR REPLACE TEMP VIEW {STAGING_TABLE}_all AS "
+                + ' UNION ALL '.join(f"SELECT * FROM {table}" for table in tables)
+            )
+
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                source = f"batch of {len(paths)} files"
+                report['summary'] = merge_rows(conn, f"{STAGING_TABLE}_all", mode, source=source)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+        report['commit_seconds'] = time.perf_counter() - commit_started
+        report['success'] = True
+        return report
+
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        report['total_seconds'] = time.perf_counter() - started
+        rows = report.get('total_rows', 0)
+        report['rows_per_second'] = rows / report['total_seconds'] if report['total_seconds'] else 0.0
+
+
+def print_report(report: dict):
+    """Print per-file diagnostics and end-to-end throughput."""
+    print(f"\nPer-file diagnostics ({report['workers']} workers):")
+    for r in report['files']:
+        status = "✓" if r['success'] else "❌"
+        timing = f"parse {r.get('parse_seconds', 0):.2f}s, validate {r.get('validate_seconds', 0):.2f}s"
+        print(f"  {status} {Path(r['file']).name}: {r['rows']:,} rows ({timing}, pid {r['worker_pid']})")
+        if not r['success']:
+            print(f"     {r.get('error', 'failed')}")
+            for issue in r['issues']:
+                print(f"     • {issue['message']}")
+
+    for dup in report.get('cross_file_duplicates', []):
+        print(f"  ❌ client_id {dup['client_id']} in: {', '.join(Path(f).name for f in dup['files'])}")
+
+    if report.get('summary'):
+        s = report['summary']
+        print(f"\n✓ Committed: {s['inserted']} inserted, {s['updated']} updated, "
+              f"{s['deleted']} deleted, {s['unchanged']} unchanged, {s['skipped']} skipped")
+
+    print(f"\nThroughput: {report.get('total_rows', 0):,} rows in {report['total_seconds']:.2f}s "
+          f"({report['rows_per_second']:,.0f} rows/sec)")
+    if 'prepare_seconds' in report:
+        print(f"  Parse/validate phase: {report['prepare_seconds']:.2f}s")
+    if 'commit_seconds' in report:
+        print(f"  Staging + commit phase: {report['commit_seconds']:.2f}s")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Import many plan data files in parallel with one atomic commit')
+    parser.add_argument('files', nargs='+', help='Excel, CSV or Parquet files')
+    parser.add_argument('--db', default='data/planwise.db', help='DuckDB database path')
+    parser.add_argument('--mode', choices=IMPORT_MODES, default='upsert')
+    parser.add_argument('--workers', type=int, default=None, help='Process pool size')
+    parser.add_argument('--dry-run', action='store_true', help='Parse and validate only')
+    args = parser.parse_args(argv)
+
+    print("PlanWise Design Matrix - Parallel Import")
+    print("=" * 60)
+
+    report = import_files(args.files, args.db, args.mode, args.workers, args.dry_run)
+    print_report(report)
+
+    if not report['success']:
+        print(f"\n❌ {report.get('error', 'Import failed')}")
+        return 1
+
+    print("\n✓ Import complete!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Plan Formula Parser
+Turns free-text match formulas and vesting schedules into structured, typed
+plan_designs columns once (at import/update time) so benchmarks are plain
+numeric aggregates instead of per-request string parsing.
+
+Derived columns:
+    match_tiers         STRUCT(rate, up_to)[]  e.g. "100% of first 3%, 50% of next 2%"
+                                               -> [{rate: 1.0, up_to: 0.03}, {rate: 0.5, up_to: 0.05}]
+    match_max_rate      employer match at full deferral (0.04 for the example above)
+    match_deferral_cap  deferral needed to earn the full match (0.05)
+    vesting_type        'immediate', 'cliff' or 'graded'
+    vesting_years       years to full vesting (0 for immediate)
+
+Usage:
+    python plan_formulas.py --db data/planwise.db      # add columns and backfill
+"""
+
+import argparse
+import re
+import sys
+from typing import Optional
+
+import duckdb
+
+
+# Graded schedules without an explicit length are treated as the common 2-6 graded
+DEFAULT_GRADED_YEARS = 6.0
+
+# Free-text columns the derived columns are computed from
+FORMULA_SOURCE_FIELDS = ('match_formula', 'vesting_schedule')
+
+# DOUBLE rather than DECIMAL: DuckDB converts DECIMALs nested in lists element by element,
+# which made every SELECT * row fetch several milliseconds slower
+TIERS_TYPE = "STRUCT(rate DOUBLE, up_to DOUBLE)[]"
+FORMULA_COLUMNS = {
+    'match_tiers': TIERS_TYPE,
+    'match_max_rate': 'DECIMAL(6,4)',
+    'match_deferral_cap': 'DECIMAL(6,4)',
+    'vesting_type': 'VARCHAR',
+    'vesting_years': 'DECIMAL(4,1)',
+}
+
+# "<rate>% [match] [of|on] [employee deferrals] up to|first|next <cap>%"
+_TIER_PATTERN = re.compile(
+    r"(?P<rate>\d+(?:\.\d+)?)\s*%\s*(?:match\s+)?(?:of|on)?\s*"
+    r"(?:(?:employee\s+)?(?:deferrals?|contributions?|salary\s+deferrals?)\s+)?"
+    r"(?:up\s+to|(?:the\s+)?(?P<kind>first|next))\s*(?P<cap>\d+(?:\.\d+)?)\s*%",
+    re.IGNORECASE,
+)
+_YEARS_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*[- ]?\s*(?:year|yr)", re.IGNORECASE)
+_RANGE_PATTERN = re.compile(r"(\d+)\s*-\s*(\d+)")
+
+
+def parse_match_formula(formula: Optional[str]) -> Optional[dict]:
+    """
+    Parse a match formula into cumulative tiers.
+
+    Args:
+        formula: Free text such as "100% up to 3%", "50% up to 6%" or
+            "100% of first 3%, 50% of next 2%"
+
+    Returns:
+        Dictionary with tiers (list of {rate, up_to} fractions, up_to cumulative),
+        max_rate and deferral_cap; None when the text has no recognisable tier
+    """
+    if not formula:
+        return None
+    text = re.sub(r"dollar[- ]for[- ]dollar", "100%", str(formula), flags=re.IGNORECASE)
+
+    tiers = []
+    covered = 0.0
+    for match in _TIER_PATTERN.finditer(text):
+        rate = float(match.group('rate')) / 100
+        cap = float(match.group('cap')) / 100
+        up_to = covered + cap if (match.group('kind') or '').lower() == 'next' else cap
+        if up_to <= covered:
+            continue
+        tiers.append({'rate': round(rate, 4), 'up_to': round(up_to, 4)})
+        covered = up_to
+
+    if not tiers:
+        return None
+
+    max_rate, previous = 0.0, 0.0
+    for tier in tiers:
+        max_rate += tier['rate'] * (tier['up_to'] - previous)
+        previous = tier['up_to']
+
+    return {'tiers': tiers, 'max_rate': round(max_rate, 4), 'deferral_cap': tiers[-1]['up_to']}
+
+
+def parse_vesting_schedule(schedule: Optional[str]) -> Optional[dict]:
+    """
+    Parse a vesting schedule into a type and years to full vesting.
+
+    Args:
+        schedule: Free text such as "Immediate", "3-year cliff", "2-6 graded" or "Graded"
+
+    Returns:
+        Dictionary with type and years; None when the text is not recognised
+    """
+    if not schedule:
+        return None
+    text = str(schedule).strip().lower()
+
+    if 'immediate' in text or text in ('100%', 'full', 'fully vested'):
+        return {'type': 'immediate', 'years': 0.0}
+
+    if 'grad' in text:
+        span = _RANGE_PATTERN.search(text)
+        years = _YEARS_PATTERN.search(text)
+        if span:
+            value = float(span.group(2))
+        elif years:
+            value = float(years.group(1))
+        else:
+            value = DEFAULT_GRADED_YEARS
+        return {'type': 'graded', 'years': value}
+
+    if 'cliff' in text:
+        years = _YEARS_PATTERN.search(text) or re.search(r"(\d+(?:\.\d+)?)", text)
+        if years:
+            return {'type': 'cliff', 'years': float(years.group(1))}
+
+    return None
+
+
+def ensure_plan_formula_columns(conn):
+    """
+    Add the derived formula columns to plan_designs if missing.
+
+    No ART indexes: benchmark queries aggregate over whole cohorts, where DuckDB's
+    per-segment min/max zonemaps already prune range filters, while an index on a
+    column turns every UPDATE of it into a delete + insert (~4ms per PATCH).
+    """
+    for column, column_type in FORMULA_COLUMNS.items():
+        conn.execute(f"ALTER TABLE plan_designs ADD COLUMN IF NOT EXISTS {column} {column_type}")
+
+
+def refresh_plan_formulas(conn, where: str = None, params: list = None) -> int:
+    """
+    Recompute derived formula columns for plan_designs rows.
+
+    Each distinct formula/schedule string is parsed once in Python; rows are then
+    updated set-based from the resulting lookup tables.
+
+    Args:
+        conn: Writable DuckDB connection
+        where: Optional SQL condition limiting the rows refreshed (e.g. "client_id = ?")
+        params: Parameters for `where`
+
+    Returns:
+        Number of rows refreshed
+    """
+    ensure_plan_formula_columns(conn)
+    condition = f"WHERE {where}" if where else ""
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE formula_targets AS
+        SELECT client_id, match_formula, vesting_schedule FROM plan_designs {condition}
+    """, params or [])
+
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE parsed_match_formulas (
+            match_formula VARCHAR, match_tiers {TIERS_TYPE},
+            match_max_rate DECIMAL(6,4), match_deferral_cap DECIMAL(6,4)
+        )
+    """)
+    conn.execute("""
+        CREATE OR REPLACE TEMP TABLE parsed_vesting_schedules (
+            vesting_schedule VARCHAR, vesting_type VARCHAR, vesting_years DECIMAL(4,1)
+        )
+    """)
+
+    match_rows = []
+    for (formula,) in conn.execute(
+        "SELECT DISTINCT match_formula FROM formula_targets WHERE match_formula IS NOT NULL"
+    ).fetchall():
+        parsed = parse_match_formula(formula)
+        if parsed:
+            match_rows.append((formula, parsed['tiers'], parsed['max_rate'], parsed['deferral_cap']))
+    vesting_rows = []
+    for (schedule,) in conn.execute(
+        "SELECT DISTINCT vesting_schedule FROM formula_targets WHERE vesting_schedule IS NOT NULL"
+    ).fetchall():
+        parsed = parse_vesting_schedule(schedule)
+        if parsed:
+            vesting_rows.append((schedule, parsed['type'], parsed['years']))
+
+    if match_rows:
+        conn.executemany("INSERT INTO parsed_match_formulas VALUES (?, ?, ?, ?)", match_rows)
+    if vesting_rows:
+        conn.executemany("INSERT INTO parsed_vesting_schedules VALUES (?, ?, ?)", vesting_rows)
+
+    conn.execute("""
+        UPDATE plan_designs SET
+            match_tiers = m.match_tiers,
+            match_max_rate = m.match_max_rate,
+            match_deferral_cap = m.match_deferral_cap,
+            vesting_type = v.vesting_type,
+            vesting_years = v.vesting_years
+        FROM formula_targets t
+        LEFT JOIN parsed_match_formulas m ON m.match_formula = t.match_formula
+        LEFT JOIN parsed_vesting_schedules v ON v.vesting_schedule = t.vesting_schedule
+        WHERE plan_designs.client_id = t.client_id
+    """)
+    return conn.execute("SELECT COUNT(*) FROM formula_targets").fetchone()[0]
+
+
+def refresh_client_formulas(conn, client_id: str) -> bool:
+    """
+    Recompute derived formula columns for a single plan.
+
+    The per-request path for PATCH/PUT: one read plus an UPDATE of only the
+    derived columns whose value actually changed, so editing the vesting schedule
+    does not rewrite match_tiers (every rewritten column segment adds to the
+    checkpoint DuckDB runs when the write connection closes).
+
+    Returns:
+        True if the plan exists
+    """
+    row = conn.execute("""
+        SELECT match_formula, vesting_schedule, match_tiers,
+               CAST(match_max_rate AS DOUBLE), CAST(match_deferral_cap AS DOUBLE),
+               vesting_type, CAST(vesting_years AS DOUBLE)
+        FROM plan_designs WHERE client_id = ?
+    """, [client_id]).fetchone()
+    if row is None:
+        return False
+
+    match = parse_match_formula(row[0]) or {}
+    vesting = parse_vesting_schedule(row[1]) or {}
+    derived = {
+        'match_tiers': match.get('tiers'),
+        'match_max_rate': match.get('max_rate'),
+        'match_deferral_cap': match.get('deferral_cap'),
+        'vesting_type': vesting.get('type'),
+        'vesting_years': vesting.get('years'),
+    }
+    changed = {column: value for (column, value), current in zip(derived.items(), row[2:]) if value != current}
+    if changed:
+        assignments = ", ".join(
+            f"{column} = ?::{TIERS_TYPE}" if column == 'match_tiers' else f"{column} = ?" for column in changed
+        )
+        conn.execute(f"UPDATE plan_designs SET {assignments} WHERE client_id = ?", [*changed.values(), client_id])
+    return True
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Parse match formulas and vesting schedules into derived columns')
+    parser.add_argument('--db', default='data/planwise.db', help='DuckDB database path')
+    args = parser.parse_args(argv)
+
+    conn = duckdb.connect(args.db)
+    try:
+        refreshed = refresh_plan_formulas(conn)
+        unparsed = conn.execute("""
+            SELECT
+                COUNT(*) FILTER (WHERE match_formula IS NOT NULL AND match_tiers IS NULL),
+                COUNT(*) FILTER (WHERE vesting_schedule IS NOT NULL AND vesting_years IS NULL)
+            FROM plan_designs
+        """).fetchone()
+    finally:
+        conn.close()
+
+    print(f"✓ Parsed formulas for {refreshed:,} plans")
+    if any(unparsed):
+        print(f"⚠️  Unrecognised: {unparsed[0]:,} match formulas, {unparsed[1]:,} vesting schedules")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+"""
+planwise-import: CSV/Parquet Bulk Import
+Loads recordkeeper extracts straight into DuckDB, validates and transforms them
+in SQL, then merges the result into plan_designs (no pandas in the hot path).
+
+Usage:
+    python planwise_import.py extract.csv --db data/planwise.db --mode upsert
+    python planwise_import.py extract.parquet --mode replace --dry-run
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import duckdb
+
+from plan_formulas import refresh_plan_formulas
+from validation_rules import (
+    MAX_EXAMPLES,
+    MAX_ROW_RANGES,
+    format_validation_issue,
+    load_validation_rules,
+    range_count,
+    row_ranges,
+    rule_predicate_sql,
+)
+
+
+STAGING_TABLE = 'staging_plan_designs'
+
+# Columns written to plan_designs, in insert order
+PLAN_DESIGN_COLUMNS = [
+    'client_id', 'client_name', 'industry', 'employee_count', 'state',
+    'eligibility', 'match_formula', 'match_effective_rate', 'match_eligibility_criteria',
+    'match_last_day_work_rule', 'match_true_up', 'match_contribution_frequency',
+    'nonelective_formula', 'nonelective_eligibility_criteria',
+    'nonelective_last_day_work_rule', 'nonelective_contribution_frequency',
+    'auto_enrollment_enabled', 'auto_enrollment_rate', 'auto_enrollment_effective_year',
+    'auto_escalation_enabled', 'auto_escalation_cap', 'vesting_schedule',
+    'data_source', 'last_updated', 'notes',
+]
+
+BOOLEAN_FIELDS = [
+    'auto_enrollment_enabled',
+    'auto_escalation_enabled',
+    'match_last_day_work_rule',
+    'match_true_up',
+    'nonelective_last_day_work_rule',
+]
+
+# Numeric targets cast explicitly so CSV text columns land with the right types
+NUMERIC_CASTS = {
+    'employee_count': 'INTEGER',
+    'match_effective_rate': 'DECIMAL(5,2)',
+    'auto_enrollment_rate': 'DECIMAL(5,2)',
+    'auto_enrollment_effective_year': 'INTEGER',
+    'auto_escalation_cap': 'DECIMAL(5,2)',
+}
+
+IMPORT_MODES = ('upsert', 'append', 'replace')
+
+# Fields hashed into row_fingerprint. Metadata (data_source, last_updated) is
+# excluded so re-importing identical plan provisions is a no-op.
+FINGERPRINT_FIELDS = [c for c in PLAN_DESIGN_COLUMNS if c not in ('client_id', 'data_source', 'last_updated')]
+
+
+def _sql_string(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def detect_format(path: str) -> str:
+    """Infer 'csv' or 'parquet' from the file extension."""
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.parquet', '.pq'):
+        return 'parquet'
+    if suffix in ('.csv', '.txt', '.tsv', '.gz'):
+        return 'csv'
+    raise ValueError(f"Cannot infer file format from '{path}' (use --format)")
+
+
+def stage_file(conn, path: str, file_format: str = None, staging_table: str = STAGING_TABLE) -> int:
+    """
+    Load a CSV or Parquet file into a staging table using DuckDB's native readers.
+
+    A zero-based `_row` column is added so validation can point at source rows.
+
+    Args:
+        conn: DuckDB connection
+        path: Source file path
+        file_format: 'csv' or 'parquet' (inferred from the extension when omitted)
+        staging_table: Name of the (temporary) staging table to create
+
+    Returns:
+        Number of staged rows
+    """
+    file_format = file_format or detect_format(path)
+    if file_format == 'csv':
+        reader = f"read_csv_auto({_sql_string(path)}, header = true)"
+    elif file_format == 'parquet':
+        reader = f"read_parquet({_sql_string(path)})"
+    else:
+        raise ValueError(f"Unsupported format: {file_format}")
+
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE {staging_table} AS
+        SELECT (row_number() OVER ()) - 1 AS _row, *
+        FROM {reader}
+    """)
+
+    return conn.execute(f"SELECT COUNT(*) FROM {staging_table}").fetchone()[0]
+
+
+def staged_columns(conn, staging_table: str = STAGING_TABLE) -> list[str]:
+    """Column names of the staging table."""
+    return [row[0] for row in conn.execute(f"DESCRIBE {staging_table}").fetchall()]
+
+
+def validate_staging(conn, rules: list[dict], staging_table: str = STAGING_TABLE) -> tuple[bool, list[dict]]:
+    """
+    Validate a staging table in SQL, producing the same report shape as validate_data.
+
+    All rule counts are computed in a single aggregate scan; offending row
+    numbers and example values are only fetched (and capped) for failing rules.
+
+    Args:
+        conn: DuckDB connection
+        rules: Rule dictionaries (see validation_rules.load_validation_rules)
+        staging_table: Staging table to validate
+
+    Returns:
+        (is_valid, list_of_issues)
+    """
+    columns = set(staged_columns(conn, staging_table))
+
+    for rule in rules:
+        if rule['rule'] == 'required' and rule['field'] not in columns:
+            issue = {'field': rule['field'], 'rule': 'missing_column', 'count': 0,
+                     'row_ranges': [], 'examples': []}
+            issue['message'] = format_validation_issue(issue)
+            return False, [issue]
+
+    applicable = []
+    for rule in rules:
+        if rule['field'] not in columns:
+            continue
+        if rule['rule'] == 'required_if' and rule['when'][0] not in columns:
+            continue
+        predicate = rule_predicate_sql(rule)
+        if predicate is not None:
+            applicable.append((rule, predicate))
+
+    if not applicable:
+        return True, []
+
+    # Duplicate counters for unique rules, computed once as window columns
+    unique_fields = sorted({rule['field'] for rule, _ in applicable if rule['rule'] == 'unique'})
+    dup_columns = ''.join(
+        f', COUNT(*) OVER (PARTITION BY "{field}") AS "_dup_{field}"'
+        f', row_number() OVER (PARTITION BY "{field}" ORDER BY _row) AS "_dup_rank_{field}"'
+        for field in unique_fields
+    )
+    source = f"(SELECT *{dup_columns} FROM {staging_table})"
+
+    # Like pandas duplicated(), only the second and later occurrences are flagged
+    def offending(rule, predicate):
+        if rule['rule'] == 'unique':
+            return f'{predicate} AND "_dup_rank_{rule["field"]}" > 1'
+        return predicate
+
+    counts = conn.execute(
+        "SELECT " + ', '.join(
+            f"COUNT(*) FILTER (WHERE {offending(rule, predicate)})" for rule, predicate in applicable
+        ) + f" FROM {source}"
+    ).fetchone()
+
+    issues = []
+    for (rule, predicate), count in zip(applicable, counts):
+        if not count:
+            continue
+        where = offending(rule, predicate)
+
+        # Enough leading rows to fill MAX_ROW_RANGES ranges in the common case
+        rows = [r[0] for r in conn.execute(
+            f"SELECT _row FROM {source} WHERE {where} ORDER BY _row LIMIT {MAX_ROW_RANGES * 100}"
+        ).fetchall()]
+        ranges = row_ranges(rows)
+
+        examples = []
+        if rule['rule'] not in ('required', 'required_if'):
+            examples = [r[0] for r in conn.execute(
+                f'SELECT DISTINCT "{rule["field"]}" FROM {source} WHERE {where} LIMIT {MAX_EXAMPLES}'
+            ).fetchall()]
+
+        issue = {
+            'field': rule['field'],
+            'rule': rule['rule'],
+            'count': int(count),
+            'row_ranges': ranges,
+            'ranges_truncated': range_count(rows) > MAX_ROW_RANGES or len(rows) < count,
+            'examples': examples,
+        }
+        for key in ('allowed', 'value', 'when'):
+            if key in rule:
+                issue[key] = rule[key]
+        issue['message'] = format_validation_issue(issue)
+        issues.append(issue)
+
+    return len(issues) == 0, issues
+
+
+def transform_select_sql(columns: set, staging_table: str = STAGING_TABLE) -> str:
+    """
+    Build the SELECT that turns staged rows into plan_designs rows.
+
+    Mirrors the Excel import transformations: Yes/No booleans, NULL-ing AE rate/year
+    when auto-enrollment is off, NULL-ing escalation cap when escalation is off,
+    integer casts, a default data_source and a fresh last_updated timestamp.
+    """
+    def boolean_expr(field):
+        if field not in columns:
+            return 'NULL'
+        return (
+            f'CASE lower(CAST("{field}" AS VARCHAR)) '
+            f"WHEN 'yes' THEN TRUE WHEN 'true' THEN TRUE "
+            f"WHEN 'no' THEN FALSE WHEN 'false' THEN FALSE END"
+        )
+
+    def value_expr(field):
+        if field not in columns:
+            return 'NULL'
+        if field in NUMERIC_CASTS:
+            return f'TRY_CAST("{field}" AS {NUMERIC_CASTS[field]})'
+        return f'CAST("{field}" AS VARCHAR)'
+
+    select = []
+    for field in PLAN_DESIGN_COLUMNS:
+        if field in BOOLEAN_FIELDS:
+            expr = boolean_expr(field)
+        elif field in ('auto_enrollment_rate', 'auto_enrollment_effective_year'):
+            expr = f"CASE WHEN {boolean_expr('auto_enrollment_enabled')} = FALSE THEN NULL ELSE {value_expr(field)} END"
+        elif field == 'auto_escalation_cap':
+            expr = f"CASE WHEN {boolean_expr('auto_escalation_enabled')} = FALSE THEN NULL ELSE {value_expr(field)} END"
+        elif field == 'data_source':
+            expr = f"COALESCE({value_expr(field)}, 'ManualEntry')"
+        elif field == 'last_updated':
+            expr = 'CURRENT_TIMESTAMP'
+        else:
+            expr = value_expr(field)
+        select.append(f"{expr} AS {field}")
+
+    return "SELECT\n    " + ",\n    ".join(select) + f"\nFROM {staging_table}"
+
+
+def fingerprint_sql(alias: str = None) -> str:
+    """SQL expression hashing FINGERPRINT_FIELDS (NULLs are distinguished from empty strings)."""
+    prefix = f"{alias}." if alias else ''
+    parts = ', '.join(f"COALESCE(CAST({prefix}{c} AS VARCHAR), '\\N')" for c in FINGERPRINT_FIELDS)
+    return f"md5(concat_ws('|', {parts}))"
+
+
+def ensure_fingerprint_column(conn):
+    """Add plan_designs.row_fingerprint if missing and backfill rows that lack one."""
+    conn.execute("ALTER TABLE plan_designs ADD COLUMN IF NOT EXISTS row_fingerprint VARCHAR")
+    conn.execute(f"UPDATE plan_designs SET row_fingerprint = {fingerprint_sql()} WHERE row_fingerprint IS NULL")
+
+
+def _typed_column(field: str) -> str:
+    if field in BOOLEAN_FIELDS:
+        return f"CAST({field} AS BOOLEAN) AS {field}"
+    if field in NUMERIC_CASTS:
+        return f"CAST({field} AS {NUMERIC_CASTS[field]}) AS {field}"
+    if field == 'last_updated':
+        return f"CAST({field} AS TIMESTAMP) AS {field}"
+    return f"CAST({field} AS VARCHAR) AS {field}"
+
+
+def _write_import_audit(conn, updated_by: str, source: str):
+    """Record inserts, per-field updates and deletes from the merge work tables in audit_log."""
+    has_audit = conn.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'audit_log'"
+    ).fetchone()[0] > 0
+    if not has_audit:
+        return
+
+    field_changes = ' UNION ALL '.join(
+        f"""SELECT i.client_id, '{field}' AS field_name,
+                   CAST(p.{field} AS VARCHAR) AS old_value, CAST(i.{field} AS VARCHAR) AS new_value
+            FROM import_changed c
+            JOIN import_incoming i USING (client_id)
+            JOIN plan_designs p USING (client_id)
+            WHERE p.{field} IS DISTINCT FROM i.{field}"""
+        for field in FINGERPRINT_FIELDS
+    )
+
+    conn.execute(f"""
+        INSERT INTO audit_log
+        (id, client_id, field_name, old_value, new_value, change_type, reason, notes, updated_by, updated_at)
+        SELECT 'audit-' || CAST(uuid() AS VARCHAR), client_id, field_name, old_value, new_value,
+               change_type, 'import', ?, ?, CURRENT_TIMESTAMP
+        FROM (
+            SELECT client_id, '*' AS field_name, NULL AS old_value, client_name AS new_value,
+                   'import_insert' AS change_type
+            FROM import_incoming WHERE client_id IN (SELECT client_id FROM import_new)
+            UNION ALL
+            SELECT client_id, field_name, old_value, new_value, 'import_update' FROM ({field_changes})
+            UNION ALL
+            SELECT client_id, '*', client_name, NULL, 'import_delete'
+            FROM plan_designs WHERE client_id IN (SELECT client_id FROM import_removed)
+        )
+    """, [source, updated_by])
+
+
+def merge_rows(
+    conn,
+    relation: str,
+    mode: str = 'upsert',
+    updated_by: str = 'planwise-import',
+    source: str = None
+) -> dict:
+    """
+    Incrementally merge transformed plan_designs rows from `relation` into plan_designs.
+
+    Incoming rows are fingerprinted (md5 of FINGERPRINT_FIELDS) and compared with
+    plan_designs.row_fingerprint, so only rows that actually changed are written
+    and unchanged rows keep their last_updated. Anything else that edits plan
+    columns must recompute the stored fingerprint (the API does so with
+    queries.REFRESH_FINGERPRINT). Every insert, changed field and
+    delete is recorded in audit_log when that table exists. Runs inside the
+    caller's transaction so several sources can be committed together.
+
+    Modes:
+        upsert  - insert new client_ids, update changed ones
+        append  - insert new client_ids, skip existing ones
+        replace - like upsert, and delete plans missing from the input (full sync)
+
+    Returns:
+        Dictionary with inserted, updated, deleted, unchanged and skipped counts,
+        plus field_changes (field name -> number of rows changed)
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode: {mode}")
+
+    ensure_fingerprint_column(conn)
+
+    column_list = ', '.join(PLAN_DESIGN_COLUMNS)
+    typed_columns = ', '.join(_typed_column(c) for c in PLAN_DESIGN_COLUMNS)
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE import_incoming AS
+        SELECT *, {fingerprint_sql()} AS row_fingerprint
+        FROM (SELECT {typed_columns} FROM {relation})
+    """)
+    conn.execute("""
+        CREATE OR REPLACE TEMP TABLE import_new AS
+        SELECT client_id FROM import_incoming i
+        WHERE NOT EXISTS (SELECT 1 FROM plan_designs p WHERE p.client_id = i.client_id)
+    """)
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE import_changed AS
+        SELECT i.client_id FROM import_incoming i
+        JOIN plan_designs p ON p.client_id = i.client_id
+        WHERE {'FALSE' if mode == 'append' else 'p.row_fingerprint IS DISTINCT FROM i.row_fingerprint'}
+    """)
+    conn.execute(f"""
+        CREATE OR REPLACE TEMP TABLE import_removed AS
+        SELECT client_id FROM plan_designs p
+        WHERE {'TRUE' if mode == 'replace' else 'FALSE'}
+          AND NOT EXISTS (SELECT 1 FROM import_incoming i WHERE i.client_id = p.client_id)
+    """)
+
+    incoming = conn.execute("SELECT COUNT(*) FROM import_incoming").fetchone()[0]
+    inserted = conn.execute("SELECT COUNT(*) FROM import_new").fetchone()[0]
+    updated = conn.execute("SELECT COUNT(*) FROM import_changed").fetchone()[0]
+    deleted = conn.execute("SELECT COUNT(*) FROM import_removed").fetchone()[0]
+    existing = incoming - inserted
+
+    field_changes = {}
+    if updated:
+        counts = conn.execute("SELECT " + ', '.join(
+            f"COUNT(*) FILTER (WHERE p.{field} IS DISTINCT FROM i.{field})" for field in FINGERPRINT_FIELDS
+        ) + """
+            FROM import_changed c
+            JOIN import_incoming i USING (client_id)
+            JOIN plan_designs p USING (client_id)
+        """).fetchone()
+        field_changes = {field: n for field, n in zip(FINGERPRINT_FIELDS, counts) if n}
+
+    _write_import_audit(conn, updated_by, source)
+
+    if deleted:
+        conn.execute("DELETE FROM plan_designs WHERE client_id IN (SELECT client_id FROM import_removed)")
+    if updated:
+        assignments = ', '.join(f"{c} = i.{c}" for c in PLAN_DESIGN_COLUMNS[1:] + ['row_fingerprint'])
+        conn.execute(f"""
+            UPDATE plan_designs SET {assignments}
+            FROM import_incoming i
+            WHERE plan_designs.client_id = i.client_id
+              AND plan_designs.client_id IN (SELECT client_id FROM import_changed)
+        """)
+    if inserted:
+        conn.execute(f"""
+            INSERT INTO plan_designs ({column_list}, row_fingerprint)
+            SELECT {column_list}, row_fingerprint FROM import_incoming
+            WHERE client_id IN (SELECT client_id FROM import_new)
+        """)
+    if inserted or updated:
+        refresh_plan_formulas(
+            conn, "client_id IN (SELECT client_id FROM import_new UNION ALL SELECT client_id FROM import_changed)"
+        )
+
+    return {
+        'inserted': inserted,
+        'updated': updated,
+        'deleted': deleted,
+        'unchanged': 0 if mode == 'append' else existing - updated,
+        'skipped': existing if mode == 'append' else 0,
+        'field_changes': field_changes,
+    }
+
+
+def merge_staging(conn, mode: str = 'upsert', staging_table: str = STAGING_TABLE, source: str = None) -> dict:
+    """
+    Transform staging rows and merge them into plan_designs inside one transaction.
+
+    Returns:
+        Merge summary (see merge_rows)
+    """
+    columns = set(staged_columns(conn, staging_table))
+    conn.execute(f"CREATE OR REPLACE TEMP VIEW {staging_table}_rows AS {transform_select_sql(columns, staging_table)}")
+
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        summary = merge_rows(conn, f"{staging_table}_rows", mode, source=source)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    return summary
+
+
+def import_file(
+    path: str,
+    db_path: str = 'data/planwise.db',
+    mode: str = 'upsert',
+    file_format: str = None,
+    dry_run: bool = False
+) -> dict:
+    """
+    Stage, validate, transform and merge one CSV/Parquet extract.
+
+    Args:
+        path: Source file path
+        db_path: Path to DuckDB database
+        mode: Merge mode (upsert, append or replace)
+        file_format: 'csv' or 'parquet' (inferred when omitted)
+        dry_run: Validate only, do not touch plan_designs
+
+    Returns:
+        Result dictionary with success flag, row counts, validation issues and timings
+    """
+    result = {'file': path, 'success': False, 'rows': 0, 'issues': [], 'summary': None}
+
+    if not Path(path).exists():
+        result['error'] = f"File not found: {path}"
+        return result
+    if not Path(db_path).exists():
+        result['error'] = f"Database not found: {db_path} (run setup_database.py first)"
+        return result
+
+    started = time.perf_counter()
+    conn = duckdb.connect(str(db_path), read_only=dry_run)
+
+    try:
+        result['rows'] = stage_file(conn, path, file_format)
+        result['load_seconds'] = time.perf_counter() - started
+
+        is_valid, issues = validate_staging(conn, load_validation_rules(conn))
+        result['issues'] = issues
+        result['validate_seconds'] = time.perf_counter() - started - result['load_seconds']
+
+        if not is_valid:
+            result['error'] = "Data validation failed"
+            return result
+
+        if not dry_run:
+            result['summary'] = merge_staging(conn, mode, source=Path(path).name)
+        result['success'] = True
+        return result
+
+    except (duckdb.Error, ValueError) as e:
+        result['error'] = str(e)
+        return result
+
+    finally:
+        result['total_seconds'] = time.perf_counter() - started
+        conn.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='planwise-import',
+        description='Bulk-load CSV/Parquet plan design extracts into DuckDB'
+    )
+    parser.add_argument('files', nargs='+', help='CSV or Parquet files to import')
+    parser.add_argument('--db', default='data/planwise.db', help='DuckDB database path')
+    parser.add_argument('--mode', choices=IMPORT_MODES, default='upsert',
+                        help='How to merge into plan_designs (default: upsert)')
+    parser.add_argument('--format', choices=('csv', 'parquet'), dest='file_format',
+                        help='Force input format instead of inferring from extension')
+    parser.add_argument('--dry-run', action='store_true', help='Validate only')
+    args = parser.parse_args(argv)
+
+    print("PlanWise Design Matrix - CSV/Parquet Import")
+    print("=" * 60)
+
+    failed = 0
+    for path in args.files:
+        print(f"\nImporting: {path}")
+        result = import_file(path, args.db, args.mode, args.file_format, args.dry_run)
+
+        if not result['success']:
+            failed += 1
+            print(f"❌ {result.get('error', 'Import failed')}")
+            for issue in result['issues']:
+                print(f"   • {issue['message']}")
+            continue
+
+        rate = result['rows'] / result['total_seconds'] if result['total_seconds'] else 0
+        print(f"✓ Staged {result['rows']:,} rows in {result['load_seconds']:.2f}s")
+        print(f"✓ Validation passed in {result['validate_seconds']:.2f}s")
+        if result['summary']:
+            s = result['summary']
+            print(f"✓ Merged ({args.mode}): {s['inserted']} inserted, {s['updated']} updated, "
+                  f"{s['deleted']} deleted, {s['unchanged']} unchanged, {s['skipped']} skipped")
+            for field, count in sorted(s['field_changes'].items()):
+                print(f"   • {field}: {count} changed")
+        print(f"✓ {rate:,.0f} rows/sec end to end")
+
+    print("\n" + "=" * 60)
+    print(f"{len(args.files) - failed}/{len(args.files)} files imported")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,27 +8,16 @@ import duckdb
 from pathlib import Path
 from datetime import datetime
 
+from plan_formulas import refresh_plan_formulas
 
-def setup_database(db_path: str = 'data/planwise.db'):
+
+def create_plan_designs_table(conn):
     """
-    Initialize DuckDB database with plan_designs table.
+    Create the plan_designs table and its peer-grouping indexes.
 
     Args:
-        db_path: Path to database file (will be created if doesn't exist)
+        conn: Open DuckDB connection (table must not already exist)
     """
-
-    # Ensure data directory exists
-    db_file = Path(db_path)
-    db_file.parent.mkdir(parents=True, exist_ok=True)
-
-    print(f"Initializing database at: {db_path}")
-
-    # Connect to DuckDB (creates file if doesn't exist)
-    conn = duckdb.connect(db_path)
-
-    # Drop table if exists (for clean slate during development)
-    conn.execute("DROP TABLE IF EXISTS plan_designs")
-
     # Create main table
     conn.execute("""
         CREATE TABLE plan_designs (
@@ -75,12 +64,35 @@ def setup_database(db_path: str = 'data/planwise.db'):
         )
     """)
 
-    print("✓ Created table: plan_designs")
-
     # Create indexes for common query patterns
     conn.execute("CREATE INDEX idx_industry ON plan_designs(industry)")
     conn.execute("CREATE INDEX idx_employee_count ON plan_designs(employee_count)")
 
+
+def setup_database(db_path: str = 'data/planwise.db'):
+    """
+    Initialize DuckDB database with plan_designs table.
+
+    Args:
+        db_path: Path to database file (will be created if doesn't exist)
+    """
+
+    # Ensure data directory exists
+    db_file = Path(db_path)
+    db_file.parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"Initializing database at: {db_path}")
+
+    # Connect to DuckDB (creates file if doesn't exist)
+    conn = duckdb.connect(db_path)
+
+    # Drop table if exists (for clean slate during development)
+    conn.execute("DROP TABLE IF EXISTS plan_designs")
+
+    # Create main table and indexes
+    create_plan_designs_table(conn)
+
+    print("✓ Created table: plan_designs")
     print("✓ Created indexes for peer grouping")
 
     # Verify table creation
@@ -129,6 +141,9 @@ def setup_database(db_path: str = 'data/planwise.db'):
         )
     """)
 
+    # Parse match formula / vesting schedule into the derived benchmark columns
+    refresh_plan_formulas(conn)
+
     # Verify insertion
     count = conn.execute("SELECT COUNT(*) FROM plan_designs").fetchone()[0]
     print(f"✓ Sample record inserted (total records: {count})")
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Synthetic Plan Design Generator
+Builds seeded, production-shaped plan_designs (and audit_log history) at
+10k-5M rows so every performance feature can be benchmarked reproducibly.
+
+Usage:
+    python synthetic_data.py --rows 100000 --db data/synthetic_100k.db
+    python synthetic_data.py --rows 5000000 --parquet data/synthetic_5m.parquet --audit-per-plan 0
+"""
+
+import argparse
+import io
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.migrate_add_audit import apply_migration
+from plan_formulas import refresh_plan_formulas
+from planwise_import import ensure_fingerprint_column
+from setup_database import create_plan_designs_table
+
+
+CHUNK_SIZE = 250_000
+
+# Bump whenever generated schema or distributions change so cached benchmark databases are rebuilt
+DATA_VERSION = 2
+
+INDUSTRIES = (
+    ['healthcare', 'higher_ed', 'manufacturing', 'nonprofit', 'government', 'other'],
+    [0.34, 0.24, 0.18, 0.09, 0.05, 0.10],
+)
+
+# Roughly workforce-weighted; the long tail is spread over the remaining states
+STATES = (
+    ['CA', 'TX', 'NY', 'FL', 'IL', 'PA', 'OH', 'GA', 'NC', 'MI', 'NJ', 'VA', 'WA', 'MA', 'AZ',
+     'TN', 'IN', 'MN', 'MO', 'WI', 'CO', 'MD', 'OR', 'CT', 'UT'],
+    [0.12, 0.09, 0.07, 0.065, 0.045, 0.045, 0.04, 0.035, 0.035, 0.035, 0.03, 0.03, 0.028, 0.028,
+     0.025, 0.025, 0.022, 0.022, 0.02, 0.02, 0.02, 0.02, 0.015, 0.015, 0.015],
+)
+
+ELIGIBILITY = (
+    ['Immediate', '1 year', '1000 hours', '3 months', '6 months'],
+    [0.40, 0.25, 0.20, 0.10, 0.05],
+)
+
+# (formula text, effective employer rate as a fraction)
+MATCH_FORMULAS = (
+    [('100% up to 3%', 0.03), ('50% up to 6%', 0.03), ('100% up to 4%', 0.04),
+     ('100% of first 3%, 50% of next 2%', 0.04), ('100% up to 5%', 0.05),
+     ('100% up to 6%', 0.06), ('50% up to 8%', 0.04), (None, None)],
+    [0.14, 0.18, 0.16, 0.15, 0.12, 0.09, 0.04, 0.12],
+)
+
+NONELECTIVE_FORMULAS = (
+    [None, '2% of compensation', '3% of compensation', '5% of compensation'],
+    [0.65, 0.10, 0.18, 0.07],
+)
+
+VESTING = (
+    ['Immediate', '2-year cliff', '3-year cliff', '5-year cliff', 'Graded'],
+    [0.33, 0.07, 0.32, 0.06, 0.22],
+)
+
+AE_RATES = ([0.03, 0.04, 0.05, 0.06, 0.02], [0.42, 0.22, 0.14, 0.16, 0.06])
+ESCALATION_CAPS = ([0.10, 0.15, 0.06, 0.08, 0.12, 0.20], [0.45, 0.25, 0.08, 0.07, 0.10, 0.05])
+FREQUENCIES = ['per pay period', 'monthly', 'annually']
+
+NAME_PREFIXES = ['Summit', 'Riverside', 'Northern', 'Lakeview', 'Pacific', 'Heritage', 'Pioneer',
+                 'Unity', 'Cedar', 'Granite', 'Harbor', 'Meridian', 'Liberty', 'Evergreen']
+NAME_SUFFIXES = {
+    'healthcare': 'Health System', 'higher_ed': 'University', 'manufacturing': 'Manufacturing',
+    'nonprofit': 'Foundation', 'government': 'County', 'other': 'Holdings',
+}
+
+# Fields edited in generated audit history, with a generator for replacement values
+AUDIT_FIELDS = ['auto_enrollment_rate', 'auto_escalation_cap', 'match_effective_rate',
+                'vesting_schedule', 'eligibility', 'match_formula']
+
+
+def _choice(rng, options, size):
+    values, weights = options
+    idx = rng.choice(len(values), size=size, p=np.array(weights) / np.sum(weights))
+    return np.array(values, dtype=object)[idx], idx
+
+
+def _format_rate(values: np.ndarray) -> np.ndarray:
+    """Format fractional rates the way DuckDB renders DECIMAL(5,2) (e.g. '0.04')."""
+    out = np.empty(len(values), dtype=object)
+    present = ~pd.isna(values)
+    out[present] = [f"{v:.2f}" for v in values[present].astype(float)]
+    out[~present] = None
+    return out
+
+
+def generate_plan_chunk(rng, start: int, size: int) -> pd.DataFrame:
+    """
+    Generate `size` plan design rows with ids starting at `start`.
+
+    Provision mixes follow observed tax-exempt DC patterns: larger plans are more
+    likely to auto-enroll, most auto-enrolling plans also auto-escalate, and
+    plans with a non-elective contribution lean towards vesting schedules.
+    """
+    industry, industry_idx = _choice(rng, INDUSTRIES, size)
+    state, _ = _choice(rng, STATES, size)
+
+    # Log-normal headcount: median ~1,500, long right tail
+    employee_count = np.clip(rng.lognormal(mean=7.3, sigma=1.1, size=size), 50, 250_000).astype(np.int32)
+
+    match_idx = rng.choice(len(MATCH_FORMULAS[0]), size=size, p=MATCH_FORMULAS[1])
+    match_formula = np.array([f for f, _ in MATCH_FORMULAS[0]], dtype=object)[match_idx]
+    match_rate = np.array([r for _, r in MATCH_FORMULAS[0]], dtype=object)[match_idx]
+    has_match = match_formula != None  # noqa: E711 (elementwise object comparison)
+
+    nonelective, _ = _choice(rng, NONELECTIVE_FORMULAS, size)
+    has_nonelective = nonelective != None  # noqa: E711
+
+    size_boost = np.clip((np.log(employee_count) - 6.0) / 8.0, 0, 0.35)
+    ae_enabled = rng.random(size) < (0.40 + size_boost)
+    ae_rate, _ = _choice(rng, AE_RATES, size)
+    ae_year = np.where(rng.random(size) < 0.35, 1900, rng.integers(2010, 2026, size=size))
+
+    aesc_enabled = ae_enabled & (rng.random(size) < 0.72)
+    aesc_cap, _ = _choice(rng, ESCALATION_CAPS, size)
+
+    vesting, _ = _choice(rng, VESTING, size)
+    # Non-elective contributions are more often paired with a cliff schedule
+    recast = has_nonelective & (vesting == 'Immediate') & (rng.random(size) < 0.5)
+    vesting[recast] = '3-year cliff'
+
+    eligibility, _ = _choice(rng, ELIGIBILITY, size)
+    frequency = np.array(FREQUENCIES, dtype=object)[rng.choice(3, size=size, p=[0.8, 0.05, 0.15])]
+
+    ids = np.arange(start, start + size)
+    prefix = np.array(NAME_PREFIXES, dtype=object)[ids % len(NAME_PREFIXES)]
+    suffix = np.array([NAME_SUFFIXES[i] for i in INDUSTRIES[0]], dtype=object)[industry_idx]
+
+    return pd.DataFrame({
+        'client_id': [f"SYN-{i:07d}" for i in ids],
+        'client_name': prefix + ' ' + suffix + ' ' + pd.Series(ids).astype(str).to_numpy(dtype=object),
+        'industry': industry,
+        'employee_count': employee_count,
+        'state': state,
+        'eligibility': eligibility,
+        'match_formula': match_formula,
+        'match_effective_rate': np.where(has_match, match_rate, np.nan).astype(float),
+        'match_eligibility_criteria': np.where(has_match, 'All eligible employees', None),
+        'match_last_day_work_rule': has_match & (rng.random(size) < 0.18),
+        'match_true_up': has_match & (rng.random(size) < 0.42),
+        'match_contribution_frequency': np.where(has_match, frequency, None),
+        'nonelective_formula': nonelective,
+        'nonelective_eligibility_criteria': np.where(has_nonelective, 'All eligible employees', None),
+        'nonelective_last_day_work_rule': has_nonelective & (rng.random(size) < 0.35),
+        'nonelective_contribution_frequency': np.where(has_nonelective, 'annually', None),
+        'auto_enrollment_enabled': ae_enabled,
+        'auto_enrollment_rate': np.where(ae_enabled, ae_rate, np.nan).astype(float),
+        'auto_enrollment_effective_year': pd.Series(ae_year, dtype='Int32').where(ae_enabled),
+        'auto_escalation_enabled': aesc_enabled,
+        'auto_escalation_cap': np.where(aesc_enabled, aesc_cap, np.nan).astype(float),
+        'auto_escalation_rate': np.where(aesc_enabled, 0.01, np.nan),
+        'vesting_schedule': vesting,
+        'data_source': 'Synthetic',
+        'notes': None,
+    })
+
+
+def generate_audit_chunk(rng, plans: pd.DataFrame, events_per_plan: float, now: datetime,
+                         history_days: int = 730) -> pd.DataFrame:
+    """
+    Generate audit_log history for a chunk of plans.
+
+    Events for the same (client, field) form a consistent chain: each event's
+    old_value is the previous event's new_value and the last new_value equals
+    the plan's current value, so point-in-time replays are exact.
+    """
+    n_events = rng.poisson(events_per_plan * len(plans))
+    if n_events == 0:
+        return pd.DataFrame()
+
+    plan_idx = rng.integers(0, len(plans), size=n_events)
+    field_idx = rng.integers(0, len(AUDIT_FIELDS), size=n_events)
+    offsets = rng.integers(0, history_days * 86_400, size=n_events)
+
+    # Sort into (plan, field, time) order so chains can be formed by shifting
+    order = np.lexsort((offsets, field_idx, plan_idx))
+    plan_idx, field_idx, offsets = plan_idx[order], field_idx[order], offsets[order]
+
+    current = {}
+    for field in AUDIT_FIELDS:
+        values = plans[field].to_numpy(dtype=object)
+        current[field] = _format_rate(values) if field.endswith(('_rate', '_cap')) else values
+
+    new_values = np.empty(n_events, dtype=object)
+    random_values = np.empty(n_events, dtype=object)
+    for f, field in enumerate(AUDIT_FIELDS):
+        mask = field_idx == f
+        if field in ('auto_enrollment_rate', 'match_effective_rate'):
+            pool = _format_rate(np.array(AE_RATES[0], dtype=float))
+        elif field == 'auto_escalation_cap':
+            pool = _format_rate(np.array(ESCALATION_CAPS[0], dtype=float))
+        elif field == 'vesting_schedule':
+            pool = np.array(VESTING[0], dtype=object)
+        elif field == 'eligibility':
+            pool = np.array(ELIGIBILITY[0], dtype=object)
+        else:
+            pool = np.array([m for m, _ in MATCH_FORMULAS[0] if m], dtype=object)
+        random_values[mask] = pool[rng.integers(0, len(pool), size=int(mask.sum()))]
+        new_values[mask] = random_values[mask]
+
+    group = plan_idx * len(AUDIT_FIELDS) + field_idx
+    last_in_group = np.append(group[1:] != group[:-1], True)
+    first_in_group = np.insert(group[1:] != group[:-1], 0, True)
+
+    for f, field in enumerate(AUDIT_FIELDS):
+        mask = last_in_group & (field_idx == f)
+        new_values[mask] = current[field][plan_idx[mask]]
+
+    old_values = np.empty(n_events, dtype=object)
+    old_values[1:] = new_values[:-1]
+    old_values[first_in_group] = random_values[first_in_group]
+
+    start = now - timedelta(days=history_days)
+    updated_at = pd.to_datetime(start) + pd.to_timedelta(offsets, unit='s')
+    client_ids = plans['client_id'].to_numpy(dtype=object)[plan_idx]
+
+    return pd.DataFrame({
+        'id': [f"audit-syn-{cid}-{i}" for cid, i in zip(client_ids, range(n_events))],
+        'client_id': client_ids,
+        'field_name': np.array(AUDIT_FIELDS, dtype=object)[field_idx],
+        'old_value': old_values,
+        'new_value': new_values,
+        'change_type': 'update',
+        'reason': np.array(['data_correction', 'plan_amendment', 'annual_review'], dtype=object)[
+            rng.integers(0, 3, size=n_events)],
+        'notes': None,
+        'updated_by': np.array(['analyst1@planwise.com', 'analyst2@planwise.com',
+                                'consultant@planwise.com'], dtype=object)[rng.integers(0, 3, size=n_events)],
+        'updated_at': updated_at,
+    })
+
+
+def generate_database(
+    db_path: str = None,
+    rows: int = 10_000,
+    seed: int = 42,
+    audit_per_plan: float = 2.0,
+    parquet_path: str = None,
+    chunk_size: int = CHUNK_SIZE
+) -> dict:
+    """
+    Generate a synthetic database (and/or Parquet extract) with the full backend schema.
+
+    The database gets plan_designs with E04 metadata columns, auto_escalation_rate,
+    parsed formula columns and row_fingerprint, plus audit_log history and field_validation_rules, so the API,
+    importers and benchmarks can run against it unchanged.
+
+    Args:
+        db_path: DuckDB file to (re)create; None builds in memory (Parquet only)
+        rows: Number of plans to generate
+        seed: RNG seed (same seed + rows -> identical data)
+        audit_per_plan: Mean audit_log events per plan (0 disables history)
+        parquet_path: Optional Parquet export of plan_designs
+        chunk_size: Rows generated per batch (bounds memory at large sizes)
+
+    Returns:
+        Dictionary with row counts and generation timings
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    # Fixed reference time keeps audit timestamps reproducible for a given seed
+    now = datetime(2025, 1, 1) + timedelta(seconds=int(seed))
+
+    if db_path:
+        db_file = Path(db_path)
+        db_file.parent.mkdir(parents=True, exist_ok=True)
+        for stale in (db_file, Path(f"{db_path}.wal")):
+            if stale.exists():
+                stale.unlink()
+    conn = duckdb.connect(str(db_path) if db_path else ':memory:')
+
+    try:
+        create_plan_designs_table(conn)
+        with redirect_stdout(io.StringIO()):
+            apply_migration(conn)
+        conn.execute("ALTER TABLE plan_designs ADD COLUMN IF NOT EXISTS auto_escalation_rate DECIMAL(5,4)")
+
+        audit_rows = 0
+        for start in range(0, rows, chunk_size):
+            plans = generate_plan_chunk(rng, start, min(chunk_size, rows - start))
+            plans['last_updated'] = now
+            conn.register('plan_chunk', plans)
+            columns = ', '.join(plans.columns)
+            conn.execute(f"INSERT INTO plan_designs ({columns}) SELECT {columns} FROM plan_chunk")
+            conn.unregister('plan_chunk')
+
+            if audit_per_plan > 0:
+                audit = generate_audit_chunk(rng, plans, audit_per_plan, now)
+                if len(audit):
+                    conn.register('audit_chunk', audit)
+                    columns = ', '.join(audit.columns)
+                    conn.execute(f"INSERT INTO audit_log ({columns}) SELECT {columns} FROM audit_chunk")
+                    conn.unregister('audit_chunk')
+                    audit_rows += len(audit)
+
+        conn.execute("UPDATE plan_designs SET updated_at = last_updated")
+        refresh_plan_formulas(conn)
+        ensure_fingerprint_column(conn)
+
+        if parquet_path:
+            Path(parquet_path).parent.mkdir(parents=True, exist_ok=True)
+            conn.execute(f"COPY plan_designs TO '{parquet_path}' (FORMAT PARQUET)")
+
+        if db_path:
+            conn.execute("CHECKPOINT")
+
+    finally:
+        conn.close()
+
+    return {
+        'db_path': db_path,
+        'parquet_path': parquet_path,
+        'rows': rows,
+        'audit_rows': audit_rows,
+        'seed': seed,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Generate synthetic plan design data for scale testing')
+    parser.add_argument('--rows', type=int, default=10_000, help='Number of plans (10k-5M typical)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', default=None, help='DuckDB file to create (overwritten)')
+    parser.add_argument('--parquet', default=None, help='Also write plan_designs to this Parquet file')
+    parser.add_argument('--audit-per-plan', type=float, default=2.0, help='Mean audit events per plan')
+    args = parser.parse_args(argv)
+
+    if not args.db and not args.parquet:
+        parser.error('at least one of --db or --parquet is required')
+
+    print("PlanWise Design Matrix - Synthetic Data Generator")
+    print("=" * 60)
+    stats = generate_database(args.db, args.rows, args.seed, args.audit_per_plan, args.parquet)
+
+    print(f"✓ Generated {stats['rows']:,} plans and {stats['audit_rows']:,} audit events "
+          f"in {stats['seconds']:.1f}s (seed {stats['seed']})")
+    if stats['db_path']:
+        print(f"✓ Database: {stats['db_path']}")
+    if stats['parquet_path']:
+        print(f"✓ Parquet: {stats['parquet_path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Parallel Import Orchestrator Tests
+Checks per-file diagnostics and the all-or-nothing commit
+"""
+
+import duckdb
+
+from setup_database import setup_database
+from import_orchestrator import import_files
+from test_planwise_import import write_csv
+
+
+def test_many_files_commit_together(tmp_path):
+    """Every valid file is merged in one commit with throughput reported."""
+    db_path = str(tmp_path / 'planwise.db')
+    setup_database(db_path)
+
+    paths = [
+        write_csv(tmp_path / f"region_{n}.csv", [
+            f"R{n}-{i},Plan {n}-{i},healthcare,{500 + i},CA,,,No,,,No,,Immediate,Regional"
+            for i in range(25)
+        ])
+        for n in range(4)
+    ]
+
+    report = import_files(paths, db_path, workers=2)
+
+    assert report['success'], report.get('error')
+    assert [r['rows'] for r in report['files']] == [25, 25, 25, 25]
+    assert report['summary']['inserted'] == 100
+    assert report['rows_per_second'] > 0
+
+    conn = duckdb.connect(db_path, read_only=True)
+    assert conn.execute("SELECT COUNT(*) FROM plan_designs").fetchone()[0] == 101
+    conn.close()
+
+
+def test_one_bad_file_blocks_the_whole_batch(tmp_path):
+    """A validation failure or cross-file duplicate means nothing is committed."""
+    db_path = str(tmp_path / 'planwise.db')
+    setup_database(db_path)
+
+    good = write_csv(tmp_path / 'good.csv', ["G-1,Good,healthcare,500,CA,,,No,,,No,,Immediate,RK"])
+    bad = write_csv(tmp_path / 'bad.csv', ["B-1,Bad,retail,500,CA,,,No,,,No,,Immediate,RK"])
+    clash = write_csv(tmp_path / 'clash.csv', ["G-1,Clash,healthcare,500,CA,,,No,,,No,,Immediate,RK"])
+
+    report = import_files([good, bad], db_path, workers=2)
+    assert not report['success']
+    assert [r['success'] for r in report['files']] == [True, False]
+    assert report['files'][1]['issues'][0]['rule'] == 'enum'
+
+    report = import_files([good, clash], db_path, workers=2)
+    assert not report['success']
+    assert report['cross_file_duplicates'][0]['client_id'] == 'G-1'
+
+    conn = duckdb.connect(db_path, read_only=True)
+    assert conn.execute("SELECT COUNT(*) FROM plan_designs").fetchone()[0] == 1
+    conn.close()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Plan Formula Parser Tests
+Checks match-formula / vesting parsing and that imports keep the derived columns current
+"""
+
+import duckdb
+
+from setup_database import setup_database
+from planwise_import import import_file
+from plan_formulas import (
+    parse_match_formula, parse_vesting_schedule, refresh_client_formulas, refresh_plan_formulas
+)
+from test_planwise_import import write_csv
+
+
+def test_parse_match_formula_tiers():
+    assert parse_match_formula("50% up to 6%") == {
+        'tiers': [{'rate': 0.5, 'up_to': 0.06}], 'max_rate': 0.03, 'deferral_cap': 0.06
+    }
+    stretch = parse_match_formula("100% of first 3%, 50% of next 2%")
+    assert stretch['tiers'] == [{'rate': 1.0, 'up_to': 0.03}, {'rate': 0.5, 'up_to': 0.05}]
+    assert stretch['max_rate'] == 0.04
+    assert parse_match_formula("Dollar-for-dollar up to 4%")['max_rate'] == 0.04
+    assert parse_match_formula("Discretionary") is None
+    assert parse_match_formula(None) is None
+
+
+def test_parse_vesting_schedule_years():
+    assert parse_vesting_schedule("Immediate") == {'type': 'immediate', 'years': 0.0}
+    assert parse_vesting_schedule("3-year cliff") == {'type': 'cliff', 'years': 3.0}
+    assert parse_vesting_schedule("2-6 graded") == {'type': 'graded', 'years': 6.0}
+    assert parse_vesting_schedule("Graded") == {'type': 'graded', 'years': 6.0}
+    assert parse_vesting_schedule("See SPD") is None
+
+
+def test_import_populates_and_refreshes_derived_columns(tmp_path):
+    db_path = str(tmp_path / 'planwise.db')
+    setup_database(db_path)
+
+    rows = [
+        "C-1,Alpha,healthcare,1200,CA,100% of first 3%,3.0,No,,,No,,5-year cliff,RK",
+        "C-2,Beta,healthcare,900,CA,Discretionary,,No,,,No,,Immediate,RK",
+    ]
+    assert import_file(write_csv(tmp_path / 'v1.csv', rows), db_path)['success']
+    rows[0] = rows[0].replace('100% of first 3%', '100% of first 3% and 50% of next 2%')
+    assert import_file(write_csv(tmp_path / 'v2.csv', rows), db_path)['summary']['updated'] == 1
+
+    conn = duckdb.connect(db_path)
+    derived = conn.execute("""
+        SELECT client_id, len(match_tiers), CAST(match_max_rate AS DOUBLE), vesting_type,
+               CAST(vesting_years AS DOUBLE)
+        FROM plan_designs ORDER BY client_id
+    """).fetchall()
+    assert derived == [
+        ('C-1', 2, 0.04, 'cliff', 5.0),
+        ('C-2', None, None, 'immediate', 0.0),
+        ('CLIENT-SAMPLE-001', 1, 0.04, 'immediate', 0.0),
+    ]
+
+    conn.execute("UPDATE plan_designs SET vesting_schedule = '2-year cliff' WHERE client_id = 'C-2'")
+    assert refresh_plan_formulas(conn, "client_id = ?", ['C-2']) == 1
+    assert conn.execute("SELECT vesting_years FROM plan_designs WHERE client_id = 'C-2'").fetchone()[0] == 2
+
+    conn.execute("UPDATE plan_designs SET match_formula = '50% up to 6%' WHERE client_id = 'C-2'")
+    assert refresh_client_formulas(conn, 'C-2')
+    assert conn.execute(
+        "SELECT match_tiers, CAST(match_max_rate AS DOUBLE) FROM plan_designs WHERE client_id = 'C-2'"
+    ).fetchone() == ([{'rate': 0.5, 'up_to': 0.06}], 0.03)
+    assert not refresh_client_formulas(conn, 'C-404')
+    conn.close()
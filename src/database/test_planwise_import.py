@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+CSV/Parquet Import Tests
+Runs planwise-import against a scratch database built by setup_database
+"""
+
+import duckdb
+
+from setup_database import setup_database
+from planwise_import import import_file
+
+
+CSV_HEADER = (
+    "client_id,client_name,industry,employee_count,state,match_formula,match_effective_rate,"
+    "auto_enrollment_enabled,auto_enrollment_rate,auto_enrollment_effective_year,"
+    "auto_escalation_enabled,auto_escalation_cap,vesting_schedule,data_source\n"
+)
+
+
+def write_csv(path, rows):
+    path.write_text(CSV_HEADER + ''.join(row + '\n' for row in rows))
+    return str(path)
+
+
+def test_csv_import_transforms_and_upserts(tmp_path):
+    """Yes/No becomes boolean, disabled AE fields are nulled, existing ids are updated."""
+    db_path = str(tmp_path / 'planwise.db')
+    setup_database(db_path)
+
+    csv_path = write_csv(tmp_path / 'extract.csv', [
+        "C-1,Alpha Health,healthcare,1200,CA,100% up to 4%,4.0,Yes,3.0,2020,No,10.0,Immediate,Recordkeeper",
+        "C-2,Beta College,higher_ed,800,NY,50% up to 6%,3.0,No,4.0,2021,Yes,15.0,3-year cliff,Recordkeeper",
+        "CLIENT-SAMPLE-001,Sample University,higher_ed,2600,CA,100% up to 4%,4.0,Yes,3.0,1900,Yes,10.0,Immediate,ManualEntry",
+    ])
+
+    result = import_file(csv_path, db_path)
+    assert result['success'], result
+    assert result['summary']['inserted'] == 2
+    assert result['summary']['updated'] == 1
+
+    conn = duckdb.connect(db_path, read_only=True)
+    rows = conn.execute("""
+        SELECT client_id, auto_enrollment_enabled, auto_enrollment_rate, auto_escalation_cap,
+               employee_count, data_source
+        FROM plan_designs ORDER BY client_id
+    """).fetchall()
+    conn.close()
+
+    assert rows[0][0] == 'C-1' and rows[0][1] is True and rows[0][3] is None
+    assert rows[1][0] == 'C-2' and rows[1][1] is False and rows[1][2] is None
+    assert rows[2][4] == 2600 and rows[2][5] == 'ManualEntry'
+
+
+def test_parquet_validation_failure_leaves_table_untouched(tmp_path):
+    """Invalid rows are reported with row ranges and nothing is merged."""
+    db_path = str(tmp_path / 'planwise.db')
+    setup_database(db_path)
+
+    csv_path = write_csv(tmp_path / 'bad.csv', [
+        "C-1,Alpha,healthcare,1200,CA,,,Yes,3.0,2020,No,,Immediate,RK",
+        "C-2,Beta,retail,900,CA,,,Yes,,2020,No,,Immediate,RK",
+        "C-2,Gamma,retail,900,CA,,,No,,,No,,Immediate,RK",
+    ])
+    parquet_path = str(tmp_path / 'bad.parquet')
+    conn = duckdb.connect()
+    conn.execute(f"COPY (SELECT * FROM read_csv_auto('{csv_path}')) TO '{parquet_path}' (FORMAT PARQUET)")
+    conn.close()
+
+    result = import_file(parquet_path, db_path)
+    issues = {(i['field'], i['rule']): i for i in result['issues']}
+
+    assert not result['success']
+    assert issues[('industry', 'enum')]['row_ranges'] == [(1, 2)]
+    assert issues[('client_id', 'unique')]['row_ranges'] == [(2, 2)]
+    assert issues[('auto_enrollment_rate', 'required_if')]['count'] == 1
+
+    conn = duckdb.connect(db_path, read_only=True)
+    assert conn.execute("SELECT COUNT(*) FROM plan_designs").fetchone()[0] == 1
+    conn.close()
+
+
+def test_reimport_only_touches_changed_rows(tmp_path):
+    """Fingerprints keep unchanged rows (and their last_updated) out of the write set."""
+    db_path = str(tmp_path / 'planwise.db')
+    setup_database(db_path)
+    conn = duckdb.connect(db_path)
+    conn.execute("""
+        CREATE TABLE audit_log (
+            id VARCHAR PRIMARY KEY, client_id VARCHAR NOT NULL, field_name VARCHAR NOT NULL,
+            old_value VARCHAR, new_value VARCHAR, change_type VARCHAR NOT NULL,
+            reason VARCHAR NOT NULL, notes TEXT, updated_by VARCHAR(255) NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, confidence_score DECIMAL(3,2)
+        )
+    """)
+    conn.close()
+
+    rows = [
+        f"C-{i},Plan {i},healthcare,{1000 + i},CA,100% up to 4%,4.0,Yes,3.0,2020,No,,Immediate,RK"
+        for i in range(10)
+    ]
+    first = import_file(write_csv(tmp_path / 'v1.csv', rows), db_path)
+    assert first['summary']['inserted'] == 10
+
+    conn = duckdb.connect(db_path, read_only=True)
+    stamps = dict(conn.execute("SELECT client_id, last_updated FROM plan_designs").fetchall())
+    conn.close()
+
+    same = import_file(write_csv(tmp_path / 'v2.csv', rows), db_path)
+    assert same['summary']['updated'] == 0
+    assert same['summary']['unchanged'] == 10
+
+    rows[3] = rows[3].replace('3.0,2020', '5.0,2020')
+    changed = import_file(write_csv(tmp_path / 'v3.csv', rows[:9]), db_path, mode='replace')
+    summary = changed['summary']
+    assert (summary['updated'], summary['deleted'], summary['unchanged']) == (1, 2, 8)
+    assert summary['field_changes'] == {'auto_enrollment_rate': 1}
+
+    conn = duckdb.connect(db_path, read_only=True)
+    after = dict(conn.execute("SELECT client_id, last_updated FROM plan_designs").fetchall())
+    audit = conn.execute("""
+        SELECT client_id, field_name, old_value, new_value, change_type
+        FROM audit_log WHERE change_type != 'import_insert' ORDER BY client_id
+    """).fetchall()
+    conn.close()
+
+    assert after['C-0'] == stamps['C-0']
+    assert after['C-3'] > stamps['C-3']
+    assert 'C-9' not in after and 'CLIENT-SAMPLE-001' not in after
+    assert audit == [
+        ('C-3', 'auto_enrollment_rate', '3.00', '5.00', 'import_update'),
+        ('C-9', '*', 'Plan 9', None, 'import_delete'),
+        ('CLIENT-SAMPLE-001', '*', 'Sample University', None, 'import_delete'),
+    ]
+
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Validation Engine Tests
+Checks the vectorized validate_data report against small in-memory frames
+"""
+
+import sys
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.migrate_add_audit import apply_migration
+from excel_to_duckdb import validate_data, load_validation_rules, MAX_ROW_RANGES
+from planwise_import import import_file
+from setup_database import setup_database
+from test_planwise_import import write_csv
+
+
+def make_frame(rows: int = 6) -> pd.DataFrame:
+    """Build a valid plan data frame with `rows` records."""
+    return pd.DataFrame({
+        'client_id': [f"C-{i:03d}" for i in range(rows)],
+        'client_name': [f"Client {i}" for i in range(rows)],
+        'industry': ['healthcare'] * rows,
+        'employee_count': [1000 + i for i in range(rows)],
+        'auto_enrollment_enabled': ['Yes'] * rows,
+        'auto_enrollment_rate': [3.0] * rows,
+        'auto_enrollment_effective_year': [2020] * rows,
+        'auto_escalation_enabled': ['No'] * rows,
+        'auto_escalation_cap': [None] * rows,
+        'match_effective_rate': [4.0] * rows,
+        'data_source': ['ManualEntry'] * rows,
+    })
+
+
+def test_valid_frame_passes():
+    """A clean frame produces no issues."""
+    is_valid, issues = validate_data(make_frame())
+    assert is_valid
+    assert issues == []
+
+
+def test_missing_column_short_circuits():
+    """A missing required column is reported on its own."""
+    df = make_frame().drop(columns=['data_source'])
+    is_valid, issues = validate_data(df)
+    assert not is_valid
+    assert [(i['field'], i['rule']) for i in issues] == [('data_source', 'missing_column')]
+
+
+def test_structured_report_collapses_row_ranges():
+    """Offending rows are reported as ranges with counts and capped examples."""
+    df = make_frame(10)
+    df['employee_count'] = df['employee_count'].astype(object)
+    df.loc[[2, 3, 4, 8], 'industry'] = 'retail'
+    df.loc[5, 'employee_count'] = 'lots'
+    df.loc[1, 'auto_enrollment_rate'] = None
+
+    is_valid, issues = validate_data(df)
+    by_rule = {(i['field'], i['rule']): i for i in issues}
+
+    assert not is_valid
+    industry = by_rule[('industry', 'enum')]
+    assert industry['count'] == 4
+    assert industry['row_ranges'] == [(2, 4), (8, 8)]
+    assert industry['examples'] == ['retail']
+    assert by_rule[('employee_count', 'numeric')]['row_ranges'] == [(5, 5)]
+    assert by_rule[('auto_enrollment_rate', 'required_if')]['count'] == 1
+    assert 'rows: 2-4, 8' in industry['message']
+
+
+def test_large_frame_report_stays_compact():
+    """Alternating failures over many rows keep only MAX_ROW_RANGES ranges."""
+    df = make_frame(50_000)
+    df.loc[df.index % 2 == 0, 'match_effective_rate'] = -1.0
+
+    is_valid, issues = validate_data(df)
+    issue = next(i for i in issues if i['rule'] == 'min')
+
+    assert not is_valid
+    assert issue['count'] == 25_000
+    assert len(issue['row_ranges']) == MAX_ROW_RANGES
+    assert issue['ranges_truncated']
+    assert len(issue['examples']) <= 5
+
+
+def test_ranges_truncated_only_past_the_cap():
+    """Exactly MAX_ROW_RANGES ranges are reported in full; one more sets ranges_truncated."""
+    for ranges, truncated in ((MAX_ROW_RANGES, False), (MAX_ROW_RANGES + 1, True)):
+        df = make_frame(2 * MAX_ROW_RANGES + 2)
+        df.loc[[2 * i for i in range(ranges)], 'match_effective_rate'] = -1.0
+
+        _, issues = validate_data(df)
+        issue = next(i for i in issues if i['rule'] == 'min')
+
+        assert len(issue['row_ranges']) == MAX_ROW_RANGES
+        assert issue['ranges_truncated'] is truncated
+        assert ('18 ...' in issue['message']) is truncated
+
+
+def test_rules_loaded_from_validation_table():
+    """field_validation_rules bounds (fractions for rates) and enums override the defaults."""
+    conn = duckdb.connect(':memory:')
+    conn.execute("""
+        CREATE TABLE field_validation_rules (
+            field_name VARCHAR PRIMARY KEY,
+            data_type VARCHAR NOT NULL,
+            required BOOLEAN DEFAULT FALSE,
+            min_value DOUBLE,
+            max_value DOUBLE,
+            allowed_values VARCHAR[],
+            validation_regex VARCHAR,
+            help_text TEXT
+        )
+    """)
+    conn.execute("""
+        INSERT INTO field_validation_rules VALUES
+        ('auto_enrollment_rate', 'decimal', FALSE, 0.0, 0.15, NULL, NULL, NULL),
+        ('industry', 'enum', TRUE, NULL, NULL, ['healthcare', 'retail'], NULL, NULL)
+    """)
+    rules = load_validation_rules(conn)
+    conn.close()
+
+    df = make_frame()
+    df.loc[0, 'industry'] = 'retail'
+    df.loc[1, 'auto_enrollment_rate'] = 16.0
+
+    is_valid, issues = validate_data(df, rules)
+    assert not is_valid
+    assert [(i['field'], i['rule'], i['row_ranges']) for i in issues] == [
+        ('auto_enrollment_rate', 'max', [(1, 1)])
+    ]
+
+
+def test_template_rows_pass_migrated_rules(tmp_path):
+    """Percent rates and free-text vesting from the template pass the API's rule table on both import paths."""
+    db_path = str(tmp_path / 'planwise.db')
+    setup_database(db_path)
+    conn = duckdb.connect(db_path)
+    apply_migration(conn)
+    rules = load_validation_rules(conn)
+    sample = conn.execute("SELECT * FROM plan_designs").df()
+    conn.close()
+
+    assert {'rule': 'max', 'field': 'auto_escalation_cap', 'value': 20.0} in rules
+    assert validate_data(sample, rules) == (True, [])
+
+    rows = [
+        "C-1,Alpha Health,healthcare,1200,CA,100% up to 4%,4.0,Yes,3.0,2020,Yes,10.0,2-6 graded,RK",
+        "C-2,Beta College,higher_ed,800,NY,50% up to 6%,3.0,Yes,4.0,2021,No,,Immediate,RK",
+    ]
+    assert import_file(write_csv(tmp_path / 'template.csv', rows), db_path)['success']
+
+    rows[1] = rows[1].replace('3.0,Yes,4.0', '3.0,Yes,25.0')
+    result = import_file(write_csv(tmp_path / 'too_high.csv', rows), db_path)
+    assert not result['success']
+    assert [(i['field'], i['rule'], i['value']) for i in result['issues']] == [('auto_enrollment_rate', 'max', 15.0)]
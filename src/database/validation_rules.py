@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Validation Rules for Plan Data Imports
+Shared rule definitions used by the Excel (pandas) and CSV/Parquet (SQL) import paths
+"""
+
+import numpy as np
+
+
+# Maximum offending row ranges / example values materialized per issue, so a
+# 500k-row file with a systematic problem still produces a compact report.
+MAX_ROW_RANGES = 10
+MAX_EXAMPLES = 5
+
+TRUTHY_VALUES = ['Yes', True]
+
+# Import files give rates in percent (3.0 = 3%), as the template and the
+# plan_designs schema in setup_database do. field_validation_rules bounds them
+# as fractions (0.15), the unit API edits use, so their bounds are scaled on load.
+PERCENT_FIELDS = ('match_effective_rate', 'auto_enrollment_rate', 'auto_escalation_cap')
+# The template takes these as free text (e.g. "2-6 graded" vesting); their
+# field_validation_rules enums only constrain API edits.
+FREE_TEXT_FIELDS = ('vesting_schedule',)
+
+# Built-in rules mirroring the original hand-written checks. Rules loaded from
+# the field_validation_rules table are merged on top (same field + rule wins).
+DEFAULT_VALIDATION_RULES = [
+    {'field': 'client_id', 'rule': 'required'},
+    {'field': 'client_name', 'rule': 'required'},
+    {'field': 'industry', 'rule': 'required'},
+    {'field': 'employee_count', 'rule': 'required'},
+    {'field': 'auto_enrollment_enabled', 'rule': 'required'},
+    {'field': 'data_source', 'rule': 'required'},
+    {'field': 'client_id', 'rule': 'unique'},
+    {'field': 'industry', 'rule': 'enum',
+     'allowed': ['healthcare', 'higher_ed', 'manufacturing', 'other']},
+    {'field': 'auto_enrollment_enabled', 'rule': 'enum',
+     'allowed': ['Yes', 'No', True, False]},
+    {'field': 'auto_enrollment_rate', 'rule': 'required_if',
+     'when': ('auto_enrollment_enabled', TRUTHY_VALUES)},
+    {'field': 'auto_enrollment_effective_year', 'rule': 'required_if',
+     'when': ('auto_enrollment_enabled', TRUTHY_VALUES)},
+    {'field': 'auto_escalation_cap', 'rule': 'required_if',
+     'when': ('auto_escalation_enabled', TRUTHY_VALUES)},
+    {'field': 'employee_count', 'rule': 'numeric'},
+    {'field': 'match_effective_rate', 'rule': 'numeric'},
+    {'field': 'auto_enrollment_rate', 'rule': 'numeric'},
+    {'field': 'auto_enrollment_effective_year', 'rule': 'numeric'},
+    {'field': 'auto_escalation_cap', 'rule': 'numeric'},
+    {'field': 'employee_count', 'rule': 'min', 'value': 0},
+    {'field': 'match_effective_rate', 'rule': 'min', 'value': 0},
+    {'field': 'auto_enrollment_rate', 'rule': 'min', 'value': 0},
+    {'field': 'auto_escalation_cap', 'rule': 'min', 'value': 0},
+]
+
+
+def load_validation_rules(conn=None) -> list[dict]:
+    """
+    Build the validation rule set, merging field_validation_rules on top of the defaults.
+
+    Table bounds for PERCENT_FIELDS are converted to percent, and enums for
+    FREE_TEXT_FIELDS are skipped, so the rules check values in import-file units.
+
+    Args:
+        conn: Optional DuckDB connection; when omitted (or the table is missing)
+              only DEFAULT_VALIDATION_RULES are returned
+
+    Returns:
+        List of rule dictionaries understood by validate_data
+    """
+    rules = {(r['field'], r['rule']): r for r in DEFAULT_VALIDATION_RULES}
+
+    if conn is not None:
+        table_exists = conn.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'field_validation_rules'"
+        ).fetchone()[0] > 0
+
+        if table_exists:
+            rows = conn.execute("""
+                SELECT field_name, data_type, required, min_value, max_value, allowed_values
+                FROM field_validation_rules
+            """).fetchall()
+
+            for field, data_type, required, min_value, max_value, allowed_values in rows:
+                if required:
+                    rules[(field, 'required')] = {'field': field, 'rule': 'required'}
+                if data_type in ('decimal', 'integer'):
+                    scale = 100 if field in PERCENT_FIELDS else 1
+                    rules[(field, 'numeric')] = {'field': field, 'rule': 'numeric'}
+                    if min_value is not None:
+                        rules[(field, 'min')] = {'field': field, 'rule': 'min', 'value': round(min_value * scale, 6)}
+                    if max_value is not None:
+                        rules[(field, 'max')] = {'field': field, 'rule': 'max', 'value': round(max_value * scale, 6)}
+                elif data_type == 'enum' and allowed_values and field not in FREE_TEXT_FIELDS:
+                    rules[(field, 'enum')] = {'field': field, 'rule': 'enum', 'allowed': list(allowed_values)}
+
+    return list(rules.values())
+
+
+def row_ranges(labels: np.ndarray, limit: int = MAX_ROW_RANGES) -> list[tuple[int, int]]:
+    """Collapse sorted integer row labels into at most `limit` (start, end) ranges."""
+    if len(labels) == 0:
+        return []
+    # A new range starts wherever the gap to the previous label is not 1
+    breaks = np.flatnonzero(np.diff(labels) != 1)
+    starts = np.concatenate(([0], breaks + 1))[:limit]
+    ends = np.concatenate((breaks, [len(labels) - 1]))[:limit]
+    return [(int(labels[s]), int(labels[e])) for s, e in zip(starts, ends)]
+
+
+def range_count(labels: np.ndarray) -> int:
+    """Number of ranges row_ranges would produce without a limit."""
+    if len(labels) == 0:
+        return 0
+    return int(np.count_nonzero(np.diff(labels) != 1)) + 1
+
+
+def _issue_message(issue: dict) -> str:
+    """Human-readable one-liner for a structured validation issue."""
+    field, rule = issue['field'], issue['rule']
+    if rule == 'missing_column':
+        return f"Missing required column: {field}"
+    if rule == 'required':
+        return f"Field '{field}' has {issue['count']} missing values"
+    if rule == 'unique':
+        return f"Duplicate {field} values found ({issue['count']} rows)"
+    if rule == 'enum':
+        return f"Invalid {field} values ({issue['count']} rows). Must be one of: {issue['allowed']}"
+    if rule == 'required_if':
+        condition_field = issue['when'][0]
+        return f"{field} is required when {condition_field} = Yes ({issue['count']} rows missing)"
+    if rule == 'numeric':
+        return f"Field '{field}' contains non-numeric values ({issue['count']} rows)"
+    if rule == 'min':
+        return f"Field '{field}' has {issue['count']} values below {issue['value']}"
+    if rule == 'max':
+        return f"Field '{field}' has {issue['count']} values above {issue['value']}"
+    return f"Field '{field}' failed rule '{rule}' ({issue['count']} rows)"
+
+
+def format_validation_issue(issue: dict) -> str:
+    """Format a structured validation issue for console output."""
+    message = _issue_message(issue)
+    if issue.get('row_ranges'):
+        ranges = ', '.join(str(s) if s == e else f"{s}-{e}" for s, e in issue['row_ranges'])
+        truncated = ' ...' if issue.get('ranges_truncated') else ''
+        message += f" in rows: {ranges}{truncated}"
+    if issue.get('examples'):
+        message += f" (e.g. {issue['examples']})"
+    return message
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_literal(value) -> str:
+    """Render a rule value as a SQL literal (booleans compare as 'true'/'false' text)."""
+    if isinstance(value, bool):
+        return "'true'" if value else "'false'"
+    if isinstance(value, (int, float)):
+        return repr(float(value))
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def rule_predicate_sql(rule: dict) -> str:
+    """
+    Translate a rule into a SQL predicate that is TRUE for offending rows.
+
+    The predicate is evaluated against a staging relation where text/boolean
+    values are compared as VARCHAR, so 'Yes' and TRUE are treated alike. Unique
+    rules reference a precomputed `_dup_<field>` window column.
+
+    Args:
+        rule: Rule dictionary (see DEFAULT_VALIDATION_RULES)
+
+    Returns:
+        SQL boolean expression, or None for unsupported rule kinds
+    """
+    kind = rule['rule']
+    column = _quote_identifier(rule['field'])
+
+    if kind == 'required':
+        return f"{column} IS NULL"
+    if kind == 'unique':
+        return f"{column} IS NOT NULL AND {_quote_identifier('_dup_' + rule['field'])} > 1"
+    if kind == 'enum':
+        allowed = ', '.join(_sql_literal(v) for v in rule['allowed'])
+        return f"{column} IS NOT NULL AND CAST({column} AS VARCHAR) NOT IN ({allowed})"
+    if kind == 'required_if':
+        condition_field, condition_values = rule['when']
+        values = ', '.join(_sql_literal(v) for v in condition_values)
+        return f"CAST({_quote_identifier(condition_field)} AS VARCHAR) IN ({values}) AND {column} IS NULL"
+    if kind == 'numeric':
+        return f"{column} IS NOT NULL AND TRY_CAST({column} AS DOUBLE) IS NULL"
+    if kind == 'min':
+        return f"TRY_CAST({column} AS DOUBLE) < {_sql_literal(rule['value'])}"
+    if kind == 'max':
+        return f"TRY_CAST({column} AS DOUBLE) > {_sql_literal(rule['value'])}"
+    return None
@@ -4,14 +4,8 @@ PowerPoint Generator for Fidelity PlanAlign Studio
 Creates peer comparison presentation decks
 """
 
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
 from datetime import datetime
 from typing import Dict
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
 import io
 from pathlib import Path
 
@@ -29,6 +23,14 @@ def generate_powerpoint(client_id: str, output_dir: str = 'output') -> str:
     Returns:
         Path to generated .pptx file
     """
+    # python-pptx and matplotlib are slow to import, so only deck generation loads them
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+    from pptx.enum.text import PP_ALIGN
+    import matplotlib
+    matplotlib.use('Agg')  # Use non-interactive backend
+    import matplotlib.pyplot as plt
+
     # Get peer comparison data
     comparison = generate_peer_comparison(client_id)
     target = comparison['target_client']
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Tests for the peer benchmarking micro-benchmark harness
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import bench_peer_benchmarking as bench
+
+
+def test_equivalent_tolerates_float_noise_only():
+    assert bench.equivalent({'p': [0.1 + 0.2, None]}, {'p': [0.3, None]})
+    assert not bench.equivalent({'p': 0.3}, {'p': 0.31})
+    assert not bench.equivalent({'p': None}, {'p': 0.0})
+    assert not bench.equivalent([1, 2], [1, 2, 3])
+
+
+def test_compare_mode_runs_both_implementations():
+    """Comparing the module with itself is equivalent and reports a speedup and memory peak."""
+    rows = bench.run_benchmarks(
+        ['calculate_percentile', 'calculate_adoption_rate'], [10, 1000],
+        compare=str(Path(__file__).parent / 'peer_benchmarking.py')
+    )
+
+    assert [(r['function'], r['size']) for r in rows] == [
+        ('calculate_percentile', 10), ('calculate_percentile', 1000),
+        ('calculate_adoption_rate', 10), ('calculate_adoption_rate', 1000),
+    ]
+    assert all(r['equivalent'] and r['speedup'] > 0 and r['rounds'] >= bench.MIN_ROUNDS for r in rows)
+    assert rows[1]['peak_kb'] > rows[0]['peak_kb']